@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ActionablePattern, ProcessedEmail, ExtractedTask, ThinkTaskerUser, ReferenceDocument
+from .models import ActionablePattern, ProcessedEmail, ExtractedTask, ThinkTaskerUser, ReferenceDocument, TodoOutboxEntry
 
 # Register your models here.
 admin.site.register(ActionablePattern)
@@ -10,6 +10,8 @@ class ThinkTaskerUserAdmin(admin.ModelAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'department', 'is_approved', 'is_active')
     list_filter = ('is_approved', 'is_active', 'department')
     search_fields = ('email', 'username', 'first_name', 'last_name', 'department')
+    # The Graph refresh tokens of the user, not shown to staff
+    exclude = ('graph_token_cache',)
 
 @admin.register(ReferenceDocument)
 class ReferenceDocumentAdmin(admin.ModelAdmin):
@@ -22,4 +24,11 @@ class ExtractedTaskAdmin(admin.ModelAdmin):
     list_filter = ('priority', 'status', 'created_at')
     search_fields = ('email__subject', 'subject', 'body_preview')
     raw_id_fields = ('email',)
-    ordering = ('-created_at',)
\ No newline at end of file
+    ordering = ('-created_at',)
+
+@admin.register(TodoOutboxEntry)
+class TodoOutboxEntryAdmin(admin.ModelAdmin):
+    list_display = ('todo_task_id', 'user', 'action', 'status', 'attempts', 'next_attempt_at', 'created_at')
+    list_filter = ('status', 'action')
+    search_fields = ('todo_task_id', 'user__email', 'last_error')
+    ordering = ('-created_at',)
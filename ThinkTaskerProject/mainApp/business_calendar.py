@@ -0,0 +1,146 @@
+import functools
+import logging
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Business calendar: the working days, working hours and public holidays every scheduling
+# and deadline path uses (deadlines.py, scheduler.py, todo_sync.py, the task views).
+# The defaults come from settings.BUSINESS_WEEKMASK, BUSINESS_WORK_HOURS and BUSINESS_HOLIDAYS,
+# settings.BUSINESS_CALENDARS overrides them per ThinkTaskerUser.department.
+# When the "holidays" package is installed, the public holidays of BUSINESS_HOLIDAYS_COUNTRY
+# are added to BUSINESS_HOLIDAYS for the years around the current one.
+# Day offsets use numpy's busday functions, so they cost the same for 1 or 1000 days
+# and a whole array of dates is shifted in one call.
+
+class BusinessCalendar:
+    # weekmask: 7 characters, Monday first, "1" for a working day
+    # holidays: dates or ISO strings
+    # work_hours: the hours a task can be scheduled at, one task per hour
+    def __init__(self, weekmask="1111100", holidays=(), work_hours=(9, 10, 11, 13, 14, 15, 16, 17, 18)):
+        self.weekmask = weekmask
+        self.holidays = frozenset(date.fromisoformat(h) if isinstance(h, str) else h for h in holidays)
+        self.work_hours = list(work_hours)
+        self.busdaycal = np.busdaycalendar(
+            weekmask=weekmask, holidays=np.array(sorted(self.holidays), dtype="datetime64[D]")
+        )
+
+    @property
+    def work_start(self):
+        return self.work_hours[0]
+
+    @property
+    def work_end(self):
+        return self.work_hours[-1]
+
+    def is_business_day(self, day):
+        day = _as_date(day)
+        return self.weekmask[day.weekday()] == "1" and day not in self.holidays
+
+    # This function returns start moved by days business days, keeping the time of a datetime.
+    # Like counting working days on a calendar, start itself does not count, so one business day
+    # after a Friday or a Saturday is the Monday (or the first working day after it).
+    def add_business_days(self, start, days):
+        if days == 0:
+            return start
+        day = _as_date(start)
+        roll = "backward" if days > 0 else "forward"
+        target = np.busday_offset(np.datetime64(day, "D"), days, roll=roll, busdaycal=self.busdaycal)
+        return start + timedelta(days=(target.astype(date) - day).days)
+
+    # Vectorized add_business_days for an array of dates (anything numpy converts to datetime64[D]).
+    # days is one offset or an array of offsets; returns a datetime64[D] array.
+    def add_business_days_many(self, days, offsets):
+        days = np.asarray(days, dtype="datetime64[D]")
+        offsets = np.broadcast_to(np.asarray(offsets), days.shape)
+        result = days.copy()
+        forward = offsets > 0
+        backward = offsets < 0
+        result[forward] = np.busday_offset(days[forward], offsets[forward], roll="backward", busdaycal=self.busdaycal)
+        result[backward] = np.busday_offset(days[backward], offsets[backward], roll="forward", busdaycal=self.busdaycal)
+        return result
+
+    def next_business_day(self, start):
+        return self.add_business_days(start, 1)
+
+    # The day itself when it is a business day, otherwise the first business day after it
+    def roll_forward(self, day):
+        return np.busday_offset(np.datetime64(_as_date(day), "D"), 0, roll="forward", busdaycal=self.busdaycal).astype(date)
+
+    # The day itself when it is a business day, otherwise the last business day before it
+    def roll_backward(self, day):
+        return np.busday_offset(np.datetime64(_as_date(day), "D"), 0, roll="backward", busdaycal=self.busdaycal).astype(date)
+
+    # Last business day of the week of day (never before day itself)
+    def end_of_week(self, day):
+        day = _as_date(day)
+        return max(day, self.roll_backward(day + timedelta(days=6 - day.weekday())))
+
+    # Last business day of the month of day (never before day itself)
+    def end_of_month(self, day):
+        day = _as_date(day)
+        return max(day, self.roll_backward(first_of_next_month(day) - timedelta(days=1)))
+
+    # First business day of the month after day
+    def start_of_next_month(self, day):
+        return self.roll_forward(first_of_next_month(_as_date(day)))
+
+    # First business day of the week after day
+    def start_of_next_week(self, day):
+        day = _as_date(day)
+        return self.roll_forward(day + timedelta(days=7 - day.weekday()))
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+def first_of_next_month(dt):
+    if dt.month == 12:
+        return dt.replace(year=dt.year+1, month=1, day=1)
+    else:
+        return dt.replace(month=dt.month+1, day=1)
+
+# Years after the current one whose public holidays are loaded from the "holidays" package
+HOLIDAY_YEARS_AHEAD = 2
+
+# This function returns the public holidays of a country (ISO code) from the year before year
+# to HOLIDAY_YEARS_AHEAD years after it, or None when the "holidays" package is not installed.
+def country_holidays(country, year):
+    try:
+        import holidays
+    except ImportError:
+        return None
+    return sorted(holidays.country_holidays(country, years=range(year - 1, year + HOLIDAY_YEARS_AHEAD + 1)))
+
+# This function returns the business calendar of a department (the default one for None or
+# a department without its own settings). Calendars are built once per process and year.
+def get_calendar(department=None):
+    return _get_calendar(department, timezone.localdate().year)
+
+@functools.lru_cache(maxsize=None)
+def _get_calendar(department, year):
+    config = {
+        "weekmask": settings.BUSINESS_WEEKMASK,
+        "holidays": settings.BUSINESS_HOLIDAYS,
+        "work_hours": settings.BUSINESS_WORK_HOURS,
+        "country": settings.BUSINESS_HOLIDAYS_COUNTRY,
+    }
+    config.update(settings.BUSINESS_CALENDARS.get(department or "", {}))
+    country = config.pop("country")
+    holidays = [date.fromisoformat(h) if isinstance(h, str) else h for h in config["holidays"]]
+    generated = country_holidays(country, year) if country else None
+    if generated is not None:
+        holidays += generated
+    elif holidays and max(holidays).year < year:
+        logger.warning(
+            f"The configured holidays of the {department or 'default'} business calendar end in "
+            f"{max(holidays).year}: update BUSINESS_HOLIDAYS or install the holidays package"
+        )
+    config["holidays"] = holidays
+    return BusinessCalendar(**config)
+
+def calendar_for(user):
+    return get_calendar(getattr(user, "department", None) or None)
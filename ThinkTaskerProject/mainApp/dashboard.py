@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.db.models import Count, IntegerField, Q, Subquery
+
+from .models import ExtractedTask
+
+COLUMNS = ("Open", "Ongoing", "Completed")
+# Fields index.html shows on a task card
+CARD_FIELDS = (
+    "id", "subject", "task_description", "deadline", "priority", "status", "created_at",
+    "email__web_link", "email__subject",
+)
+
+# Read model of the dashboard (index.html): the Open, Ongoing and Completed columns.
+# All three come from one query that joins the email of each task (select_related, so the
+# cards do not query it one by one) and loads only the fields of a card.
+# The Completed column is cut at settings.DASHBOARD_COMPLETED_LIMIT by a LIMIT subquery,
+# and a COUNT subquery of the same statement returns how many completed tasks there are.
+# It returns {"todo_tasks": [...], "ongoing_tasks": [...], "completed_tasks": [...], "completed_total": n}.
+def dashboard_columns(user, completed_limit=None):
+    if completed_limit is None:
+        completed_limit = settings.DASHBOARD_COMPLETED_LIMIT
+    actionable_tasks = (
+        ExtractedTask.objects
+        .filter(user=user)
+        .filter(Q(email__is_actionable=True) | Q(email__isnull=True))
+    )
+    completed = actionable_tasks.filter(status="Completed")
+    first_completed = (
+        completed.order_by("priority_rank", "deadline", "-created_at")
+        .values("pk")[:completed_limit]
+    )
+    completed_total = completed.order_by().values("user").annotate(total=Count("pk")).values("total")
+
+    tasks = (
+        actionable_tasks
+        .filter(Q(status__in=["Open", "Ongoing"]) | Q(pk__in=Subquery(first_completed)))
+        .select_related("email")
+        .only(*CARD_FIELDS)
+        .annotate(completed_total=Subquery(completed_total, output_field=IntegerField()))
+        .order_by("priority_rank", "deadline", "-created_at")
+    )
+
+    columns = {status: [] for status in COLUMNS}
+    total = 0
+    for task in tasks:
+        columns[task.status].append(task)
+        total = task.completed_total or 0
+    return {
+        "todo_tasks": columns["Open"],
+        "ongoing_tasks": columns["Ongoing"],
+        "completed_tasks": columns["Completed"],
+        "completed_total": total,
+    }
@@ -0,0 +1,271 @@
+import re
+from collections import namedtuple
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from .business_calendar import first_of_next_month, get_calendar
+
+# Deadline engine: finds the dates and times an email body mentions and ranks them.
+# One compiled scanner collects every candidate in a single pass over the start of the body
+# (settings.DEADLINE_SCAN_CHARS, quoted replies cut off), times like "3 PM" or "EOD" are
+# attached to the nearest date, and every candidate gets a confidence score.
+# Relative expressions ("tomorrow", "in 3 days", "next Friday") are resolved here,
+# without dateutil's fuzzy parsing, on the business calendar of the user (business_calendar.py).
+
+# Time used when a date does not come with one
+DEFAULT_HOUR = 10
+# Time used for "EOD", "end of the week", "tonight", ...
+END_OF_DAY_HOUR = 18
+# Characters between a date and a time that still belong together ("Thursday EOD",
+# "tomorrow's standup to 10:30am")
+TIME_ATTACH_GAP = 30
+# Characters before a candidate searched for a cue like "by" or "due"
+CUE_WINDOW = 25
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+WEEKDAYS = {
+    "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3,
+    "friday": 4, "saturday": 5, "sunday": 6,
+}
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+
+MONTH = r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+ORDINAL = r"(?:st|nd|rd|th)?"
+
+# Every alternative starts at a word boundary, and a lookahead on the first character
+# skips the alternatives that cannot match there, which keeps the single pass cheap
+SCANNER = re.compile(rf"""
+  \b(?:
+    (?=\d)(?:
+        (?P<iso>(?P<iso_y>\d{{4}})[/.-](?P<iso_m>\d{{1,2}})[/.-](?P<iso_d>\d{{1,2}})\b)
+      | (?P<us>(?P<us_m>\d{{1,2}})[/.-](?P<us_d>\d{{1,2}})[/.-](?P<us_y>\d{{4}})\b)
+      | (?P<md>(?<![\d./])(?P<md_m>\d{{1,2}})/(?P<md_d>\d{{1,2}})(?![\d/]))
+      | (?P<dmy>(?P<dmy_d>\d{{1,2}}){ORDINAL}\s+(?:of\s+)?(?P<dmy_mon>{MONTH})\b\.?(?:,?\s*(?P<dmy_y>\d{{4}})\b)?)
+      | (?P<time>(?P<t_h>\d{{1,2}})(?::(?P<t_m>\d{{2}}))?\s*(?P<t_ampm>[ap])\.?m\b\.?
+          | (?P<t24_h>\d{{1,2}}):(?P<t24_m>\d{{2}})\b)
+    )
+  | (?=[acdefijmnostw])(?:
+        (?P<mdy>(?P<mdy_mon>{MONTH})\.?\s+(?P<mdy_d>\d{{1,2}}){ORDINAL}\b(?:,?\s*(?P<mdy_y>\d{{4}})\b)?)
+      | (?P<ord>the\s+(?P<ord_d>\d{{1,2}})(?:st|nd|rd|th)\b)
+      | (?P<within>(?:in|within)\s+(?P<within_n>\d{{1,2}}|{"|".join(NUMBER_WORDS)})\s+(?:(?:business|working)\s+)?(?P<within_unit>days?|weeks?)\b)
+      | (?P<eo>(?:end\s+of\s+(?:the\s+)?(?:(?:business|working)\s+)?(?P<eo_unit>day|week|month)|eod|cob|close\s+of\s+business|eow|eom)\b)
+      | (?P<rel>(?P<rel_word>today|tonight|tomorrow|next\s+week|next\s+month|this\s+week)\b)
+      | (?P<wd>(?:(?P<wd_prefix>next|this|coming)\s+)?(?P<wd_day>{"|".join(WEEKDAYS)})\b)
+      | (?P<noon>noon|midday)\b
+    )
+  )
+""", re.IGNORECASE | re.VERBOSE)
+
+CUE_RE = re.compile(r"\b(?:by|before|due|deadline|until|till|no later than)\b", re.IGNORECASE)
+# Start of the quoted thread of a reply or forward
+QUOTE_RE = re.compile(
+    r"^(?:-{2,}\s*original message\s*-{2,}|from:\s.+|on .+ wrote:|>)", re.IGNORECASE | re.MULTILINE
+)
+
+# Base confidence of each kind of candidate. Cues, attached times and dates in the past adjust it.
+CONFIDENCE = {
+    "full_date": 0.9,   # 2025/06/06, 06/24/2025, June 6, 2025
+    "day_month": 0.8,   # June 6, 5/30, the 15th
+    "relative": 0.75,   # today, tomorrow, in 3 days, end of the week
+    "weekday": 0.7,     # Friday, next Wednesday
+    "vague": 0.5,       # next week, next month, this week
+    "time": 0.4,        # 4pm, EOD (today)
+}
+CUE_BONUS = 0.15
+TIME_BONUS = 0.05
+PAST_PENALTY = 0.4
+
+Candidate = namedtuple("Candidate", ["deadline", "confidence", "kind", "text", "start", "end"])
+
+# This function returns the part of the body the scanner looks at:
+# the text before the quoted thread, bounded to settings.DEADLINE_SCAN_CHARS
+def scan_window(text):
+    text = text[:settings.DEADLINE_SCAN_CHARS]
+    quote = QUOTE_RE.search(text)
+    return text[:quote.start()] if quote and quote.start() > 0 else text
+
+def _local_now(sent_date, tz):
+    now = sent_date or timezone.now()
+    if timezone.is_naive(now):
+        # Graph's receivedDateTime is UTC (see views.parse_iso_datetime)
+        now = now.replace(tzinfo=dt_timezone.utc)
+    return now.astimezone(tz)
+
+def _date(year, month, day):
+    try:
+        value = datetime(year, month, day).date()
+    except ValueError:
+        return None
+    return value if value.year >= 2000 else None
+
+# A date without a year is in the sent date's year, or the next one when that would be
+# more than a month in the past ("by Jan 5" sent in December)
+def _date_without_year(today, month, day):
+    value = _date(today.year, month, day)
+    if value and value < today - timedelta(days=30):
+        value = _date(today.year + 1, month, day)
+    return value
+
+def _weekday(today, weekday, prefix):
+    days_ahead = (weekday - today.weekday() + 7) % 7
+    if days_ahead == 0 and prefix != "this":
+        days_ahead = 7
+    return today + timedelta(days=days_ahead)
+
+# "EOD", "COB" and "end of the day" are times, "end of the week/month" are dates
+def _is_time(m):
+    if m.lastgroup in ("time", "noon"):
+        return True
+    if m.lastgroup != "eo":
+        return False
+    return (m["eo_unit"] or "").lower() not in ("week", "month") and m["eo"].lower() not in ("eow", "eom")
+
+# This function turns a date match into (kind, date, default hour), or None for an invalid date
+def _resolve_date(m, today, calendar):
+    group = m.lastgroup
+    if group == "iso":
+        return "full_date", _date(int(m["iso_y"]), int(m["iso_m"]), int(m["iso_d"])), DEFAULT_HOUR
+    if group == "us":
+        # Always US style MM/DD/YYYY
+        return "full_date", _date(int(m["us_y"]), int(m["us_m"]), int(m["us_d"])), DEFAULT_HOUR
+    if group == "md":
+        return "day_month", _date_without_year(today, int(m["md_m"]), int(m["md_d"])), DEFAULT_HOUR
+    if group in ("mdy", "dmy"):
+        month = MONTHS[m[group + "_mon"][:3].lower()]
+        day = int(m[group + "_d"])
+        if m[group + "_y"]:
+            return "full_date", _date(int(m[group + "_y"]), month, day), DEFAULT_HOUR
+        return "day_month", _date_without_year(today, month, day), DEFAULT_HOUR
+    if group == "ord":
+        value = _date(today.year, today.month, int(m["ord_d"]))
+        if value and value < today:
+            first = first_of_next_month(today)
+            value = _date(first.year, first.month, int(m["ord_d"]))
+        return "day_month", value, DEFAULT_HOUR
+    if group == "within":
+        n = m["within_n"].lower()
+        n = NUMBER_WORDS[n] if n in NUMBER_WORDS else int(n)
+        if m["within_unit"].lower().startswith("week"):
+            return "relative", today + timedelta(weeks=n), DEFAULT_HOUR
+        return "relative", calendar.add_business_days(today, n), DEFAULT_HOUR
+    if group == "eo":
+        if (m["eo_unit"] or "").lower() == "week" or m["eo"].lower() == "eow":
+            return "relative", calendar.end_of_week(today), END_OF_DAY_HOUR
+        return "relative", calendar.end_of_month(today), END_OF_DAY_HOUR
+    if group == "rel":
+        word = " ".join(m["rel_word"].lower().split())
+        if word == "today":
+            return "relative", today, DEFAULT_HOUR
+        if word == "tonight":
+            return "relative", today, END_OF_DAY_HOUR
+        if word == "tomorrow":
+            return "relative", calendar.next_business_day(today), DEFAULT_HOUR
+        if word == "next week":
+            return "vague", calendar.start_of_next_week(today), DEFAULT_HOUR
+        if word == "next month":
+            return "vague", calendar.start_of_next_month(today), DEFAULT_HOUR
+        return "vague", calendar.end_of_week(today), END_OF_DAY_HOUR  # this week
+    if group == "wd":
+        prefix = (m["wd_prefix"] or "").lower()
+        return "weekday", _weekday(today, WEEKDAYS[m["wd_day"].lower()], prefix), DEFAULT_HOUR
+    return None
+
+# This function turns a time match (or "EOD") into (hour, minute), or None for an invalid time
+def _resolve_time(m):
+    if m.lastgroup == "eo":
+        return END_OF_DAY_HOUR, 0
+    if m.lastgroup == "noon":
+        return 12, 0
+    if m["t_ampm"]:
+        hour, minute = int(m["t_h"]), int(m["t_m"] or 0)
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if m["t_ampm"].lower() == "p" else 0)
+    else:
+        hour, minute = int(m["t24_h"]), int(m["t24_m"])
+    if hour > 23 or minute > 59:
+        return None
+    return hour, minute
+
+# This function returns every deadline candidate of the text, best first.
+# sent_date is when the email was received (naive values are UTC); relative expressions count from it
+# in business days of calendar (the default business calendar when None).
+def find_deadline_candidates(text, sent_date=None, calendar=None):
+    if not text:
+        return []
+    window = scan_window(text)
+    matches = list(SCANNER.finditer(window))
+    if not matches:
+        return []
+    calendar = calendar or get_calendar()
+    tz = timezone.get_current_timezone()
+    now = _local_now(sent_date, tz)
+    today = now.date()
+
+    # Dates and times in order of appearance
+    dates, times = [], []
+    for m in matches:
+        if _is_time(m):
+            value = _resolve_time(m)
+            if value:
+                times.append((m, value))
+            continue
+        resolved = _resolve_date(m, today, calendar)
+        if resolved and resolved[1]:
+            dates.append([m, resolved, None])
+
+    # Each time goes to the closest date around it that has no time yet,
+    # a time without a date is for the day the email was sent
+    lone_times = []
+    for tm, value in times:
+        best, best_gap = None, TIME_ATTACH_GAP + 1
+        for entry in dates:
+            if entry[2] is not None:
+                continue
+            dm = entry[0]
+            gap = tm.start() - dm.end() if tm.start() >= dm.end() else dm.start() - tm.end()
+            if 0 <= gap < best_gap:
+                best, best_gap = entry, gap
+        if best is not None:
+            best[2] = (tm, value)
+        else:
+            lone_times.append((tm, value))
+
+    candidates = []
+
+    def add(kind, day, hour, minute, start, end, has_time):
+        deadline = datetime.combine(day, time(hour, minute), tzinfo=tz)
+        confidence = CONFIDENCE[kind]
+        if CUE_RE.search(window, max(0, start - CUE_WINDOW), start):
+            confidence += CUE_BONUS
+        if has_time and kind != "time":
+            confidence += TIME_BONUS
+        if deadline < now:
+            confidence -= PAST_PENALTY
+        candidates.append(Candidate(deadline, round(min(confidence, 1.0), 2), kind, window[start:end], start, end))
+
+    for m, (kind, day, hour), attached in dates:
+        minute = 0
+        start, end = m.start(), m.end()
+        if attached:
+            tm, (hour, minute) = attached
+            start, end = min(start, tm.start()), max(end, tm.end())
+        add(kind, day, hour, minute, start, end, attached is not None)
+    for tm, (hour, minute) in lone_times:
+        add("time", today, hour, minute, tm.start(), tm.end(), True)
+
+    candidates.sort(key=lambda c: (-c.confidence, c.start))
+    return candidates
+
+# This function returns the most likely deadline of the text, or None
+def extract_deadline(text, sent_date=None, calendar=None):
+    candidates = find_deadline_candidates(text, sent_date, calendar)
+    return candidates[0].deadline if candidates else None
@@ -0,0 +1,221 @@
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Shared Microsoft Graph HTTP client. Every Graph call of the app goes through request(),
+# which reuses pooled keep-alive connections, retries throttled (429) and unavailable
+# (502/503/504) responses with Retry-After or exponential backoff, and limits the number
+# of concurrent calls of the process (see AdaptiveLimiter).
+GRAPH_URL = "https://graph.microsoft.com/v1.0"
+GRAPH_BATCH_LIMIT = 20
+RETRY_STATUSES = (429, 502, 503, 504)
+THROTTLE_STATUSES = (429, 503)
+
+# This class is an AIMD concurrency limit shared by all Graph calls of the process.
+# A throttled response halves the limit and pauses new calls until Retry-After has passed,
+# every run of successful responses raises it by one, up to GRAPH_MAX_CONCURRENCY.
+class AdaptiveLimiter:
+    def __init__(self, max_limit):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.active = 0
+        self.successes = 0
+        self.paused_until = 0.0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause > 0:
+                    self.condition.wait(pause)
+                elif self.active >= self.limit:
+                    self.condition.wait()
+                else:
+                    break
+            self.active += 1
+
+    def release(self):
+        with self.condition:
+            self.active -= 1
+            self.condition.notify_all()
+
+    def on_success(self):
+        with self.condition:
+            self.successes += 1
+            if self.successes >= self.limit and self.limit < self.max_limit:
+                self.limit += 1
+                self.successes = 0
+                self.condition.notify_all()
+
+    def on_throttle(self, retry_after):
+        with self.condition:
+            # Calls throttled during the same pause count as one signal
+            if time.monotonic() >= self.paused_until:
+                self.limit = max(1, self.limit // 2)
+            self.successes = 0
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+        logger.warning(f"Graph throttled the app, concurrency limit is now {self.limit}, pausing {retry_after:.1f}s")
+
+_state_lock = threading.Lock()
+_state = {"pid": None, "session": None, "limiter": None}
+
+# Sessions are not shared across forked processes, the pool is rebuilt in a new process.
+def get_session():
+    with _state_lock:
+        if _state["pid"] != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=settings.GRAPH_POOL_SIZE,
+            )
+            session.mount("https://", adapter)
+            _state.update(pid=os.getpid(), session=session, limiter=AdaptiveLimiter(settings.GRAPH_MAX_CONCURRENCY))
+        return _state["session"]
+
+def get_limiter():
+    get_session()
+    return _state["limiter"]
+
+def _absolute_url(url):
+    return url if url.startswith("https://") else GRAPH_URL + url
+
+# This function returns the number of seconds to wait before retrying.
+# Retry-After may be delta-seconds or an HTTP date; without it the delay backs off exponentially with jitter.
+def retry_delay(retry_after, attempt):
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    delay = min(settings.GRAPH_BACKOFF_MAX, settings.GRAPH_BACKOFF_BASE * 2 ** attempt)
+    return delay * random.uniform(0.5, 1.0)
+
+# This function sends a Graph request and returns the final response.
+# url is either absolute (e.g. an @odata.nextLink) or relative to /v1.0, like "/me/messages".
+# Callers still check the status code: the last response is returned once retries run out.
+# Connection errors are retried too and re-raised when the last attempt fails.
+def request(method, url, access_token, json=None, headers=None, max_retries=None):
+    session = get_session()
+    limiter = get_limiter()
+    if max_retries is None:
+        max_retries = settings.GRAPH_MAX_RETRIES
+    all_headers = {"Authorization": f"Bearer {access_token}"}
+    if headers:
+        all_headers.update(headers)
+
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        try:
+            resp = session.request(
+                method, _absolute_url(url), json=json, headers=all_headers, timeout=settings.GRAPH_TIMEOUT
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == max_retries:
+                raise
+            delay = retry_delay(None, attempt)
+            logger.warning(f"Graph {method} {url} failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        finally:
+            limiter.release()
+
+        if resp.status_code not in RETRY_STATUSES:
+            limiter.on_success()
+            return resp
+        if attempt == max_retries:
+            logger.warning(f"Graph {method} {url} still failing with {resp.status_code} after {max_retries} retries")
+            return resp
+        delay = retry_delay(resp.headers.get("Retry-After"), attempt)
+        if resp.status_code in THROTTLE_STATUSES:
+            limiter.on_throttle(delay)
+        else:
+            time.sleep(delay)
+    return resp
+
+def get(url, access_token, **kwargs):
+    return request("GET", url, access_token, **kwargs)
+
+def post(url, access_token, json=None, **kwargs):
+    return request("POST", url, access_token, json=json, **kwargs)
+
+def patch(url, access_token, json=None, **kwargs):
+    return request("PATCH", url, access_token, json=json, **kwargs)
+
+def delete(url, access_token, **kwargs):
+    return request("DELETE", url, access_token, **kwargs)
+
+# This function follows @odata.nextLink and yields every item of a collection.
+# It stops at the first page that fails, like the sync always did.
+def get_all(url, access_token, headers=None):
+    while url:
+        resp = get(url, access_token, headers=headers)
+        if resp.status_code != 200:
+            logger.warning(f"Graph GET {url} failed: {resp.status_code} {resp.text}")
+            return
+        data = resp.json()
+        yield from data.get("value", [])
+        url = data.get("@odata.nextLink")
+
+# This function sends up to 20 sub-requests as one $batch and retries the sub-requests that
+# were throttled or unavailable, waiting for the longest Retry-After of the round.
+# It returns the sub-responses in the order of sub_requests; a sub-request whose whole batch
+# failed gets {"status": <batch status>, "body": None}.
+def _send_batch(sub_requests, access_token, max_retries):
+    results = [None] * len(sub_requests)
+    pending = list(range(len(sub_requests)))
+    for attempt in range(max_retries + 1):
+        payload = {"requests": [dict(sub_requests[i], id=str(i)) for i in pending]}
+        resp = post("/$batch", access_token, json=payload, headers={"Content-Type": "application/json"})
+        if resp.status_code != 200:
+            logger.warning(f"Graph $batch failed: {resp.status_code} {resp.text}")
+            for i in pending:
+                results[i] = {"status": resp.status_code, "headers": {}, "body": None}
+            return results
+
+        retry, retry_after = [], 0.0
+        for sub in resp.json().get("responses", []):
+            i = int(sub["id"])
+            results[i] = sub
+            if sub.get("status") in RETRY_STATUSES and attempt < max_retries:
+                retry.append(i)
+                headers = sub.get("headers") or {}
+                retry_after = max(retry_after, retry_delay(headers.get("Retry-After"), attempt))
+        if not retry:
+            break
+        if any(results[i]["status"] in THROTTLE_STATUSES for i in retry):
+            get_limiter().on_throttle(retry_after)
+        else:
+            time.sleep(retry_after)
+        pending = sorted(retry)
+    return [sub or {"status": None, "headers": {}, "body": None} for sub in results]
+
+# This function sends any number of sub-requests ({"method", "url", optional "headers"/"body"})
+# through $batch, 20 per call and up to max_workers calls in flight. The process-wide limiter
+# caps the effective concurrency further while Graph is throttling.
+# It returns the sub-responses ({"status", "headers", "body"}) in the order of sub_requests.
+def batch(sub_requests, access_token, max_workers=1, max_retries=None):
+    if max_retries is None:
+        max_retries = settings.GRAPH_MAX_RETRIES
+    sub_requests = list(sub_requests)
+    chunks = [sub_requests[i:i + GRAPH_BATCH_LIMIT] for i in range(0, len(sub_requests), GRAPH_BATCH_LIMIT)]
+    if not chunks:
+        return []
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+        for chunk_results in pool.map(lambda chunk: _send_batch(chunk, access_token, max_retries), chunks):
+            results.extend(chunk_results)
+    return results
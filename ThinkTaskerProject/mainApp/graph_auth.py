@@ -0,0 +1,64 @@
+import base64
+import hashlib
+
+import msal
+from cryptography.fernet import Fernet, InvalidToken
+from django.conf import settings
+
+def build_msal_app(cache=None):
+    return msal.ConfidentialClientApplication(
+        client_id = settings.GRAPH_CLIENT_ID,
+        client_credential = settings.GRAPH_CLIENT_SECRET,
+        authority = settings.GRAPH_AUTHORITY,
+        token_cache = cache
+    )
+
+# Background jobs run without a browser session, so the MSAL token cache of each user
+# (access and refresh tokens) is kept on ThinkTaskerUser.graph_token_cache, encrypted with a
+# Fernet key derived from settings.GRAPH_TOKEN_CACHE_KEY. It is cleared when the user logs out.
+def _fernet():
+    digest = hashlib.sha256(("graph-token-cache:" + settings.GRAPH_TOKEN_CACHE_KEY).encode("utf-8")).digest()
+    return Fernet(base64.urlsafe_b64encode(digest))
+
+def encrypt_token_cache(serialized):
+    return _fernet().encrypt(serialized.encode("utf-8")).decode("ascii")
+
+# This function returns the serialized cache, or "" when it cannot be decrypted
+# (e.g. after the key changed), in which case the user has to sign in again.
+def decrypt_token_cache(stored):
+    try:
+        return _fernet().decrypt(stored.encode("ascii")).decode("utf-8")
+    except (InvalidToken, UnicodeEncodeError):
+        return ""
+
+def load_token_cache(user):
+    cache = msal.SerializableTokenCache()
+    serialized = decrypt_token_cache(user.graph_token_cache) if user.graph_token_cache else ""
+    if serialized:
+        cache.deserialize(serialized)
+    return cache
+
+def save_token_cache(user, cache):
+    if cache.has_state_changed:
+        user.graph_token_cache = encrypt_token_cache(cache.serialize())
+        user.save(update_fields=["graph_token_cache"])
+
+def clear_token_cache(user):
+    # _meta.model and not type(user): at logout user is the request's lazy user object
+    user._meta.model.objects.filter(pk=user.pk).update(graph_token_cache="")
+    user.graph_token_cache = ""
+
+# This function returns a valid Graph access token for a user outside of a request,
+# refreshing it silently from the stored token cache when needed.
+# It returns None if the user has to sign in again.
+def get_user_access_token(user):
+    cache = load_token_cache(user)
+    msal_app = build_msal_app(cache)
+    accounts = msal_app.get_accounts()
+    if not accounts:
+        return None
+    result = msal_app.acquire_token_silent(settings.GRAPH_SCOPE, account=accounts[0])
+    save_token_cache(user, cache)
+    if result and "access_token" in result:
+        return result["access_token"]
+    return None
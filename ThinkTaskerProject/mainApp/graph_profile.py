@@ -0,0 +1,55 @@
+import logging
+import time
+
+import requests
+from django.conf import settings
+
+from . import graph
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY = "graph_profile"
+
+# The signed-in user's Graph profile (/me) is cached in their session, which is stored in
+# the database, so rendering a page does not call Graph. The cache is filled at login and
+# revalidated with its ETag once it is older than GRAPH_PROFILE_TTL seconds.
+
+def store_profile(request, profile, etag=None):
+    request.session[SESSION_KEY] = {"profile": profile, "etag": etag, "fetched_at": time.time()}
+
+# This function fetches /me. With an etag Graph answers 304 Not Modified when the profile did not change.
+def fetch_profile(access_token, etag=None, max_retries=None):
+    headers = {"If-None-Match": etag} if etag else None
+    return graph.get("/me", access_token, headers=headers, max_retries=max_retries)
+
+def _etag(resp, profile):
+    return resp.headers.get("ETag") or profile.get("@odata.etag")
+
+# This function returns the cached profile of the signed-in user, revalidating it when it expired.
+# A stale profile is returned when Graph cannot be reached; None if there is no profile at all.
+def get_profile(request, max_retries=None):
+    cached = request.session.get(SESSION_KEY)
+    if cached and time.time() - cached["fetched_at"] < settings.GRAPH_PROFILE_TTL:
+        return cached["profile"]
+    token = request.session.get("graph_token")
+    if not token:
+        return cached["profile"] if cached else None
+
+    try:
+        resp = fetch_profile(token["access_token"], cached["etag"] if cached else None, max_retries)
+    except requests.RequestException as e:
+        logger.warning(f"Graph profile revalidation failed: {e}")
+        return cached["profile"] if cached else None
+    if resp.status_code == 304 and cached:
+        store_profile(request, cached["profile"], cached["etag"])
+        return cached["profile"]
+    if resp.status_code == 200:
+        profile = resp.json()
+        store_profile(request, profile, _etag(resp, profile))
+        return profile
+    return cached["profile"] if cached else None
+
+# This function caches the profile fetched during sign-in.
+def store_login_profile(request, resp):
+    profile = resp.json()
+    store_profile(request, profile, _etag(resp, profile))
@@ -0,0 +1,139 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import BackgroundJob
+from . import graph_auth
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# Jobs left "running" by a worker that died (started more than JOB_RUNNING_TIMEOUT ago)
+# are marked failed rather than queued again, a job that killed its worker would do it again.
+def fail_stale_jobs():
+    stale = BackgroundJob.objects.filter(
+        status="running", started_at__lt=timezone.now() - timedelta(seconds=settings.JOB_RUNNING_TIMEOUT)
+    )
+    count = stale.update(
+        status="failed", stage="failed", finished_at=timezone.now(),
+        message="The sync worker stopped before finishing. Please try again.",
+    )
+    if count:
+        logger.warning(f"Marked {count} stale running job(s) as failed")
+    return count
+
+# This function queues a job for a user, or returns the job of the same kind that is
+# already queued or running so repeated clicks do not pile up.
+def enqueue_job(user, kind="mail_sync"):
+    fail_stale_jobs()
+    job = (
+        BackgroundJob.objects
+        .filter(user=user, kind=kind, status__in=ACTIVE_STATUSES)
+        .order_by("-created_at")
+        .first()
+    )
+    if job:
+        return job
+    return BackgroundJob.objects.create(user=user, kind=kind)
+
+# This function atomically claims the oldest queued job. The conditional UPDATE makes sure
+# only one worker (thread or process) gets a given job, without relying on row locks.
+def claim_next_job():
+    fail_stale_jobs()
+    for job in BackgroundJob.objects.filter(status="queued").order_by("created_at")[:10]:
+        claimed = BackgroundJob.objects.filter(pk=job.pk, status="queued").update(
+            status="running", stage="starting", started_at=timezone.now()
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+def update_job(job, **fields):
+    for name, value in fields.items():
+        setattr(job, name, value)
+    BackgroundJob.objects.filter(pk=job.pk).update(**fields)
+
+# Progress callback of a job. A new stage is written right away, counts at most every
+# JOB_PROGRESS_INTERVAL seconds (a sync reports every email, one UPDATE each would cost
+# a commit per email); flush() writes the counts still pending.
+class _ProgressReporter:
+    def __init__(self, job):
+        self.job = job
+        self.pending = {}
+        self.written_at = 0.0
+
+    def __call__(self, stage, **counts):
+        self.pending.update(counts)
+        if stage != self.job.stage:
+            self.pending["stage"] = stage
+        elif time.monotonic() - self.written_at < settings.JOB_PROGRESS_INTERVAL:
+            return
+        self.flush()
+
+    def flush(self):
+        if self.pending:
+            update_job(self.job, **self.pending)
+            self.pending = {}
+        self.written_at = time.monotonic()
+
+def _progress_reporter(job):
+    job.progress = _ProgressReporter(job)
+    return job.progress
+
+def run_mail_sync_job(job):
+    from .sync import run_mail_sync
+
+    access_token = graph_auth.get_user_access_token(job.user)
+    if not access_token:
+        raise RuntimeError("Microsoft sign-in expired. Please log in again and retry the sync.")
+    return run_mail_sync(job.user, access_token, progress=_progress_reporter(job))
+
+def run_todo_reconcile_job(job):
+    from .todo_sync import run_todo_reconcile
+
+    access_token = graph_auth.get_user_access_token(job.user)
+    if not access_token:
+        raise RuntimeError("Microsoft sign-in expired. Please log in again to refresh your To Do tasks.")
+    return run_todo_reconcile(job.user, access_token, progress=_progress_reporter(job))
+
+JOB_HANDLERS = {
+    "mail_sync": run_mail_sync_job,
+    "todo_reconcile": run_todo_reconcile_job,
+}
+
+def _flush_progress(job):
+    progress = getattr(job, "progress", None)
+    if progress:
+        progress.flush()
+
+# This function executes a claimed job and records its outcome.
+def run_job(job):
+    handler = JOB_HANDLERS[job.kind]
+    try:
+        message = handler(job)
+    except Exception as e:
+        logger.exception(f"Background job {job.pk} ({job.kind}) failed")
+        _flush_progress(job)
+        update_job(job, status="failed", stage="failed", message=str(e), finished_at=timezone.now())
+        return False
+    _flush_progress(job)
+    update_job(job, status="done", stage="done", message=message or "", finished_at=timezone.now())
+    return True
+
+def job_status(job):
+    return {
+        "id": job.pk,
+        "kind": job.kind,
+        "status": job.status,
+        "stage": job.stage,
+        "total": job.total_count,
+        "processed": job.processed_count,
+        "created": job.created_count,
+        "message": job.message,
+        "finished": job.status not in ACTIVE_STATUSES,
+    }
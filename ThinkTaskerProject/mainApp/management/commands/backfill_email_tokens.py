@@ -0,0 +1,63 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from mainApp.models import ProcessedEmail
+from mainApp.nlp import clean_many
+from mainApp.term_stats import document_text
+
+class Command(BaseCommand):
+    help = (
+        "Fill ProcessedEmail.tokens for emails saved before the column existed. "
+        "Rows are tokenized in chunks by a process pool and written back with bulk_update."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500, help="Emails per chunk")
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 1,
+            help="Tokenizer processes (1 tokenizes in this process)",
+        )
+        parser.add_argument(
+            "--all", action="store_true",
+            help="Tokenize every email again, not only the ones without tokens",
+        )
+
+    def handle(self, *args, **options):
+        queryset = ProcessedEmail.objects.all() if options["all"] else ProcessedEmail.objects.filter(tokens=[])
+        pks = list(queryset.order_by("pk").values_list("pk", flat=True))
+        chunk_size = options["chunk_size"]
+        chunks = [pks[i:i + chunk_size] for i in range(0, len(pks), chunk_size)]
+        start = time.perf_counter()
+        done = 0
+
+        # The NLP work runs in the pool, loading rows and writing them back stays in this process.
+        # A chunk is submitted as soon as it is loaded, while the pool works on the previous ones.
+        pool = ProcessPoolExecutor(max_workers=options["workers"]) if options["workers"] > 1 else None
+        try:
+            pending = []
+            for chunk in chunks:
+                emails = list(ProcessedEmail.objects.filter(pk__in=chunk).only("pk", "subject", "body_preview"))
+                texts = [document_text(email) for email in emails]
+                pending.append((emails, pool.submit(clean_many, texts) if pool else None, texts))
+                if len(pending) > options["workers"]:
+                    done += self.save_chunk(*pending.pop(0))
+            for item in pending:
+                done += self.save_chunk(*item)
+        finally:
+            if pool:
+                pool.shutdown()
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f"Tokenized {done} emails in {elapsed:.1f}s."))
+
+    def save_chunk(self, emails, future, texts):
+        token_lists = future.result() if future else clean_many(texts)
+        for email, tokens in zip(emails, token_lists):
+            email.tokens = tokens
+        # bulk_update skips the save signals: the tokens are exactly what the term
+        # statistics were computed from, so they do not change
+        ProcessedEmail.objects.bulk_update(emails, ["tokens"])
+        return len(emails)
@@ -0,0 +1,63 @@
+import random
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from mainApp.business_calendar import BusinessCalendar, get_calendar
+
+# add_weekdays as it was before mainApp/business_calendar.py, kept as the baseline
+def add_weekdays(start, days):
+    current = start
+    added = 0
+    while added < days:
+        current += timedelta(days=1)
+        if current.weekday() < 5:
+            added += 1
+    return current
+
+class Command(BaseCommand):
+    help = (
+        "Bulk rescheduling micro-benchmark: moving task dates by a number of working days with the old "
+        "day-by-day add_weekdays loop vs the business calendar (per date and vectorized)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=10000, help="Dates to move")
+        parser.add_argument("--max-offset", type=int, default=60, help="Largest offset in working days")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        start = date(2025, 1, 1)
+        days = [start + timedelta(days=rng.randrange(730)) for _ in range(options["tasks"])]
+        offsets = [rng.randint(1, options["max_offset"]) for _ in days]
+
+        timings = {}
+        begin = time.perf_counter()
+        legacy = [add_weekdays(day, n) for day, n in zip(days, offsets)]
+        timings["legacy add_weekdays loop"] = time.perf_counter() - begin
+
+        # Without holidays the calendar must agree with the old loop
+        weekdays_only = BusinessCalendar(weekmask="1111100", holidays=())
+        begin = time.perf_counter()
+        single = [weekdays_only.add_business_days(day, n) for day, n in zip(days, offsets)]
+        timings["add_business_days per date"] = time.perf_counter() - begin
+
+        begin = time.perf_counter()
+        many = weekdays_only.add_business_days_many(days, offsets)
+        timings["add_business_days_many"] = time.perf_counter() - begin
+
+        mismatches = sum(1 for a, b in zip(legacy, single) if a != b)
+        mismatches += int(np.count_nonzero(many != np.array(legacy, dtype="datetime64[D]")))
+
+        calendar = get_calendar()
+        begin = time.perf_counter()
+        calendar.add_business_days_many(days, offsets)
+        timings["add_business_days_many with holidays"] = time.perf_counter() - begin
+
+        self.stdout.write(f"dates={len(days)} offsets 1..{options['max_offset']} mismatches vs legacy={mismatches}")
+        baseline = timings["legacy add_weekdays loop"]
+        for name, elapsed in timings.items():
+            self.stdout.write(f"{name:>38}: {elapsed * 1000:9.2f} ms  ({baseline / elapsed:7.1f}x)")
@@ -0,0 +1,101 @@
+import random
+import time
+
+from django.contrib.messages.storage import default_storage
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
+from mainApp.dashboard import dashboard_columns
+from mainApp.models import ExtractedTask, ProcessedEmail, ThinkTaskerUser, priority_order
+
+PRIORITIES = ["Urgent", "Important", "Medium", "Low"]
+
+# The dashboard context as index built it before mainApp/dashboard.py, kept as the baseline
+def legacy_dashboard_columns(user):
+    actionable_tasks = (
+        ExtractedTask.objects
+        .filter(user=user)
+        .filter(Q(email__is_actionable=True) | Q(email__isnull=True))
+        .order_by(priority_order, 'deadline', '-created_at')
+        .distinct()
+    )
+    return {
+        "todo_tasks": actionable_tasks.filter(status="Open"),
+        "ongoing_tasks": actionable_tasks.filter(status="Ongoing"),
+        "completed_tasks": actionable_tasks.filter(status="Completed"),
+    }
+
+class Command(BaseCommand):
+    help = (
+        "Query count and latency of rendering the dashboard (index.html) for a user with many tasks: "
+        "the old three querysets vs dashboard.dashboard_columns. Runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=50000, help="Tasks of the user")
+        parser.add_argument("--open", type=int, default=300, help="Open tasks among them")
+        parser.add_argument("--ongoing", type=int, default=100, help="Ongoing tasks among them")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self.build_tasks(options)
+            request = RequestFactory().get("/dashboard/")
+            request.user = user
+            request.session = SessionStore()
+            request._messages = default_storage(request)
+
+            self.stdout.write(
+                f"tasks={options['tasks']} (open={options['open']}, ongoing={options['ongoing']}, "
+                f"completed={options['tasks'] - options['open'] - options['ongoing']})"
+            )
+            for name, columns in (("legacy", legacy_dashboard_columns), ("dashboard", dashboard_columns)):
+                queries = []
+                # Counted with a wrapper, the debug query log only keeps the last 9000
+                with connection.execute_wrapper(lambda execute, sql, *rest: queries.append(sql) or execute(sql, *rest)):
+                    start = time.perf_counter()
+                    context = columns(user)
+                    html = render_to_string("index.html", context, request=request)
+                    elapsed = time.perf_counter() - start
+                cards = html.count('class="task-card')
+                self.stdout.write(
+                    f"{name:>10}: {elapsed * 1000:9.1f} ms  {len(queries):6d} queries  "
+                    f"{cards:6d} cards"
+                )
+            transaction.set_rollback(True)
+
+    def build_tasks(self, options):
+        rng = random.Random(options["seed"])
+        user = ThinkTaskerUser.objects.create(username=f"benchmark-dashboard-{rng.random()}")
+        # Four out of five tasks come from an email
+        emails = ProcessedEmail.objects.bulk_create([
+            ProcessedEmail(
+                user=user,
+                message_id=f"benchmark-dashboard-{user.pk}-{i}",
+                subject=f"Email {i}",
+                body_preview="",
+                is_actionable=True,
+                web_link=f"https://outlook.office.com/mail/{i}",
+            )
+            for i in range(options["tasks"] * 4 // 5)
+        ], batch_size=2000)
+        statuses = (
+            ["Open"] * options["open"] + ["Ongoing"] * options["ongoing"]
+            + ["Completed"] * (options["tasks"] - options["open"] - options["ongoing"])
+        )
+        ExtractedTask.objects.bulk_create([
+            ExtractedTask(
+                user=user,
+                email=emails[i] if i < len(emails) else None,
+                subject=f"Task {i}",
+                task_description="Review the attached document and send feedback.",
+                priority=rng.choice(PRIORITIES),
+                status=status,
+            )
+            for i, status in enumerate(statuses)
+        ], batch_size=2000)
+        return user
@@ -0,0 +1,153 @@
+import calendar
+import json
+import re
+import time
+from datetime import datetime, timedelta
+
+import dateutil.parser
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from mainApp import deadlines
+from mainApp.business_calendar import first_of_next_month
+
+# Quoted history appended to every email for the long thread run
+THREAD_REPLY = (
+    "\n\nOn Mon, May 12, 2025 at 9:00 AM Aiko wrote:\n"
+    "> The kickoff is on 2025-05-20 at 9:00, please review the plan by May 16.\n"
+    "> The previous build was due May 15, 2025 and the next one in 3 days.\n"
+)
+
+# Markup and disclaimer of a long HTML email, wrapped around every email for the HTML run
+HTML_HEAD = "<html><head><style>" + "p.MsoNormal { margin: 0cm; font-size: 11pt; font-family: Calibri, sans-serif; } " * 40 + "</style></head><body><div class=WordSection1><p class=MsoNormal>"
+HTML_TAIL = "</p></div><p style='font-size:8pt;color:#888'>" + (
+    "This email and any attachments are confidential and intended solely for the addressee. "
+    "If you have received it in error, please notify the sender and delete it from your system. "
+) * 60 + "</p></body></html>"
+
+# add_weekdays as it was before mainApp/business_calendar.py
+def add_weekdays(start, days):
+    current = start
+    added = 0
+    while added < days:
+        current += timedelta(days=1)
+        if current.weekday() < 5:
+            added += 1
+    return current
+
+# extract_deadline as it was before mainApp/deadlines.py, kept as the baseline
+def legacy_extract_deadline(text, sent_date=None):
+    patterns = [
+        r'\bby ([A-Za-z]+\s\d{1,2}(?:,\s*\d{4})?)',
+        r'\bon ([A-Za-z]+\s\d{1,2}(?:,\s*\d{4})?)',
+        r'\bin (\d+) days?',
+        r'\b(tomorrow|today|now|next week|next month|next [A-Za-z]+)\b',
+        r'(\d{4}[\/.-]\d{1,2}[\/.-]\d{1,2})',
+        r'(\d{1,2}[\/.-]\d{1,2}[\/.-]\d{4})',
+        r'(\d{1,2}:\d{2}(?: ?[APMapm]{2})?)',
+        r'(\d{1,2} [A-Za-z]+ \d{4})',
+        r'([A-Za-z]+ \d{1,2},? \d{4})',
+    ]
+    now = sent_date if sent_date else timezone.now()
+    base_hour = 10
+
+    for pattern in patterns:
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            date_str = match.group(1) if match.groups() else match.group(0)
+            date_str = date_str.strip()
+            try:
+                deadline = dateutil.parser.parse(date_str, default=now, fuzzy=True, dayfirst=False)
+                if timezone.is_naive(deadline):
+                    deadline = timezone.make_aware(deadline, timezone.get_current_timezone())
+                deadline = deadline.replace(second=0, microsecond=0)
+                if 'AM' not in date_str.upper() and 'PM' not in date_str.upper() and deadline.hour == 0:
+                    deadline = deadline.replace(hour=base_hour, minute=0)
+                if deadline.year < 2000:
+                    continue
+                return deadline
+            except Exception:
+                pass
+
+            lc = date_str.lower()
+            if 'today' in lc or 'now' in lc:
+                return now.replace(hour=base_hour, minute=0, second=0, microsecond=0)
+            elif 'tomorrow' in lc:
+                return add_weekdays(now, 1).replace(hour=base_hour, minute=0, second=0, microsecond=0)
+            elif 'days' in lc:
+                days = int(re.findall(r'\d+', date_str)[0])
+                return add_weekdays(now, days).replace(hour=base_hour, minute=0, second=0, microsecond=0)
+            elif 'next week' in lc:
+                days_ahead = (0 - now.weekday() + 7) % 7 or 7
+                return (now + timedelta(days=days_ahead)).replace(hour=base_hour, minute=0, second=0, microsecond=0)
+            elif 'next month' in lc:
+                return first_of_next_month(now).replace(hour=base_hour, minute=0, second=0, microsecond=0)
+            elif pattern.startswith('next ([A-Za-z]+)'):
+                weekday_str = match.group(1)
+                weekdays = {day.lower(): i for i, day in enumerate(calendar.day_name)}
+                if weekday_str.lower() in weekdays:
+                    days_ahead = (weekdays[weekday_str.lower()] - now.weekday() + 7) % 7 or 7
+                    return (now + timedelta(days=days_ahead)).replace(hour=base_hour, minute=0, second=0, microsecond=0)
+    return None
+
+class Command(BaseCommand):
+    help = (
+        "Accuracy and throughput of deadline extraction on the labelled emails of deadline_benchmark.jsonl: "
+        "the old extract_deadline (dateutil fuzzy parsing) vs mainApp/deadlines.py"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=200, help="Passes over the emails for the throughput runs")
+        parser.add_argument("--thread-replies", type=int, default=50,
+                            help="Quoted replies appended to every email for the long thread run")
+        parser.add_argument("--verbose-misses", action="store_true", help="Print the emails an engine gets wrong")
+
+    def handle(self, *args, **options):
+        cases = self.load_cases()
+        engines = [("legacy", legacy_extract_deadline), ("deadlines", deadlines.extract_deadline)]
+
+        self.stdout.write(f"labelled emails={len(cases)}")
+        for name, extract in engines:
+            exact = same_day = 0
+            for text, sent, expected in cases:
+                found = extract(text, sent_date=sent)
+                found = timezone.localtime(found).replace(tzinfo=None) if found else None
+                if found == expected:
+                    exact += 1
+                if (found and found.date()) == (expected and expected.date()):
+                    same_day += 1
+                elif options["verbose_misses"]:
+                    self.stdout.write(f"  {name} miss: {text[:70]!r} expected {expected} got {found}")
+            self.stdout.write(f"{name:>10} accuracy: exact {exact / len(cases):6.1%}  same day {same_day / len(cases):6.1%}")
+
+        thread = THREAD_REPLY * options["thread_replies"]
+        runs = (
+            ("short emails", "", ""),
+            (f"{options['thread_replies']}-reply threads", "", thread),
+            ("long HTML emails", HTML_HEAD, HTML_TAIL),
+        )
+        for label, prefix, suffix in runs:
+            texts = [(prefix + text + suffix, sent) for text, sent, _ in cases] * options["repeat"]
+            timings = {}
+            for name, extract in engines:
+                start = time.perf_counter()
+                for text, sent in texts:
+                    extract(text, sent_date=sent)
+                timings[name] = time.perf_counter() - start
+            self.stdout.write(
+                f"{label:>20}: legacy {len(texts) / timings['legacy']:10.1f} emails/s  "
+                f"deadlines {len(texts) / timings['deadlines']:10.1f} emails/s  "
+                f"({timings['legacy'] / timings['deadlines']:.1f}x)"
+            )
+
+    # (text, sent date, expected deadline as naive local time or None)
+    def load_cases(self):
+        cases = []
+        with open(settings.BASE_DIR / "deadline_benchmark.jsonl", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                case = json.loads(line)
+                expected = datetime.fromisoformat(case["expected"]) if case["expected"] else None
+                cases.append((case["text"], datetime.fromisoformat(case["sent"]), expected))
+        return cases
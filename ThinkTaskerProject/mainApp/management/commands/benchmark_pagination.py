@@ -0,0 +1,92 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from mainApp.models import ExtractedTask, ProcessedEmail, ThinkTaskerUser
+from mainApp.pagination import INBOX_ORDERING, TASK_LIST_ORDERING, keyset_page
+
+PRIORITIES = ["Urgent", "Important", "Medium", "Low", ""]
+
+class Command(BaseCommand):
+    help = (
+        "Latency of a page of the inbox and of the task list at increasing depths: the old whole list, "
+        "an OFFSET page and a keyset page (pagination.py). Also checks that walking the keyset pages "
+        "returns every row once, in order. Runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=50000, help="Emails and tasks of the user")
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self.build_rows(options)
+            page_size = options["page_size"]
+            for name, queryset, ordering in (
+                ("inbox", ProcessedEmail.objects.filter(user=user), INBOX_ORDERING),
+                ("task list", ExtractedTask.objects.filter(user=user), TASK_LIST_ORDERING),
+            ):
+                self.stdout.write(f"{name} ({options['rows']} rows, {page_size} per page)")
+
+                start = time.perf_counter()
+                everything = list(queryset.order_by(*ordering))
+                self.stdout.write(f"  {'whole list (legacy)':>22}: {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+                # Walk every page, timing the pages at a few depths
+                depths = {0, len(everything) // (2 * page_size), len(everything) // page_size - 1}
+                walked, cursor, number = [], None, 0
+                while True:
+                    start = time.perf_counter()
+                    items, cursor = keyset_page(queryset, ordering, cursor, page_size)
+                    keyset_ms = (time.perf_counter() - start) * 1000
+                    if number in depths:
+                        start = time.perf_counter()
+                        list(queryset.order_by(*ordering)[number * page_size:(number + 1) * page_size])
+                        offset_ms = (time.perf_counter() - start) * 1000
+                        self.stdout.write(
+                            f"  {'page ' + str(number + 1):>22}: offset {offset_ms:7.1f} ms  keyset {keyset_ms:7.1f} ms"
+                        )
+                    walked.extend(item.pk for item in items)
+                    number += 1
+                    if cursor is None:
+                        break
+                same = walked == [item.pk for item in everything]
+                self.stdout.write(f"  {number} pages, same rows and order as the whole list: {same}")
+            transaction.set_rollback(True)
+
+    def build_rows(self, options):
+        rng = random.Random(options["seed"])
+        user = ThinkTaskerUser.objects.create(username=f"benchmark-pagination-{rng.random()}")
+        emails = ProcessedEmail.objects.bulk_create([
+            ProcessedEmail(
+                user=user,
+                message_id=f"benchmark-pagination-{user.pk}-{i}",
+                subject=f"Email {i}",
+                body_preview="",
+                tokens=["email"],
+            )
+            for i in range(options["rows"])
+        ], batch_size=2000)
+        # processed_at is auto_now_add: spread it afterwards, with ties, like emails of one sync
+        now = timezone.now()
+        for email in emails:
+            email.processed_at = now - timedelta(minutes=rng.randrange(options["rows"] // 4 + 1))
+        ProcessedEmail.objects.bulk_update(emails, ["processed_at"], batch_size=2000)
+
+        # A third of the tasks have no deadline, deadlines fall on the hour so many are equal
+        ExtractedTask.objects.bulk_create([
+            ExtractedTask(
+                user=user,
+                subject=f"Task {i}",
+                task_description="",
+                priority=rng.choice(PRIORITIES),
+                deadline=None if rng.random() < 0.33 else now + timedelta(hours=rng.randrange(500)),
+            )
+            for i in range(options["rows"])
+        ], batch_size=2000)
+        return user
@@ -0,0 +1,161 @@
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from mainApp.business_calendar import get_calendar
+from mainApp.models import ExtractedTask, ThinkTaskerUser
+from mainApp.scheduler import assign_deadline_and_priority_batch, get_priority_rank
+
+PRIORITIES = ["Urgent", "Important", "Medium", "Low"]
+# Work hours the old scheduler had hard-coded
+WORK_HOURS = [9, 10, 11, 13, 14, 15, 16, 17, 18]
+
+# add_weekdays as it was before mainApp/business_calendar.py
+def add_weekdays(start, days):
+    current = start
+    added = 0
+    while added < days:
+        current += timedelta(days=1)
+        if current.weekday() < 5:
+            added += 1
+    return current
+
+# assign_deadline_and_priority_batch as it was before mainApp/scheduler.py, kept as the baseline.
+# Its overflow is repaired so it can run at all: the old code passed open ExtractedTask objects
+# and naive datetimes to the recursive call, which raised as soon as a day overflowed.
+def legacy_assign_deadline_and_priority_batch(user, actionable_tasks, now=None):
+    if now is None:
+        now = timezone.now()
+
+    tasks_by_day = defaultdict(list)
+    for t in actionable_tasks:
+        d = t["extracted_deadline"]
+        day = (d if d and d >= now else now).astimezone(timezone.get_current_timezone()).date()
+        tasks_by_day[day].append(t)
+
+    for day, new_tasks in tasks_by_day.items():
+        existing_tasks = list(
+            ExtractedTask.objects.filter(user=user, deadline__date=day, status="Open").order_by('deadline')
+        )
+        combined = []
+        for t in existing_tasks:
+            combined.append({"is_new": False, "obj": t, "priority": t.priority, "deadline": t.deadline})
+        for t in new_tasks:
+            combined.append({"is_new": True, "obj": t, "priority": t["priority"], "deadline": t["extracted_deadline"]})
+        combined.sort(key=lambda x: (-get_priority_rank(x["priority"]), x["deadline"] or now))
+
+        local_now = timezone.localtime(now)
+        hour_idx = 0
+        if day == local_now.date():
+            while hour_idx < len(WORK_HOURS) and WORK_HOURS[hour_idx] <= local_now.hour:
+                hour_idx += 1
+
+        assigned_tasks = []
+        for task in combined:
+            if hour_idx >= len(WORK_HOURS):
+                break
+            task["assigned_deadline"] = datetime.combine(day, datetime.min.time()).replace(
+                hour=WORK_HOURS[hour_idx], tzinfo=timezone.get_current_timezone()
+            )
+            assigned_tasks.append(task)
+            hour_idx += 1
+
+        overflow = combined[len(assigned_tasks):]
+        if overflow:
+            next_day = timezone.make_aware(add_weekdays(datetime.combine(day, datetime.min.time()), 1))
+            carried = []
+            for t in overflow:
+                if t["is_new"]:
+                    t["obj"]["extracted_deadline"] = next_day
+                    carried.append(t["obj"])
+                else:
+                    carried.append({"extracted_deadline": next_day, "priority": t["priority"], "existing": t["obj"]})
+            legacy_assign_deadline_and_priority_batch(user, carried, now=add_weekdays(now, 1))
+
+        tasks_to_update = []
+        for t in assigned_tasks:
+            if not t["is_new"] and t["obj"].deadline != t["assigned_deadline"]:
+                t["obj"].deadline = t["assigned_deadline"]
+                tasks_to_update.append(t["obj"])
+            elif t["is_new"] and "existing" in t["obj"]:
+                t["obj"]["existing"].deadline = t["assigned_deadline"]
+                tasks_to_update.append(t["obj"]["existing"])
+            elif t["is_new"]:
+                t["obj"]["assigned_deadline"] = t["assigned_deadline"]
+        if tasks_to_update:
+            ExtractedTask.objects.bulk_update(tasks_to_update, ['deadline'])
+
+class Command(BaseCommand):
+    help = (
+        "Scheduling a sync's new tasks into a calendar of open tasks: the old per-day recursive "
+        "assign_deadline_and_priority_batch vs mainApp/scheduler.py. Runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--open-tasks", type=int, default=10000, help="Open tasks already in the calendar")
+        parser.add_argument("--days", type=int, default=1200, help="Working days the open tasks are spread over")
+        parser.add_argument("--new-tasks", type=int, default=100, help="New tasks to schedule")
+        parser.add_argument("--new-days", type=int, default=10, help="Working days the new deadlines fall in")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        tz = timezone.get_current_timezone()
+        # A Monday 8:00, so no hour of the first day has started yet
+        today = timezone.localtime(timezone.now()).date()
+        now = datetime.combine(today + timedelta(days=7 - today.weekday()), datetime.min.time(), tzinfo=tz)
+        now = now.replace(hour=8)
+
+        self.stdout.write(
+            f"open tasks={options['open_tasks']} over {options['days']} working days, "
+            f"new tasks={options['new_tasks']} over {options['new_days']} working days"
+        )
+        for name, assign in (("legacy", legacy_assign_deadline_and_priority_batch),
+                             ("scheduler", assign_deadline_and_priority_batch)):
+            with transaction.atomic():
+                user, new_tasks = self.build_calendar(now, options)
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    try:
+                        assign(user, new_tasks, now=now)
+                        result = "ok"
+                    except RecursionError:
+                        result = "RecursionError"
+                    elapsed = time.perf_counter() - start
+                scheduled = sum(1 for t in new_tasks if t.get("assigned_deadline"))
+                self.stdout.write(
+                    f"{name:>10}: {elapsed:8.3f}s  {len(queries):6d} queries  "
+                    f"{scheduled}/{len(new_tasks)} new tasks scheduled  ({result})"
+                )
+                transaction.set_rollback(True)
+
+    def build_calendar(self, now, options):
+        rng = random.Random(options["seed"])
+        user = ThinkTaskerUser.objects.create(username=f"benchmark-scheduler-{rng.random()}")
+        calendar = get_calendar()
+        days = [calendar.add_business_days(now, i) for i in range(options["days"])]
+        ExtractedTask.objects.bulk_create([
+            ExtractedTask(
+                user=user,
+                subject=f"Open task {i}",
+                task_description="",
+                priority=rng.choice(PRIORITIES),
+                deadline=rng.choice(days).replace(hour=rng.choice(calendar.work_hours)),
+                status="Open",
+            )
+            for i in range(options["open_tasks"])
+        ], batch_size=1000)
+        new_tasks = [
+            {
+                "subject": f"New task {i}",
+                "priority": rng.choice(PRIORITIES),
+                "extracted_deadline": rng.choice(days[:options["new_days"]]).replace(hour=10),
+            }
+            for i in range(options["new_tasks"])
+        ]
+        return user, new_tasks
@@ -0,0 +1,72 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from mainApp.models import ExtractedTask, ThinkTaskerUser, priority_order
+from mainApp.search import backend, search_tasks
+
+PRIORITIES = ["Urgent", "Important", "Medium", "Low"]
+WORDS = (
+    "review report budget contract invoice meeting schedule approve draft deadline client "
+    "proposal update release security audit travel expense hiring onboarding feedback slides "
+    "quarterly vendor renewal migration server backup training policy survey workshop"
+).split()
+QUERIES = ["budget", "invoice approve", "quarterly vendor renewal", "secur", "nothingmatches"]
+# Words of the generated text: WORDS plus filler words, picked with Zipf frequencies like real text
+VOCABULARY = WORDS + [f"{a}{b}{c}" for a in "bdfklmnprst" for b in "aeiou" for c in "dgklmnrst"]
+
+# The task list search as it was before mainApp/search.py, kept as the baseline
+def legacy_search_tasks(user, query):
+    return (
+        ExtractedTask.objects.filter(user=user)
+        .filter(Q(subject__icontains=query) | Q(task_description__icontains=query))
+        .order_by(priority_order, 'deadline', '-created_at')
+    )
+
+class Command(BaseCommand):
+    help = (
+        "Latency of the task list search: the old icontains filter vs search.search_tasks "
+        "(FTS5 on SQLite). Runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=100000, help="Tasks of the user")
+        parser.add_argument("--repeat", type=int, default=5, help="Runs of each query")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self.build_tasks(options)
+            self.stdout.write(f"tasks={options['tasks']} backend={backend()}")
+            for query in QUERIES:
+                for name, search in (("legacy", legacy_search_tasks), ("search", search_tasks)):
+                    start = time.perf_counter()
+                    for _ in range(options["repeat"]):
+                        # The first page of the task list
+                        results = list(search(user, query)[:50])
+                    elapsed = (time.perf_counter() - start) / options["repeat"]
+                    self.stdout.write(
+                        f"{query!r:>28} {name:>7}: {elapsed * 1000:8.1f} ms  {len(results):3d} shown"
+                    )
+            transaction.set_rollback(True)
+
+    def build_tasks(self, options):
+        rng = random.Random(options["seed"])
+        vocabulary = VOCABULARY[:]
+        rng.shuffle(vocabulary)
+        weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+        user = ThinkTaskerUser.objects.create(username=f"benchmark-search-{rng.random()}")
+        ExtractedTask.objects.bulk_create([
+            ExtractedTask(
+                user=user,
+                subject=" ".join(rng.choices(vocabulary, weights, k=4)).capitalize(),
+                task_description=" ".join(rng.choices(vocabulary, weights, k=30)) + ".",
+                priority=rng.choice(PRIORITIES),
+                status="Open",
+            )
+            for _ in range(options["tasks"])
+        ], batch_size=2000)
+        return user
@@ -0,0 +1,82 @@
+import json
+import re
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from mainApp.summarizers import get_summarizer
+
+PROMPT_PREFIX = "Extract the actionable to-do item from this email: "
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+def _words(text):
+    return WORD_RE.findall(text.lower())
+
+def rouge_1(candidate, reference):
+    cand, ref = _words(candidate), _words(reference)
+    if not cand or not ref:
+        return 0.0
+    ref_counts = {}
+    for w in ref:
+        ref_counts[w] = ref_counts.get(w, 0) + 1
+    overlap = 0
+    for w in cand:
+        if ref_counts.get(w, 0) > 0:
+            ref_counts[w] -= 1
+            overlap += 1
+    if overlap == 0:
+        return 0.0
+    precision, recall = overlap / len(cand), overlap / len(ref)
+    return 2 * precision * recall / (precision + recall)
+
+def rouge_l(candidate, reference):
+    cand, ref = _words(candidate), _words(reference)
+    if not cand or not ref:
+        return 0.0
+    previous = [0] * (len(ref) + 1)
+    for c in cand:
+        current = [0]
+        for j, r in enumerate(ref, start=1):
+            current.append(previous[j - 1] + 1 if c == r else max(previous[j], current[j - 1]))
+        previous = current
+    lcs = previous[-1]
+    if lcs == 0:
+        return 0.0
+    precision, recall = lcs / len(cand), lcs / len(ref)
+    return 2 * precision * recall / (precision + recall)
+
+class Command(BaseCommand):
+    help = (
+        "Compare task description engines against the chosen answers of a labelled file (ROUGE-1/L F1 and speed). "
+        "The textrank heuristics were tuned on traindata.jsonl, so its scores there only catch regressions: "
+        "pass a held-out file with --file for a quality figure."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file", default=None, help="JSONL of prompt/chosen pairs, traindata.jsonl by default")
+        parser.add_argument("--engines", default="textrank", help="Comma separated engines, e.g. textrank,llama")
+        parser.add_argument("--show", type=int, default=0, help="Print this many sample outputs per engine")
+
+    def handle(self, *args, **options):
+        path = options["file"] or settings.BASE_DIR / "traindata.jsonl"
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        if not options["file"]:
+            self.stdout.write("traindata.jsonl: the set textrank was tuned on, a regression check and not a quality figure")
+        emails = [r["prompt"][len(PROMPT_PREFIX):] if r["prompt"].startswith(PROMPT_PREFIX) else r["prompt"] for r in rows]
+        references = [r["chosen"] for r in rows]
+
+        for engine in options["engines"].split(","):
+            summarizer = get_summarizer(engine.strip())
+            start = time.perf_counter()
+            outputs = summarizer.summarize_many(emails)
+            elapsed = time.perf_counter() - start
+            r1 = sum(rouge_1(o, r) for o, r in zip(outputs, references)) / len(rows)
+            rl = sum(rouge_l(o, r) for o, r in zip(outputs, references)) / len(rows)
+            self.stdout.write(
+                f"{summarizer.name:<9} emails={len(rows)} ROUGE-1 F1={r1:.3f} ROUGE-L F1={rl:.3f} "
+                f"emails/s={len(rows) / elapsed:.1f}"
+            )
+            for email, output, reference in list(zip(emails, outputs, references))[:options["show"]]:
+                self.stdout.write(f"  email:     {email[:100]}\n  output:    {output}\n  reference: {reference}")
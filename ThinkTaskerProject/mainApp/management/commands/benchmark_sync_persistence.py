@@ -0,0 +1,124 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from mainApp.models import CorpusStatistic, ExtractedTask, ProcessedEmail, TermStatistic, ThinkTaskerUser
+from mainApp.sync import save_new_tasks
+
+PRIORITIES = ["Urgent", "Important", "Medium", "Low"]
+
+# How run_mail_sync stored a sync's tasks before sync.save_new_tasks, kept as the baseline:
+# an exists() query per message in the filtering loop, then two autocommitted creates per
+# email (ProcessedEmail.save and its post_save signal updating the term statistics).
+def legacy_save_new_tasks(user, actionable_new_tasks, descriptions):
+    new_tasks = [
+        task for task in actionable_new_tasks
+        if not ProcessedEmail.objects.filter(message_id=task["message_id"], user=user).exists()
+    ]
+    extracted_tasks = []
+    for task, description in zip(new_tasks, descriptions):
+        pe = ProcessedEmail.objects.create(
+            user=user,
+            message_id=task["message_id"],
+            subject=task["subject"],
+            body_preview=task["preview"],
+            is_actionable=True,
+            web_link=task["web_link"],
+            is_reference=True,
+            to_recipients=task["to_recipients"],
+            language=task["language"],
+            tokens=task["email_tokens"],
+        )
+        extracted_tasks.append(ExtractedTask.objects.create(
+            user=user,
+            email=pe,
+            subject=task["subject"],
+            task_description=description,
+            actionable_patterns=task["actionable_patterns"],
+            priority=task["priority"],
+            deadline=task["assigned_deadline"],
+            status="Open",
+        ))
+    return extracted_tasks
+
+# The same with the known message ids prefetched in one query, as run_mail_sync does now
+def bulk_save_new_tasks(user, actionable_new_tasks, descriptions):
+    known = set(
+        ProcessedEmail.objects
+        .filter(user=user, message_id__in=[task["message_id"] for task in actionable_new_tasks])
+        .values_list("message_id", flat=True)
+    )
+    new_tasks = [task for task in actionable_new_tasks if task["message_id"] not in known]
+    return save_new_tasks(user, new_tasks, descriptions)
+
+def term_statistics():
+    corpus = CorpusStatistic.objects.filter(pk=1).first()
+    return (
+        corpus.document_count if corpus else 0,
+        dict(TermStatistic.objects.values_list("term", "document_frequency")),
+        dict(TermStatistic.objects.values_list("term", "collection_frequency")),
+    )
+
+class Command(BaseCommand):
+    help = (
+        "Per-email database cost of storing the emails and tasks of a sync: the old exists() and "
+        "create() calls per email vs sync.save_new_tasks (one transaction, bulk_create). "
+        "Commits for real (autocommit is what the old path paid for), the benchmark users "
+        "and their rows are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--emails", type=int, default=200, help="Actionable emails in the sync")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        vocabulary = [f"term{i}" for i in range(3000)]
+        before = term_statistics()
+        self.stdout.write(f"emails={options['emails']} ({connection.vendor})")
+        after = {}
+        for name, save in (("legacy", legacy_save_new_tasks), ("bulk", bulk_save_new_tasks)):
+            user = ThinkTaskerUser.objects.create(username=f"benchmark-sync-{name}-{rng.random()}")
+            try:
+                tasks, descriptions = self.build_sync(user, vocabulary, random.Random(options["seed"]), options)
+                queries = []
+                with connection.execute_wrapper(lambda execute, sql, *rest: queries.append(sql) or execute(sql, *rest)):
+                    start = time.perf_counter()
+                    created = save(user, tasks, descriptions)
+                    elapsed = time.perf_counter() - start
+                after[name] = term_statistics()
+                emails = len(created)
+                self.stdout.write(
+                    f"{name:>8}: {elapsed * 1000:8.1f} ms  {len(queries):5d} queries  "
+                    f"{elapsed * 1000 / emails:6.2f} ms/email  {len(queries) / emails:5.1f} queries/email"
+                )
+            finally:
+                # Deleting the emails also takes them out of the term statistics again
+                user.delete()
+        self.stdout.write(
+            f"same term statistics: {after['legacy'] == after['bulk']}, "
+            f"restored afterwards: {term_statistics() == before}"
+        )
+
+    def build_sync(self, user, vocabulary, rng, options):
+        now = timezone.now()
+        tasks = []
+        for i in range(options["emails"]):
+            tasks.append({
+                "message_id": f"benchmark-sync-{user.pk}-{i}",
+                "subject": f"Request {i}",
+                "preview": "Please review the attached document and reply by Friday.",
+                "web_link": f"https://outlook.office.com/mail/{i}",
+                "to_recipients": ["user@example.com"],
+                "language": "en",
+                "email_tokens": rng.choices(vocabulary, k=25),
+                "actionable_patterns": [{"pattern": "review", "priority": ""}],
+                "priority": rng.choice(PRIORITIES),
+                "assigned_deadline": now + timedelta(hours=rng.randrange(200)),
+            })
+        descriptions = [f"Review the document of request {i}." for i in range(options["emails"])]
+        return tasks, descriptions
@@ -0,0 +1,55 @@
+import json
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from mainApp import task_description
+
+PROMPT_PREFIX = "Extract the actionable to-do item from this email: "
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark task-description generation on CPU (emails/second and p95 latency) "
+        "for several batch sizes, e.g. with a tiny local model: "
+        "benchmark_task_description --model sshleifer/tiny-gpt2"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", required=True, help="Path (or hub id) of the base model")
+        parser.add_argument("--adapter", default=None, help="Optional PEFT adapter path")
+        parser.add_argument("--emails", type=int, default=32, help="Number of emails to summarize")
+        parser.add_argument("--batch-sizes", default="1,4,8", help="Comma separated batch sizes")
+        parser.add_argument("--max-new-tokens", type=int, default=settings.TASK_DESCRIPTION_MAX_NEW_TOKENS)
+
+    def handle(self, *args, **options):
+        bodies = self.load_emails(options["emails"])
+        model, tokenizer = task_description.load_model(
+            options["model"], options["adapter"], device_map=None, torch_dtype="float32"
+        )
+        # Warm up once so lazy initialisation is not measured
+        task_description.generate_descriptions(model, tokenizer, bodies[:1], 1, options["max_new_tokens"])
+
+        for batch_size in [int(b) for b in options["batch_sizes"].split(",")]:
+            latencies = []
+            start = time.perf_counter()
+            for i in range(0, len(bodies), batch_size):
+                batch = bodies[i:i + batch_size]
+                batch_start = time.perf_counter()
+                task_description.generate_descriptions(
+                    model, tokenizer, batch, batch_size, options["max_new_tokens"]
+                )
+                # Every email of a batch is ready when the whole batch is
+                latencies.extend([time.perf_counter() - batch_start] * len(batch))
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"batch_size={batch_size:<3} emails/s={len(bodies) / elapsed:8.2f} "
+                f"p95 latency={np.percentile(latencies, 95) * 1000:8.1f} ms"
+            )
+
+    def load_emails(self, count):
+        with open(settings.BASE_DIR / "traindata.jsonl", encoding="utf-8") as f:
+            prompts = [json.loads(line)["prompt"] for line in f if line.strip()]
+        bodies = [p[len(PROMPT_PREFIX):] if p.startswith(PROMPT_PREFIX) else p for p in prompts]
+        return (bodies * (count // len(bodies) + 1))[:count]
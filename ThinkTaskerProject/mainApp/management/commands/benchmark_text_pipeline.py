@@ -0,0 +1,76 @@
+import json
+import re
+import time
+
+from bs4 import BeautifulSoup
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from nltk.corpus import stopwords
+from nltk.tokenize import word_tokenize
+
+from mainApp import nlp
+
+PROMPT_PREFIX = "Extract the actionable to-do item from this email: "
+
+# clean_email_text as it was before nlp.EmailDocument, kept as the baseline
+def legacy_clean_email_text(text):
+    text = BeautifulSoup(text, "html.parser").get_text(separator=" ")
+    text = re.sub(r"(?i)(Best regards|Regards|BR|Sent from my|Sincerely|Thanks|Thank you|Yours truly|Cheers)[\s\S]+", "", text)
+    text = re.sub(r"(?i)^(hi|hello|dear|good morning|good afternoon|good evening)[^,]*,?", "", text.strip())
+    tokens = word_tokenize(text.lower())
+    stop_words = set(stopwords.words('english'))
+    tokens = [word for word in tokens if word.isalnum() and word not in stop_words]
+    return tokens
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark of the email text pipeline: the tokens a sync needs per email "
+        "(corpus, scoring and summarizer input) with the old clean_email_text calls vs one nlp.EmailDocument"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5, help="Passes over the emails of traindata.jsonl")
+
+    def handle(self, *args, **options):
+        emails = self.load_emails() * options["repeat"]
+
+        mismatches = sum(
+            1 for body, subject in emails[:len(emails) // options["repeat"]]
+            if nlp.EmailDocument(body, subject).tokens != legacy_clean_email_text(subject + " " + body)
+            or nlp.EmailDocument(body, subject).body_document.tokens != legacy_clean_email_text(body)
+        )
+
+        start = time.perf_counter()
+        for body, subject in emails:
+            combined = subject + " " + body
+            legacy_clean_email_text(combined)  # corpus
+            legacy_clean_email_text(combined)  # scoring
+            legacy_clean_email_text(body)      # summarizer input
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for body, subject in emails:
+            nlp.clean_email_text(subject + " " + body)
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        # Not build_documents: it would share the documents of the repeated passes
+        for body, subject in emails:
+            document = nlp.EmailDocument(body, subject)
+            document.tokens  # corpus and scoring
+            document.body_document.tokens  # summarizer input
+        shared = time.perf_counter() - start
+
+        count = len(emails)
+        self.stdout.write(f"emails={count} token mismatches vs legacy={mismatches}")
+        self.stdout.write(f"legacy, 3 clean_email_text calls per email: {count / legacy:10.1f} emails/s")
+        self.stdout.write(f"clean_email_text, 1 call per email:          {count / single:10.1f} emails/s")
+        self.stdout.write(f"EmailDocument, all stages per email:         {count / shared:10.1f} emails/s "
+                          f"({legacy / shared:.1f}x vs legacy)")
+
+    # Emails of the training set, with the first words as subject
+    def load_emails(self):
+        with open(settings.BASE_DIR / "traindata.jsonl", encoding="utf-8") as f:
+            prompts = [json.loads(line)["prompt"] for line in f if line.strip()]
+        bodies = [p[len(PROMPT_PREFIX):] if p.startswith(PROMPT_PREFIX) else p for p in prompts]
+        return [(body, " ".join(body.split()[:6])) for body in bodies]
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from mainApp import term_stats
+
+class Command(BaseCommand):
+    help = "Rebuild the TF-IDF/CF term statistics from reference documents and reference emails"
+
+    def handle(self, *args, **options):
+        document_count, term_count = term_stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt term statistics: {document_count} documents, {term_count} terms."
+        ))
@@ -0,0 +1,86 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from mainApp import jobs, outbox
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = "Run background workers that execute queued jobs (e.g. mailbox syncs) and send the To Do outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=getattr(settings, "WORKER_CONCURRENCY", 2),
+            help="Number of jobs executed at the same time",
+        )
+        parser.add_argument(
+            "--poll-interval", type=float, default=getattr(settings, "WORKER_POLL_INTERVAL", 2.0),
+            help="Seconds to wait before checking the queue again when it is empty",
+        )
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Exit once the queue is empty instead of polling forever",
+        )
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        threads = [
+            threading.Thread(
+                target=self.work, args=(options["poll_interval"], options["once"]),
+                name=f"worker-{i}", daemon=True,
+            )
+            for i in range(options["concurrency"])
+        ]
+        threads.append(threading.Thread(
+            target=self.flush_outbox, args=(options["poll_interval"], options["once"]),
+            name="outbox", daemon=True,
+        ))
+        self.stdout.write(self.style.SUCCESS(f"Starting {len(threads) - 1} worker(s) and the To Do outbox."))
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping workers after their current job...")
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+
+    def work(self, poll_interval, once):
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                job = jobs.claim_next_job()
+                if job is None:
+                    if once:
+                        return
+                    self.stop.wait(poll_interval)
+                    continue
+                self.stdout.write(f"[{threading.current_thread().name}] Running {job}")
+                ok = jobs.run_job(job)
+                self.stdout.write(f"[{threading.current_thread().name}] {job} {'done' if ok else 'failed'}")
+        finally:
+            connection.close()
+
+    # A single thread per process sends the To Do outbox, so changes of a task leave in order
+    def flush_outbox(self, poll_interval, once):
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                try:
+                    handled = outbox.flush()
+                except Exception:
+                    logger.exception("Sending the To Do outbox failed")
+                    handled = 0
+                if not handled:
+                    if once:
+                        return
+                    self.stop.wait(poll_interval)
+        finally:
+            connection.close()
@@ -0,0 +1,47 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from mainApp import task_description
+from mainApp.model_server import ModelServer, MicroBatcher
+
+class Command(BaseCommand):
+    help = (
+        "Serve task descriptions from a single model instance over a Unix socket. "
+        "Set TASK_DESCRIPTION_SERVER_SOCKET to the same path in the web and worker processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socket", default=settings.TASK_DESCRIPTION_SERVER_SOCKET,
+                            help="Path of the Unix socket to listen on")
+        parser.add_argument("--batch-size", type=int, default=settings.TASK_DESCRIPTION_BATCH_SIZE,
+                            help="Maximum number of emails generated per model call")
+        parser.add_argument("--max-wait-ms", type=float, default=settings.TASK_DESCRIPTION_SERVER_MAX_WAIT_MS,
+                            help="How long to wait for more requests before running a batch")
+
+    def handle(self, *args, **options):
+        socket_path = options["socket"]
+        if not socket_path:
+            raise CommandError("No socket path: pass --socket or set TASK_DESCRIPTION_SERVER_SOCKET.")
+
+        self.stdout.write("Loading the task description model...")
+        task_description.get_model()
+
+        batch_size = options["batch_size"]
+        batcher = MicroBatcher(
+            lambda bodies: task_description.generate_local(bodies, batch_size),
+            batch_size=batch_size,
+            max_wait=options["max_wait_ms"] / 1000,
+        )
+        batcher.start()
+        server = ModelServer(socket_path, batcher)
+        self.stdout.write(self.style.SUCCESS(f"Serving task descriptions on {socket_path}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
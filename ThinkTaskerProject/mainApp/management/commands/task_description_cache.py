@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from mainApp import summary_cache
+
+class Command(BaseCommand):
+    help = "Report, prune or clear the generated task description cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--prune", action="store_true", help="Evict old and least recently used entries")
+        parser.add_argument("--clear", action="store_true", help="Delete every cached description")
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            summary_cache.clear()
+            self.stdout.write(self.style.SUCCESS("Cleared the task description cache."))
+        elif options["prune"]:
+            deleted = summary_cache.prune()
+            self.stdout.write(self.style.SUCCESS(f"Evicted {deleted} cached descriptions."))
+        stats = summary_cache.stats()
+        total_hits = summary_cache.TaskDescriptionCache.objects.aggregate(hits=Sum("hit_count"))["hits"] or 0
+        self.stdout.write(f"Cached descriptions: {stats['db_entries']} (lifetime hits: {total_hits})")
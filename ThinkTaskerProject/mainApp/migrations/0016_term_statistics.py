@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainApp', '0015_processedemail_to_recipients'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorpusStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TermStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.TextField(unique=True)),
+                ('document_frequency', models.PositiveIntegerField(default=0)),
+                ('collection_frequency', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='processedemail',
+            name='in_corpus',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='referencedocument',
+            name='in_corpus',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:30
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainApp', '0016_term_statistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actionablepattern',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainApp', '0017_actionablepattern_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MailboxDeltaToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('folder', models.CharField(default='Inbox', max_length=64)),
+                ('delta_link', models.TextField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mailbox_delta_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'folder')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainApp', '0018_mailboxdeltatoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thinktaskeruser',
+            name='graph_token_cache',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.CreateModel(
+            name='BackgroundJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('mail_sync', 'Mailbox sync')], default='mail_sync', max_length=32)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='queued', max_length=16)),
+                ('stage', models.CharField(blank=True, max_length=64)),
+                ('total_count', models.PositiveIntegerField(default=0)),
+                ('processed_count', models.PositiveIntegerField(default=0)),
+                ('created_count', models.PositiveIntegerField(default=0)),
+                ('message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='background_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
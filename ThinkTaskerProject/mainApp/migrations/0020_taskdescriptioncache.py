@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainApp', '0019_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskDescriptionCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('description', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
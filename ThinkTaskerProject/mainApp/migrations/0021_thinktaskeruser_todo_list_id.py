@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainApp', '0020_taskdescriptioncache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thinktaskeruser',
+            name='todo_list_id',
+            field=models.CharField(blank=True, default='', max_length=128),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:29
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainApp', '0021_thinktaskeruser_todo_list_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TodoOutboxEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('todo_list_id', models.CharField(max_length=128)),
+                ('todo_task_id', models.CharField(db_index=True, max_length=128)),
+                ('action', models.CharField(choices=[('update', 'Update'), ('delete', 'Delete')], default='update', max_length=16)),
+                ('changes', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('failed', 'Failed')], default='pending', max_length=16)),
+                ('claim', models.CharField(blank=True, db_index=True, max_length=32)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='todo_outbox', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='mainApp_tod_status_6543a7_idx')],
+            },
+        ),
+    ]
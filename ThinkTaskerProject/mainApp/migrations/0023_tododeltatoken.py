@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainApp', '0022_todooutboxentry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='kind',
+            field=models.CharField(choices=[('mail_sync', 'Mailbox sync'), ('todo_reconcile', 'To Do reconcile')], default='mail_sync', max_length=32),
+        ),
+        migrations.CreateModel(
+            name='TodoDeltaToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('todo_list_id', models.CharField(max_length=128)),
+                ('delta_link', models.TextField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='todo_delta_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'todo_list_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainApp', '0023_tododeltatoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processedemail',
+            name='language',
+            field=models.CharField(blank=True, default='', max_length=8),
+        ),
+        migrations.AddField(
+            model_name='referencedocument',
+            name='language',
+            field=models.CharField(blank=True, default='', max_length=8),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainApp', '0024_document_language'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processedemail',
+            name='tokens',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
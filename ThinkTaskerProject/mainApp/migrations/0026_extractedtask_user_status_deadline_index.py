@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainApp', '0025_processedemail_tokens'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='extractedtask',
+            index=models.Index(fields=['user', 'status', 'deadline'], name='task_user_status_deadline'),
+        ),
+    ]
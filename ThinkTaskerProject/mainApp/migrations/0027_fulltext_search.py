@@ -0,0 +1,66 @@
+from django.db import migrations
+
+# Full-text indexes of mainApp/search.py.
+# SQLite: external content FTS5 tables over the model tables (the text is not stored twice),
+# kept in sync by triggers, so bulk_create/bulk_update and raw SQL are indexed too.
+# PostgreSQL: GIN indexes on the same tsvector expressions search.py queries.
+# Other databases get nothing, search.py falls back to icontains there.
+
+INDEXED = [
+    ("mainApp_extractedtask", "mainApp_extractedtask_fts", ["subject", "task_description"]),
+    ("mainApp_processedemail", "mainApp_processedemail_fts", ["subject", "body_preview"]),
+]
+
+def sqlite_statements(table, fts, columns):
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    delete = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES('delete', old.id, {old});"
+    insert = f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});"
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN {insert} END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN {delete} END",
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN {delete} {insert} END",
+        f"INSERT INTO {fts}({fts}) VALUES('rebuild')",
+    ]
+
+def postgresql_statements(table, fts, columns):
+    vector = " || ".join(
+        f"setweight(to_tsvector('simple', coalesce({c}, '')), '{weight}')"
+        for c, weight in zip(columns, "AB")
+    )
+    return [f'CREATE INDEX "{fts}_gin" ON "{table}" USING GIN (({vector}))']
+
+def create_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, fts, columns in INDEXED:
+        if vendor == "sqlite":
+            statements = sqlite_statements(table, fts, columns)
+        elif vendor == "postgresql":
+            statements = postgresql_statements(table, fts, columns)
+        else:
+            statements = []
+        for sql in statements:
+            schema_editor.execute(sql)
+
+def drop_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, fts, columns in INDEXED:
+        if vendor == "sqlite":
+            schema_editor.execute(f'DROP TABLE IF EXISTS "{fts}"')
+            for suffix in ("ai", "ad", "au"):
+                schema_editor.execute(f'DROP TRIGGER IF EXISTS "{fts}_{suffix}"')
+        elif vendor == "postgresql":
+            schema_editor.execute(f'DROP INDEX IF EXISTS "{fts}_gin"')
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainApp', '0026_extractedtask_user_status_deadline_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:58
+
+import importlib
+
+from django.db import migrations, models
+
+fulltext_search = importlib.import_module("mainApp.migrations.0027_fulltext_search")
+
+# Adding a stored generated column makes Django rebuild mainApp_extractedtask on SQLite,
+# which drops the full-text search triggers of 0027 with the old table: build the FTS5
+# tables and their triggers again, after the field is added or (unapplying) removed.
+def rebuild_fulltext_search(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        fulltext_search.drop_indexes(apps, schema_editor)
+        fulltext_search.create_indexes(apps, schema_editor)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainApp', '0027_fulltext_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, rebuild_fulltext_search),
+        migrations.AddField(
+            model_name='extractedtask',
+            name='priority_rank',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(priority='Urgent', then=models.Value(1)), models.When(priority='Important', then=models.Value(2)), models.When(priority='Medium', then=models.Value(3)), models.When(priority='Low', then=models.Value(4)), default=models.Value(5), output_field=models.IntegerField()), output_field=models.IntegerField()),
+        ),
+        migrations.AddIndex(
+            model_name='extractedtask',
+            index=models.Index(fields=['user', 'priority_rank', 'deadline', '-created_at', '-id'], name='task_user_rank_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='processedemail',
+            index=models.Index(fields=['user', '-processed_at', '-id'], name='email_user_processed_keyset'),
+        ),
+        migrations.RunPython(rebuild_fulltext_search, migrations.RunPython.noop),
+    ]
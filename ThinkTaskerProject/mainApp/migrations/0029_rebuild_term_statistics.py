@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-17 18:23
+
+from django.db import migrations
+
+# The term statistics tables of 0016 start empty and only documents saved afterwards are
+# counted in them, so fill them from the reference documents and emails already stored,
+# as the rebuild_term_stats command does.
+def rebuild_term_statistics(apps, schema_editor):
+    from mainApp import term_stats
+
+    term_stats.rebuild(apps)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainApp', '0028_keyset_pagination'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_term_statistics, migrations.RunPython.noop),
+    ]
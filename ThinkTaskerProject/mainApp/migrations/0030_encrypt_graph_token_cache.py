@@ -0,0 +1,22 @@
+# Generated by Django 5.2.1 on 2026-10-17 18:40
+
+from django.db import migrations
+
+# Token caches stored before graph_auth encrypted them are plain JSON: encrypt them in place.
+def encrypt_token_caches(apps, schema_editor):
+    from mainApp import graph_auth
+
+    ThinkTaskerUser = apps.get_model('mainApp', 'ThinkTaskerUser')
+    for user in ThinkTaskerUser.objects.filter(graph_token_cache__startswith="{").only("pk", "graph_token_cache"):
+        user.graph_token_cache = graph_auth.encrypt_token_cache(user.graph_token_cache)
+        user.save(update_fields=["graph_token_cache"])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainApp', '0029_rebuild_term_statistics'),
+    ]
+
+    operations = [
+        migrations.RunPython(encrypt_token_caches, migrations.RunPython.noop),
+    ]
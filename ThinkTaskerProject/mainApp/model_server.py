@@ -0,0 +1,103 @@
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Protocol: the client sends one JSON line {"bodies": [...]} and the server answers with one
+# JSON line {"descriptions": [...]} (same order) or {"error": "..."}.
+
+class ModelServerError(Exception):
+    pass
+
+# This class collects summarization requests from every connection and runs them through
+# the model in micro-batches: it waits for the first pending email, then up to max_wait
+# seconds for more, and generates at most batch_size emails per model call.
+class MicroBatcher:
+    def __init__(self, generate, batch_size=8, max_wait=0.05):
+        self.generate = generate
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.pending = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="model-batcher", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def submit(self, bodies):
+        futures = []
+        for body in bodies:
+            future = Future()
+            self.pending.put((body, future))
+            futures.append(future)
+        return futures
+
+    def run(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                descriptions = self.generate([body for body, _ in batch])
+            except Exception as e:
+                logger.exception("Task description generation failed")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), description in zip(batch, descriptions):
+                future.set_result(description)
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                bodies = json.loads(line)["bodies"]
+                futures = self.server.batcher.submit(bodies)
+                response = {"descriptions": [future.result() for future in futures]}
+            except Exception as e:
+                response = {"error": str(e)}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, batcher):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.batcher = batcher
+        super().__init__(socket_path, _RequestHandler)
+        os.chmod(socket_path, 0o660)
+
+# This function is the thin client used by the web and worker processes.
+# It sends a batch of email bodies to the model server and waits at most timeout seconds.
+def generate_remote(email_bodies, socket_path, timeout):
+    request = json.dumps({"bodies": list(email_bodies)}).encode("utf-8") + b"\n"
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socket_path)
+            sock.sendall(request)
+            with sock.makefile("rb") as f:
+                line = f.readline()
+    except OSError as e:
+        raise ModelServerError(f"Model server at {socket_path} is unavailable: {e}") from e
+    if not line:
+        raise ModelServerError("Model server closed the connection")
+    response = json.loads(line)
+    if "error" in response:
+        raise ModelServerError(response["error"])
+    return response["descriptions"]
@@ -1,6 +1,17 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from django.utils import timezone
+
+# Rank of a task priority, the order the dashboard and the task list show tasks in
+priority_order = models.Case(
+    models.When(priority='Urgent', then=models.Value(1)),
+    models.When(priority='Important', then=models.Value(2)),
+    models.When(priority='Medium', then=models.Value(3)),
+    models.When(priority='Low', then=models.Value(4)),
+    default=models.Value(5),
+    output_field=models.IntegerField()
+)
 
 # This model is used to store user information.
 # It extends the AbstractUser model to include an is_approved field.
@@ -10,10 +21,43 @@ class ThinkTaskerUser(AbstractUser):
     is_approved = models.BooleanField(default=False)
     department = models.CharField(max_length=100, blank=True, null=True)
     last_synced_datetime = models.DateTimeField(null=True, blank=True)
+    # Serialized MSAL token cache, used by background jobs to get Graph tokens without a session
+    graph_token_cache = models.TextField(blank=True, default="")
+    # Microsoft To Do list the tasks are created in, resolved once and re-resolved when Graph returns 404
+    todo_list_id = models.CharField(max_length=128, blank=True, default="")
 
     def __str__(self):
         return self.email or self.username
 
+# This model stores the Graph delta link of a user's mail folder.
+# The delta link is returned at the end of a messages/delta round and, when followed on the next sync,
+# returns only the messages that were added, changed (e.g. read state) or removed since then.
+class MailboxDeltaToken(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="mailbox_delta_tokens")
+    folder = models.CharField(max_length=64, default="Inbox")
+    delta_link = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("user", "folder")
+
+    def __str__(self):
+        return f"{self.user} - {self.folder}"
+
+# This model stores the Graph delta link of one of a user's Microsoft To Do lists,
+# used by the To Do reconcile job (todo_sync.py) to pull only the tasks changed in To Do.
+class TodoDeltaToken(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="todo_delta_tokens")
+    todo_list_id = models.CharField(max_length=128)
+    delta_link = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("user", "todo_list_id")
+
+    def __str__(self):
+        return f"{self.user} To Do list {self.todo_list_id}"
+
 # This is the model used to store actionable patterns.
 # It includes the pattern itself, the type of pattern (word, phrase, regex), a label for the pattern,
 # a priority level, and a boolean to indicate if the pattern is active.
@@ -32,6 +76,8 @@ class ActionablePattern(models.Model):
     # Tasks are categorized as Urgent, Important, Medium, or Low based on relevance and deadlines
     priority = models.CharField(max_length=32, blank=True) 
     is_active = models.BooleanField(default=True)
+    # Used as part of the version stamp that invalidates the compiled matcher in patterns.py
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.pattern} ({self.pattern_type})"
@@ -57,9 +103,24 @@ class ProcessedEmail(models.Model):
     web_link = models.URLField(max_length=1024, blank=True, null=True)
     is_reference = models.BooleanField(default=False)
     to_recipients = models.JSONField(default=list, blank=True)
+    in_corpus = models.BooleanField(default=False)
+    # Detected language (nlp.detect_language), "" until it is first needed
+    language = models.CharField(max_length=8, blank=True, default="")
+    # clean_email_text() of subject + body preview, the email's contribution to the scoring corpus
+    tokens = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        # Inbox pages (pagination.py)
+        indexes = [models.Index(fields=["user", "-processed_at", "-id"], name="email_user_processed_keyset")]
 
     def __str__(self):
         return f"{self.subject} - Actionable: {self.is_actionable}"
+
+    def save(self, *args, **kwargs):
+        if not self.tokens and (self.subject or self.body_preview):
+            from .nlp import EmailDocument
+            self.tokens = EmailDocument(self.body_preview, self.subject).tokens
+        super().save(*args, **kwargs)
     
 # This model is used to store the extracted tasks from emails.
 # Each task is associated with an email ID, a subject, a body preview, and a list of actionable patterns.
@@ -80,6 +141,16 @@ class ExtractedTask(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     todo_task_id = models.CharField(max_length=128, blank=True, null=True)
     todo_list_id = models.CharField(max_length=128, blank=True, null=True)
+    # priority_order of priority, computed by the database so every write path keeps it right
+    priority_rank = models.GeneratedField(expression=priority_order, output_field=models.IntegerField(), db_persist=True)
+
+    class Meta:
+        indexes = [
+            # Dashboard columns and the scheduler's open tasks of a date range
+            models.Index(fields=["user", "status", "deadline"], name="task_user_status_deadline"),
+            # Task list pages (pagination.py)
+            models.Index(fields=["user", "priority_rank", "deadline", "-created_at", "-id"], name="task_user_rank_keyset"),
+        ]
 
     def __str__(self):
         email_subject = self.email.subject if self.email else "No Subject"
@@ -90,6 +161,8 @@ class ReferenceDocument(models.Model):
     body = models.TextField()
     tokens = models.JSONField(default=list, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    in_corpus = models.BooleanField(default=False)
+    language = models.CharField(max_length=8, blank=True, default="")
 
     def __str__(self):
         return self.subject or f"Reference #{self.pk}"
@@ -98,4 +171,106 @@ class ReferenceDocument(models.Model):
         if not self.tokens and self.body:
             from nltk.tokenize import word_tokenize
             self.tokens = word_tokenize(self.body.lower())
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+# This model stores the corpus-wide statistics of a single term used for TF-IDF/CF scoring.
+# The corpus is every English ReferenceDocument plus every ProcessedEmail marked as reference.
+# The document_frequency field counts the corpus documents containing the term.
+# The collection_frequency field counts the occurrences of the term across the whole corpus.
+# Rows are maintained incrementally by the signals in signals.py and can be rebuilt
+# from scratch with the rebuild_term_stats management command.
+class TermStatistic(models.Model):
+    term = models.TextField(unique=True)
+    document_frequency = models.PositiveIntegerField(default=0)
+    collection_frequency = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.term} (df={self.document_frequency}, cf={self.collection_frequency})"
+
+# This model holds the number of documents (N) counted in TermStatistic.
+# Only a single row (pk=1) is ever used.
+class CorpusStatistic(models.Model):
+    document_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Corpus ({self.document_count} documents)"
+
+# This model is used to store background jobs executed by the run_workers management command.
+# The kind field selects the job handler (see jobs.py) and the status field tracks its lifecycle.
+# The stage, total_count, processed_count and created_count fields report progress while the job runs,
+# and the message field holds the result (or the error) once it is finished.
+class BackgroundJob(models.Model):
+    KIND_CHOICES = [
+        ('mail_sync', 'Mailbox sync'),
+        ('todo_reconcile', 'To Do reconcile'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="background_jobs")
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES, default='mail_sync')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='queued', db_index=True)
+    stage = models.CharField(max_length=64, blank=True)
+    total_count = models.PositiveIntegerField(default=0)
+    processed_count = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.status})"
+
+# This model is used to cache generated task descriptions.
+# The key is a hash of the cleaned email text, the model/adapter identity and the generation parameters
+# (see summary_cache.py), so the same or a re-sent email never costs a second LLM generation.
+# The last_used_at field drives age-based eviction and the hit_count field records cache hits.
+class TaskDescriptionCache(models.Model):
+    key = models.CharField(max_length=64, unique=True)
+    description = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    hit_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key[:12]}... ({self.hit_count} hits)"
+
+# This model is the write-behind outbox of Microsoft To Do changes.
+# The task views save locally and add an entry here; the worker (outbox.py) merges the pending
+# entries of each To Do task into one PATCH or DELETE and sends them with $batch.
+# Entries hold the Graph ids rather than a foreign key, so a deleted task can still be deleted in To Do.
+class TodoOutboxEntry(models.Model):
+    ACTION_CHOICES = [
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="todo_outbox")
+    todo_list_id = models.CharField(max_length=128)
+    todo_task_id = models.CharField(max_length=128, db_index=True)
+    action = models.CharField(max_length=16, choices=ACTION_CHOICES, default='update')
+    # Graph fields to PATCH (title, body, dueDateTime, status)
+    changes = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='pending')
+    claim = models.CharField(max_length=32, blank=True, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return f"{self.action} {self.todo_task_id} ({self.status})"
@@ -0,0 +1,124 @@
+import functools
+import re
+
+from bs4 import BeautifulSoup
+from langdetect import DetectorFactory, detect, LangDetectException
+from nltk.corpus import stopwords
+from nltk.tokenize import word_tokenize
+
+# Seeded so the same text always gets the same answer from langdetect
+DetectorFactory.seed = 0
+
+UNDETERMINED = "und"
+LETTER_WORD_RE = re.compile(r"[^\W\d_]+")
+# Frequent English function words, leaving out the short ones that are also common words of other
+# Latin-script languages ("is", "we", "of" in Dutch, "do", "as", "me" in Portuguese, "to", "by" in
+# Polish, "was", "also" in German, "for", "at" in Danish, ...), so a high share of them is a sign of English.
+ENGLISH_MARKERS = frozenset({
+    "the", "and", "are", "were", "be", "been", "with", "you", "your", "this", "that", "these", "have",
+    "had", "will", "would", "could", "should", "can", "please", "our", "it", "its", "not", "from", "if",
+    "does", "did", "they", "their", "there", "what", "which", "when", "who", "all", "any", "us", "she",
+    "thanks", "thank", "let", "know", "about", "into", "than", "then", "just", "need",
+})
+HEURISTIC_MIN_WORDS = 6
+HEURISTIC_MIN_ASCII_RATIO = 0.98
+HEURISTIC_MIN_MARKER_RATIO = 0.2
+
+# This function returns the ISO 639-1 code of the language of a text, or "und" when it cannot tell.
+# Obvious English (plain ASCII letters with many English function words) is recognised by a
+# cheap heuristic; every other text goes to the (seeded) langdetect detector.
+def detect_language(text):
+    words = LETTER_WORD_RE.findall((text or "").lower())
+    if not words:
+        return UNDETERMINED
+    if len(words) >= HEURISTIC_MIN_WORDS:
+        letters = sum(len(w) for w in words)
+        ascii_letters = sum(len(w) for w in words if w.isascii())
+        markers = sum(1 for w in words if w in ENGLISH_MARKERS)
+        if ascii_letters >= HEURISTIC_MIN_ASCII_RATIO * letters and markers >= HEURISTIC_MIN_MARKER_RATIO * len(words):
+            return "en"
+    try:
+        return detect(text)
+    except LangDetectException:
+        return UNDETERMINED
+
+def is_english(text):
+    return detect_language(text) == "en"
+
+SIGNATURE_RE = re.compile(r"(?i)(Best regards|Regards|BR|Sent from my|Sincerely|Thanks|Thank you|Yours truly|Cheers)[\s\S]+")
+GREETING_RE = re.compile(r"(?i)^(hi|hello|dear|good morning|good afternoon|good evening)[^,]*,?")
+
+@functools.lru_cache(maxsize=None)
+def english_stopwords():
+    return frozenset(stopwords.words('english'))
+
+def html_to_text(html):
+    return BeautifulSoup(html, "html.parser").get_text(separator=" ")
+
+# This class holds the text artifacts of one email and computes each of them once, on first use,
+# so the corpus, scoring, language and summarizer stages of a sync share the same work.
+# The subject is kept apart from the body so body_document can reuse the parsed body.
+#   text          raw subject + body
+#   plain_text    the same without HTML
+#   cleaned_text  plain text without greeting and signature, lower case
+#   tokens        word tokens of cleaned_text without stopwords and punctuation
+#   language      detect_language(text)
+class EmailDocument:
+    def __init__(self, body, subject=""):
+        self.body = body or ""
+        self.subject = subject or ""
+
+    @functools.cached_property
+    def text(self):
+        return self.subject + " " + self.body if self.subject else self.body
+
+    @functools.cached_property
+    def plain_body(self):
+        return html_to_text(self.body)
+
+    @functools.cached_property
+    def plain_text(self):
+        if not self.subject:
+            return self.plain_body
+        return html_to_text(self.subject) + " " + self.plain_body
+
+    @functools.cached_property
+    def cleaned_text(self):
+        text = SIGNATURE_RE.sub("", self.plain_text)
+        text = GREETING_RE.sub("", text.strip())
+        return text.lower()
+
+    @functools.cached_property
+    def tokens(self):
+        stop_words = english_stopwords()
+        return [word for word in word_tokenize(self.cleaned_text) if word.isalnum() and word not in stop_words]
+
+    @functools.cached_property
+    def language(self):
+        return detect_language(self.text)
+
+    # The body alone (what the summarizer reads), sharing the already parsed body
+    @functools.cached_property
+    def body_document(self):
+        if not self.subject:
+            return self
+        document = EmailDocument(self.body)
+        if "plain_body" in self.__dict__:
+            document.plain_body = self.plain_body
+        return document
+
+def as_document(value):
+    return value if isinstance(value, EmailDocument) else EmailDocument(value)
+
+# This function builds the documents of many (body, subject) pairs; identical emails share one document.
+def build_documents(emails):
+    documents = {}
+    return [documents.setdefault((body, subject), EmailDocument(body, subject)) for body, subject in emails]
+
+def clean_email_text(text):
+    return EmailDocument(text).tokens
+
+# This function cleans many texts. It is a module-level function so a process pool can run it
+# (see the backfill_email_tokens command).
+def clean_many(texts):
+    return [document.tokens for document in build_documents((text, "") for text in texts)]
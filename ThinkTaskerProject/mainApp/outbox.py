@@ -0,0 +1,140 @@
+import logging
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import TodoOutboxEntry
+from . import graph, graph_auth, todo
+
+logger = logging.getLogger(__name__)
+
+# Write-behind outbox of Microsoft To Do changes.
+# The task views only record what changed (enqueue_update/enqueue_delete) and return right away;
+# the worker calls flush(), which merges the pending entries of every To Do task into a single
+# PATCH or DELETE, sends them with $batch and retries failures with exponential backoff.
+
+def enqueue_update(user, todo_list_id, todo_task_id, title=None, description=None, due_date=None, status=None):
+    changes = todo.build_update_payload(title, description, due_date, status)
+    if not todo_task_id or not changes:
+        return None
+    return TodoOutboxEntry.objects.create(
+        user=user, todo_list_id=todo_list_id, todo_task_id=todo_task_id, action="update", changes=changes
+    )
+
+def enqueue_delete(user, todo_list_id, todo_task_id):
+    if not todo_task_id:
+        return None
+    return TodoOutboxEntry.objects.create(
+        user=user, todo_list_id=todo_list_id, todo_task_id=todo_task_id, action="delete"
+    )
+
+# This function merges the entries of one To Do task (oldest first) into one action.
+# Later changes of a field win and a delete replaces every update.
+def merge_entries(entries):
+    action, changes = "update", {}
+    for entry in entries:
+        if entry.action == "delete":
+            action, changes = "delete", {}
+        elif action == "update":
+            changes.update(entry.changes)
+    return action, changes
+
+# This function claims the pending entries of up to limit To Do tasks that have a due entry.
+# All pending entries of a claimed task are claimed together, so its changes are never sent
+# out of order, and tasks that another worker is sending are skipped.
+# The conditional UPDATE with a unique claim token makes concurrent workers claim disjoint entries.
+def claim_due_entries(limit):
+    now = timezone.now()
+    # Entries left in "sending" by a worker that died go back to the queue
+    TodoOutboxEntry.objects.filter(
+        status="sending", claimed_at__lt=now - timedelta(seconds=settings.TODO_OUTBOX_CLAIM_TIMEOUT)
+    ).update(status="pending", claim="")
+
+    busy = TodoOutboxEntry.objects.filter(status="sending").values("todo_task_id")
+    task_ids = list(
+        TodoOutboxEntry.objects
+        .filter(status="pending", next_attempt_at__lte=now)
+        .exclude(todo_task_id__in=busy)
+        .order_by("created_at")
+        .values_list("todo_task_id", flat=True)
+        .distinct()[:limit]
+    )
+    if not task_ids:
+        return []
+    claim = uuid.uuid4().hex
+    # busy is checked again in the UPDATE: a task another worker claimed since the SELECT above
+    # may have a newer pending entry, which must wait for the one being sent
+    TodoOutboxEntry.objects.filter(status="pending", todo_task_id__in=task_ids).exclude(todo_task_id__in=busy).update(
+        status="sending", claim=claim, claimed_at=now
+    )
+    return list(TodoOutboxEntry.objects.filter(claim=claim).select_related("user").order_by("created_at", "pk"))
+
+def _done(group):
+    TodoOutboxEntry.objects.filter(pk__in=[entry.pk for entry in group]).delete()
+
+def _reschedule(group, error):
+    attempts = max(entry.attempts for entry in group) + 1
+    fields = {"claim": "", "attempts": attempts, "last_error": error[:1000]}
+    if attempts >= settings.TODO_OUTBOX_MAX_ATTEMPTS:
+        logger.error(f"Giving up To Do {group[0].action} of task {group[0].todo_task_id}: {error}")
+        fields["status"] = "failed"
+    else:
+        delay = min(settings.TODO_OUTBOX_BACKOFF_MAX, settings.TODO_OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1))
+        fields["status"] = "pending"
+        fields["next_attempt_at"] = timezone.now() + timedelta(seconds=delay)
+    TodoOutboxEntry.objects.filter(pk__in=[entry.pk for entry in group]).update(**fields)
+
+def _send(user, groups):
+    access_token = graph_auth.get_user_access_token(user)
+    if not access_token:
+        for group in groups:
+            _reschedule(group, "Microsoft sign-in expired")
+        return
+
+    sub_requests = []
+    for group in groups:
+        action, changes = merge_entries(group)
+        url = f"/me/todo/lists/{group[0].todo_list_id}/tasks/{group[0].todo_task_id}"
+        if action == "delete":
+            sub_requests.append({"method": "DELETE", "url": url})
+        else:
+            sub_requests.append({
+                "method": "PATCH",
+                "url": url,
+                "headers": {"Content-Type": "application/json"},
+                "body": changes,
+            })
+    try:
+        results = graph.batch(sub_requests, access_token)
+    except Exception as e:
+        for group in groups:
+            _reschedule(group, str(e))
+        return
+
+    for group, sub in zip(groups, results):
+        status = sub.get("status")
+        if status in (200, 204):
+            _done(group)
+        elif status == 404:
+            # Deleted in To Do in the meantime, there is nothing left to update
+            logger.info(f"To Do task {group[0].todo_task_id} no longer exists, dropping its pending changes")
+            _done(group)
+        else:
+            _reschedule(group, f"{status} {sub.get('body')}")
+
+# This function sends the due outbox entries of up to limit To Do tasks.
+# It returns the number of tasks it handled (sent, dropped or rescheduled).
+def flush(limit=None):
+    entries = claim_due_entries(limit or settings.TODO_OUTBOX_BATCH_SIZE)
+    groups = defaultdict(list)
+    for entry in entries:
+        groups[(entry.user_id, entry.todo_list_id, entry.todo_task_id)].append(entry)
+    by_user = defaultdict(list)
+    for (user_id, _, _), group in groups.items():
+        by_user[user_id].append(group)
+    for user_groups in by_user.values():
+        _send(user_groups[0][0].user, user_groups)
+    return len(groups)
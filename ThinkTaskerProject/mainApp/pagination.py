@@ -0,0 +1,106 @@
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+
+# Keyset (cursor) pagination for the inbox and the task list.
+# A page is "the next page_size rows after the last row of the previous page" in the
+# queryset's ordering, found with WHEREs on the ordering columns instead of an OFFSET,
+# so with an index on (user, ordering columns...) the database reads about page_size
+# index entries whatever the depth of the page.
+# The cursor is the ordering values of the last row shown, JSON encoded in a URL safe string.
+
+INBOX_ORDERING = ("-processed_at", "-id")
+TASK_LIST_ORDERING = ("priority_rank", "deadline", "-created_at", "-id")
+
+Page = namedtuple("Page", ["items", "next_cursor"])
+
+def encode_cursor(values):
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+# This function returns the values of a cursor for the ordering of model, converted and validated
+# with their fields (the output field of a generated one), or None for a missing or malformed one.
+def decode_cursor(cursor, model, ordering):
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        return None
+    if not isinstance(values, list) or len(values) != len(ordering):
+        return None
+    decoded = []
+    for field_name, value in zip(ordering, values):
+        field = model._meta.get_field(field_name.lstrip("-"))
+        field = getattr(field, "output_field", field)
+        if value is None:
+            if not field.null:
+                return None
+            decoded.append(None)
+            continue
+        if isinstance(value, (list, dict)):
+            return None
+        try:
+            value = field.to_python(value)
+            field.run_validators(value)
+        except (ValidationError, ValueError, TypeError):
+            return None
+        decoded.append(value)
+    return decoded
+
+# Conditions for the rows after value in the ordering of field, in the order the rows come.
+# NULLs sort where the database puts them, only nullable fields are tested for NULL.
+def _after(model, field, descending, value):
+    nullable = model._meta.get_field(field).null
+    nulls_after = nullable and connection.features.nulls_order_largest != descending
+    if value is None:
+        return [] if nulls_after else [Q(**{f"{field}__isnull": False})]
+    conditions = [Q(**{f"{field}__{'lt' if descending else 'gt'}": value})]
+    if nulls_after:
+        conditions.append(Q(**{f"{field}__isnull": True}))
+    return conditions
+
+def _equal(field, value):
+    return Q(**{f"{field}__isnull": True}) if value is None else Q(**{field: value})
+
+# This function yields the conditions of the rows after the cursor values, in order:
+# (a, b, c) after (x, y, z) is a = x and b = y and c after z, then a = x and b after y,
+# then a after x. Each one is an equality prefix and a range on one column, a single
+# seek in the index on the ordering columns, whatever the depth of the cursor.
+def _after_cursor(model, ordering, values):
+    columns = [(field.lstrip("-"), field.startswith("-")) for field in ordering]
+    for i in reversed(range(len(columns))):
+        prefix = Q()
+        for j, (previous, _) in enumerate(columns[:i]):
+            prefix &= _equal(previous, values[j])
+        field, descending = columns[i]
+        for condition in _after(model, field, descending, values[i]):
+            yield prefix & condition
+
+# This function returns a Page of queryset in ordering (unique thanks to the final id) starting
+# after cursor, next_cursor is None on the last page.
+# After a cursor the rows come from one query per _after_cursor condition, until the page is full.
+def keyset_page(queryset, ordering, cursor=None, page_size=None):
+    if page_size is None:
+        page_size = settings.PAGE_SIZE
+    queryset = queryset.order_by(*ordering)
+    values = decode_cursor(cursor, queryset.model, ordering)
+    if values is None:
+        items = list(queryset[:page_size + 1])
+    else:
+        items = []
+        for condition in _after_cursor(queryset.model, ordering, values):
+            items.extend(queryset.filter(condition)[:page_size + 1 - len(items)])
+            if len(items) > page_size:
+                break
+    if len(items) <= page_size:
+        return Page(items, None)
+    items = items[:page_size]
+    last = items[-1]
+    return Page(items, encode_cursor([getattr(last, field.lstrip("-")) for field in ordering]))
@@ -0,0 +1,139 @@
+import logging
+import re
+from collections import deque
+
+from django.db.models import Count, Max
+
+from .models import ActionablePattern
+
+logger = logging.getLogger(__name__)
+
+# This function checks for a regex word boundary (\b) at position i of text.
+def _is_boundary(text, i):
+    before = i > 0 and (text[i - 1].isalnum() or text[i - 1] == "_")
+    after = i < len(text) and (text[i].isalnum() or text[i] == "_")
+    return before != after
+
+# This class matches every active ActionablePattern against a text in a single pass.
+# Word and phrase patterns are compiled into one Aho-Corasick automaton over the lowercased text,
+# word patterns are then checked for word boundaries like rf"\b{re.escape(pattern)}\b" would be.
+# Regex patterns are compiled once with re.IGNORECASE.
+# Matches are returned in the same order as the patterns were loaded.
+class PatternMatcher:
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._regexes = []
+        self._word_regexes = {}
+        self._empty_phrases = []
+        self._fallback_words = []
+
+        for index, pattern in enumerate(self.patterns):
+            if pattern.pattern_type in ("word", "phrase"):
+                key = pattern.pattern.lower()
+                if pattern.pattern_type == "phrase" and not key:
+                    self._empty_phrases.append(index)
+                elif pattern.pattern_type == "word" and (not key or not key.isascii()):
+                    # re.IGNORECASE folds non-ASCII letters differently from str.lower()
+                    self._fallback_words.append(index)
+                else:
+                    self._add_keyword(key, index)
+            elif pattern.pattern_type == "regex":
+                try:
+                    self._regexes.append((index, re.compile(pattern.pattern, re.IGNORECASE)))
+                except re.error as e:
+                    logger.warning(f"Skipping invalid actionable pattern {pattern.pattern!r}: {e}")
+        self._build_failure_links()
+
+    def _add_keyword(self, key, index):
+        state = 0
+        for ch in key:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((index, len(key)))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(ch, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def _word_matches(self, index, text):
+        regex = self._word_regexes.get(index)
+        if regex is None:
+            regex = re.compile(rf"\b{re.escape(self.patterns[index].pattern)}\b", re.IGNORECASE)
+            self._word_regexes[index] = regex
+        return regex.search(text) is not None
+
+    def match(self, text):
+        found = set(self._empty_phrases)
+        lowered = text.lower()
+        # Lowercasing a few special characters changes the text length; boundary checks then fall
+        # back to the per-pattern regex so positions never drift.
+        same_length = len(lowered) == len(text)
+        pending_words = set(self._fallback_words)
+
+        goto, fail, output, patterns = self._goto, self._fail, self._output, self.patterns
+        state = 0
+        for i, ch in enumerate(lowered):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index, length in output[state]:
+                if index in found:
+                    continue
+                if patterns[index].pattern_type == "phrase":
+                    found.add(index)
+                elif not same_length:
+                    pending_words.add(index)
+                elif _is_boundary(text, i - length + 1) and _is_boundary(text, i + 1):
+                    found.add(index)
+
+        for index in pending_words - found:
+            if self._word_matches(index, text):
+                found.add(index)
+        for index, regex in self._regexes:
+            if regex.search(text):
+                found.add(index)
+        return [patterns[i] for i in sorted(found)]
+
+    def match_many(self, texts):
+        return [self.match(text) for text in texts]
+
+_matcher = None
+_matcher_version = None
+
+# This function returns a version stamp for the ActionablePattern table.
+# Any add, edit or delete in the admin changes the row count or the latest updated_at.
+def get_patterns_version():
+    stamp = ActionablePattern.objects.aggregate(count=Count("id"), updated=Max("updated_at"))
+    return (stamp["count"], stamp["updated"])
+
+# This function returns the compiled matcher of the active patterns, cached per process.
+# The matcher is rebuilt only when the version stamp of the pattern table changes.
+def get_pattern_matcher():
+    global _matcher, _matcher_version
+    version = get_patterns_version()
+    if _matcher is None or version != _matcher_version:
+        _matcher = PatternMatcher(ActionablePattern.objects.filter(is_active=True).order_by("pk"))
+        _matcher_version = version
+    return _matcher
+
+def invalidate_pattern_matcher():
+    global _matcher, _matcher_version
+    _matcher = None
+    _matcher_version = None
@@ -1,28 +1,121 @@
-import requests
+import logging
+
+from django.conf import settings
+
+from . import graph
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_SELECT = "id,subject,bodyPreview,receivedDateTime,from,isRead,webLink,importance,toRecipients"
 
 # This function is used to mark emails as read in batches using the Microsoft Graph API.
+# Throttled sub-requests are retried by the Graph client, the ones that still fail are logged.
+# It returns the ids of the messages that could not be marked as read.
 def batch_mark_emails_as_read(message_ids, access_token):
-    def chunked(lst, n):
-        for i in range(0, len(lst), n):
-            yield lst[i:i + n]
-    url = "https://graph.microsoft.com/v1.0/$batch"
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    }
-    # 20 is Graph API batch limit
-    for chunk in chunked(message_ids, 20):
-        batch_requests = [
-            {
-                "id": str(i),
-                "method": "PATCH",
-                "url": f"/me/messages/{message_id}",
-                "headers": {"Content-Type": "application/json"},
-                "body": {"isRead": True}
-            }
-            for i, message_id in enumerate(chunk)
-        ]
-        batch_payload = {"requests": batch_requests}
-        resp = requests.post(url, json=batch_payload, headers=headers)
+    sub_requests = [
+        {
+            "method": "PATCH",
+            "url": f"/me/messages/{message_id}",
+            "headers": {"Content-Type": "application/json"},
+            "body": {"isRead": True}
+        }
+        for message_id in message_ids
+    ]
+    failed = [
+        message_id
+        for message_id, sub in zip(message_ids, graph.batch(sub_requests, access_token))
+        if sub.get("status") != 200
+    ]
+    if failed:
+        logger.warning(f"Marking {len(failed)} of {len(message_ids)} emails as read failed")
+    return failed
+
+# This function fetches the full bodies of many messages using Graph $batch requests.
+# Batches of 20 messages are sent concurrently by a bounded pool of workers.
+# With plain_text=True Graph returns text bodies, so no HTML parsing is needed afterwards.
+# It returns a message-id -> body map; messages that could not be fetched are left out, so the
+# caller can tell them from empty bodies and retry them later.
+def batch_fetch_email_bodies(message_ids, access_token, plain_text=True, max_workers=None):
+    message_ids = list(dict.fromkeys(message_ids))
+    if max_workers is None:
+        max_workers = getattr(settings, "GRAPH_BODY_FETCH_WORKERS", 4)
+    sub_headers = {"Prefer": 'outlook.body-content-type="text"'} if plain_text else {}
+    sub_requests = [
+        {"method": "GET", "url": f"/me/messages/{message_id}?$select=body", "headers": sub_headers}
+        for message_id in message_ids
+    ]
+    bodies = {}
+    failed = []
+    for message_id, sub in zip(message_ids, graph.batch(sub_requests, access_token, max_workers=max_workers)):
+        if sub.get("status") == 200:
+            bodies[message_id] = (sub.get("body") or {}).get("body", {}).get("content", "")
+        else:
+            failed.append(message_id)
+    if failed:
+        logger.warning(f"Fetching {len(failed)} of {len(message_ids)} email bodies failed")
+    return bodies
+
+# This function reads a round of the Graph messages/delta query of a mail folder.
+# Without a delta_link the round starts from scratch and returns every message of the folder.
+# With the delta_link saved from the previous round only added or changed messages are returned.
+# It returns (messages, removed_message_ids, new_delta_link). new_delta_link is None when
+# the round did not complete, so the caller keeps the previous link and retries next time.
+def fetch_email_delta(access_token, delta_link=None, folder="Inbox"):
+    headers = {"Prefer": "odata.maxpagesize=50"}
+    initial_url = f"/me/mailFolders/{folder}/messages/delta?$select={MESSAGE_SELECT}"
+    url = delta_link or initial_url
+    emails = []
+    removed = []
+    while url:
+        resp = graph.get(url, access_token, headers=headers)
+        if resp.status_code == 410 and url != initial_url:
+            # The sync state expired on the Graph side, start a full round again
+            logger.info(f"Delta link expired for folder {folder}, restarting the delta round")
+            url, emails, removed = initial_url, [], []
+            continue
         if resp.status_code != 200:
-            print(f"Batched marking emails as read failed: {resp.status_code} {resp.text}")
+            logger.warning(f"Delta query failed: {resp.status_code} {resp.text}")
+            return emails, removed, None
+        data = resp.json()
+        for m in data.get("value", []):
+            if "@removed" in m:
+                removed.append(m["id"])
+            else:
+                emails.append(m)
+        if "@odata.deltaLink" in data:
+            return emails, removed, data["@odata.deltaLink"]
+        url = data.get("@odata.nextLink", None)
+    return emails, removed, None
+
+def fetch_all_emails(access_token, folder="Inbox"):
+    url = f"/me/mailFolders/{folder}/messages?$select={MESSAGE_SELECT}&$top=50"
+    return list(graph.get_all(url, access_token))
+
+# This function fetches the messages received since the last sync, or every message on the first sync.
+def fetch_emails_since(access_token, last_sync, folder="Inbox"):
+    if not last_sync:
+        return fetch_all_emails(access_token, folder)
+    received_after = last_sync.strftime('%Y-%m-%dT%H:%M:%SZ')
+    url = (
+        f"/me/mailFolders/{folder}/messages"
+        f"?$filter=receivedDateTime ge {received_after}"
+        f"&$select={MESSAGE_SELECT}&$top=50"
+    )
+    return list(graph.get_all(url, access_token))
+
+def fetch_unread_emails(access_token, folder="Inbox"):
+    url = f"/me/mailFolders/{folder}/messages?$filter=isRead eq false&$select={MESSAGE_SELECT}&$top=50"
+    return list(graph.get_all(url, access_token))
+
+def fetch_full_email_body(message_id, access_token):
+    resp = graph.get(f"/me/messages/{message_id}?$select=body", access_token)
+    if resp.status_code == 200:
+        return resp.json().get("body", {}).get("content", "")
+    return ""
+
+def mark_email_as_read(message_id, access_token):
+    resp = graph.patch(
+        f"/me/messages/{message_id}", access_token,
+        json={"isRead": True}, headers={"Content-Type": "application/json"}
+    )
+    return resp.status_code == 200
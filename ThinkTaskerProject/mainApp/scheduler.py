@@ -0,0 +1,124 @@
+import heapq
+import itertools
+from collections import defaultdict
+from datetime import datetime, time
+
+from django.utils import timezone
+
+from .models import ExtractedTask
+from .business_calendar import calendar_for
+
+def get_priority_rank(priority):
+    return {"Urgent": 3, "Important": 2, "Medium": 1, "Low": 0}.get(priority, 0)
+
+# In-memory slot index of a user's calendar from start_day on.
+# The open tasks of the range are loaded with one query and grouped by day, and the free
+# slots of each day are a bitmap over the calendar's work hours (bit i set = work_hours[i] is free).
+# The hours of today that have already started are never free.
+class SlotIndex:
+    def __init__(self, user, start_day, now, calendar):
+        self.work_hours = calendar.work_hours
+        self.all_slots = (1 << len(self.work_hours)) - 1
+        self.tz = timezone.get_current_timezone()
+        self.now = timezone.localtime(now, self.tz)
+        self.tasks_by_day = defaultdict(list)
+        self.free = {}
+        open_tasks = ExtractedTask.objects.filter(
+            user=user, status="Open", deadline__gte=datetime.combine(start_day, time.min, tzinfo=self.tz)
+        ).only("pk", "deadline", "priority")
+        for task in open_tasks:
+            self.tasks_by_day[timezone.localtime(task.deadline, self.tz).date()].append(task)
+
+    # Open tasks of the day, removed from the index so they are only rescheduled once
+    def pop_tasks(self, day):
+        return self.tasks_by_day.pop(day, [])
+
+    def free_slots(self, day):
+        if day not in self.free:
+            mask = self.all_slots
+            if day == self.now.date():
+                for i, hour in enumerate(self.work_hours):
+                    if hour <= self.now.hour:
+                        mask &= ~(1 << i)
+            self.free[day] = mask
+        return self.free[day]
+
+    # Takes the earliest free slot of the day and returns its datetime, or None when the day is full
+    def take(self, day):
+        mask = self.free_slots(day)
+        if not mask:
+            return None
+        bit = mask & -mask
+        self.free[day] = mask & ~bit
+        return datetime.combine(day, time(self.work_hours[bit.bit_length() - 1]), tzinfo=self.tz)
+
+# This function schedules new actionable tasks (dicts with "extracted_deadline" and "priority")
+# into the work hours of the user's business calendar and sets their "assigned_deadline".
+# A task starts on the day of its extracted deadline (today when there is none or it is past).
+# The open tasks of that day are rescheduled together with it: highest priority first, then
+# earliest deadline. What does not fit moves on to the next business day, where it competes
+# with that day's open tasks in the same way.
+# The days are walked once in order with one priority heap for the tasks still waiting,
+# and the open tasks that moved are saved with one bulk_update.
+def assign_deadline_and_priority_batch(user, actionable_tasks, now=None):
+    if not actionable_tasks:
+        return
+    if now is None:
+        now = timezone.now()
+    tz = timezone.get_current_timezone()
+    calendar = calendar_for(user)
+
+    # Group new actionable tasks by day
+    new_by_day = defaultdict(list)
+    for t in actionable_tasks:
+        d = t["extracted_deadline"]
+        # If deadline is past (delayed), schedule for today or else use extracted
+        new_by_day[(d if d and d >= now else now).astimezone(tz).date()].append(t)
+    new_days = sorted(new_by_day)
+
+    index = SlotIndex(user, new_days[0], now, calendar)
+    order = itertools.count()
+
+    def push(heap, task, is_new):
+        priority = task["priority"] if is_new else task.priority
+        deadline = task["extracted_deadline"] if is_new else task.deadline
+        heapq.heappush(heap, (-get_priority_rank(priority), deadline or now, next(order), is_new, task))
+
+    waiting = []  # tasks that did not fit on an earlier day
+    waiting_day = None
+    moved = []
+    next_new = 0
+    while next_new < len(new_days) or waiting:
+        candidates = [waiting_day] if waiting else []
+        if next_new < len(new_days):
+            candidates.append(new_days[next_new])
+        day = min(candidates)
+        if next_new < len(new_days) and new_days[next_new] == day:
+            next_new += 1
+
+        # Waiting tasks only move to business days, a weekend day or holiday only schedules its own tasks
+        heap = waiting if calendar.is_business_day(day) else []
+        for task in index.pop_tasks(day):
+            push(heap, task, False)
+        for task in new_by_day.get(day, ()):
+            push(heap, task, True)
+
+        while heap:
+            slot = index.take(day)
+            if slot is None:
+                break
+            _, _, _, is_new, task = heapq.heappop(heap)
+            if is_new:
+                task["assigned_deadline"] = slot
+            elif task.deadline != slot:
+                task.deadline = slot
+                moved.append(task)
+
+        if heap is not waiting:
+            for item in heap:
+                heapq.heappush(waiting, item)
+        if waiting:
+            waiting_day = calendar.next_business_day(day)
+
+    if moved:
+        ExtractedTask.objects.bulk_update(moved, ["deadline"], batch_size=500)
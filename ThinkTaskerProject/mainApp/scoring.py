@@ -0,0 +1,104 @@
+import math
+from collections import Counter
+
+import numpy as np
+
+TFIDF_MAX = 20.0
+CF_MAX = 2.0
+ALPHA = 0.7
+BETA = 0.3
+
+HIGH_PRIORITY_TERMS = {'urgent', 'ASAP', 'emergency', 'field issue', 'escalate', 'critical', 'immediate attention'}
+
+def compute_tf(term, doc_tokens):
+    count = doc_tokens.count(term)
+    return 1 + math.log10(count) if count > 0 else 0
+
+def compute_idf(term, all_docs_tokens):
+    N = len(all_docs_tokens)
+    df = sum(1 for tokens in all_docs_tokens if term in tokens)
+    if df == 0:
+        return 0
+    return math.log10(N / df)
+
+def compute_cf(term, all_docs_tokens):
+    N = len(all_docs_tokens)
+    count = sum(tokens.count(term) for tokens in all_docs_tokens)
+    return count / N if N > 0 else 0
+
+def get_contextual_weight(term):
+    return 2.0 if term in HIGH_PRIORITY_TERMS else 1.0
+
+# This function maps an actionable score to the task priority buckets.
+def priority_for_score(score):
+    return (
+        "Urgent" if score >= 0.7 else
+        "Important" if score >= 0.4 else
+        "Medium" if score >= 0.2 else
+        "Low"
+    )
+
+# This function builds a sparse (CSR) document-term matrix over an interned vocabulary.
+# The entries of each document follow the iteration order of set(tokens), which is the order
+# the per-term scoring loop has always used (the contextual weight is a running maximum over it).
+# It returns the vocabulary (list of terms), the row pointer, the term ids and the term counts.
+def build_document_term_matrix(token_lists):
+    vocabulary = {}
+    indptr = [0]
+    term_ids = []
+    counts = []
+    for tokens in token_lists:
+        tally = Counter(tokens)
+        for term in set(tokens):
+            term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+            counts.append(tally[term])
+        indptr.append(len(term_ids))
+    return (
+        list(vocabulary),
+        np.array(indptr, dtype=np.int64),
+        np.array(term_ids, dtype=np.int64),
+        np.array(counts, dtype=np.float64),
+    )
+
+# This function scores all emails of a sync in one batched pass.
+# token_lists holds the cleaned tokens of each email, corpus is a term_stats.Corpus
+# and boosts holds the extra contextual weight of each email (1.0 if flagged or important).
+# It returns the same scores as the per-term alpha/beta formula, as a NumPy array.
+def score_emails(token_lists, corpus, boosts=None):
+    n_docs = len(token_lists)
+    if n_docs == 0:
+        return np.zeros(0)
+    vocabulary, indptr, term_ids, counts = build_document_term_matrix(token_lists)
+
+    corpus.load_terms(vocabulary)
+    N = corpus.document_count
+    df = np.array([corpus.document_frequency[t] for t in vocabulary], dtype=np.float64)
+    cfreq = np.array([corpus.collection_frequency[t] for t in vocabulary], dtype=np.float64)
+    idf = np.zeros(len(vocabulary))
+    if N > 0:
+        present = df > 0
+        idf[present] = np.log10(N / df[present])
+        cf = cfreq / N
+    else:
+        cf = np.zeros(len(vocabulary))
+    weights = np.array([get_contextual_weight(t) for t in vocabulary], dtype=np.float64)
+
+    doc_index = np.repeat(np.arange(n_docs), np.diff(indptr))
+    entry_weights = np.maximum(weights[term_ids], 1.0)
+    # Running maximum of the contextual weight inside each document: offsetting every document
+    # by more than the largest weight lets one global accumulate respect document boundaries.
+    offset = doc_index * (entry_weights.max(initial=1.0) + 1.0)
+    running_weights = np.maximum.accumulate(entry_weights + offset) - offset
+
+    tf = 1 + np.log10(counts)
+    tfidf_sum = np.bincount(doc_index, weights=tf * idf[term_ids] * running_weights, minlength=n_docs)
+    cf_sum = np.bincount(doc_index, weights=cf[term_ids], minlength=n_docs)
+
+    ct = np.ones(n_docs)
+    np.maximum.at(ct, doc_index, entry_weights)
+    if boosts is not None:
+        ct += np.asarray(boosts, dtype=np.float64)
+
+    tfidf_norm = np.minimum((tfidf_sum * ct) / TFIDF_MAX, 1)
+    cf_norm = np.minimum(cf_sum / CF_MAX, 1)
+    return ALPHA * tfidf_norm + BETA * cf_norm
@@ -0,0 +1,106 @@
+import functools
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .models import ExtractedTask, ProcessedEmail
+
+# Full-text search over tasks (subject, task_description) and processed emails (subject, body_preview).
+# On SQLite the rows are indexed in FTS5 tables that triggers keep in sync with the model tables,
+# bulk_create/bulk_update included (migration 0027). A migration that makes Django rebuild one of
+# the tables on SQLite drops its triggers and has to create them again, as 0028 does.
+# On PostgreSQL a GIN index on the tsvector of the same columns is used. On other databases,
+# or when the index is missing, the search falls back to icontains.
+# Every word of the query must match, as a prefix, so results show up while typing.
+# Results are ranked by relevance, a match in the subject counts twice.
+
+TERM_RE = re.compile(r"\w+")
+
+# What is indexed, per model: (FTS5 table, columns, PostgreSQL tsvector expression)
+INDEXES = {
+    ExtractedTask: (
+        "mainApp_extractedtask_fts",
+        ("subject", "task_description"),
+        "setweight(to_tsvector('simple', coalesce(subject, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(task_description, '')), 'B')",
+    ),
+    ProcessedEmail: (
+        "mainApp_processedemail_fts",
+        ("subject", "body_preview"),
+        "setweight(to_tsvector('simple', coalesce(subject, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(body_preview, '')), 'B')",
+    ),
+}
+
+def query_terms(query):
+    return TERM_RE.findall((query or "").lower())[:settings.SEARCH_MAX_TERMS]
+
+@functools.lru_cache(maxsize=None)
+def _fts_table_exists(table):
+    return table in connection.introspection.table_names()
+
+def backend():
+    if connection.vendor == "sqlite" and _fts_table_exists(INDEXES[ExtractedTask][0]):
+        return "fts5"
+    if connection.vendor == "postgresql":
+        return "postgresql"
+    return "icontains"
+
+# This function returns the ids of the user's rows matching every term, best match first
+def _ranked_ids(model, user, terms):
+    table = model._meta.db_table
+    fts_table, columns, tsvector = INDEXES[model]
+    limit = settings.SEARCH_MAX_RESULTS
+    if backend() == "fts5":
+        # Quoted so the words are never read as FTS5 operators, * for prefix matching
+        match = " ".join(f'"{term}"*' for term in terms)
+        weights = ", ".join(["2.0", "1.0"][:len(columns)])
+        sql = (
+            f'SELECT t.id FROM "{fts_table}" JOIN "{table}" t ON t.id = "{fts_table}".rowid '
+            f'WHERE "{fts_table}" MATCH %s AND t.user_id = %s '
+            f'ORDER BY bm25("{fts_table}", {weights}) LIMIT %s'
+        )
+        params = [match, user.pk, limit]
+    else:
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        sql = (
+            f'SELECT id FROM "{table}" WHERE user_id = %s AND ({tsvector}) @@ to_tsquery(\'simple\', %s) '
+            f'ORDER BY ts_rank({tsvector}, to_tsquery(\'simple\', %s)) DESC LIMIT %s'
+        )
+        params = [user.pk, tsquery, tsquery, limit]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+def _search(model, user, query, fields):
+    terms = query_terms(query)
+    queryset = model.objects.filter(user=user)
+    if not terms:
+        return queryset.none()
+    if backend() == "icontains":
+        for term in terms:
+            condition = Q()
+            for field in fields:
+                condition |= Q(**{f"{field}__icontains": term})
+            queryset = queryset.filter(condition)
+        return queryset
+    ids = _ranked_ids(model, user, terms)
+    return (
+        queryset.filter(pk__in=ids)
+        .annotate(search_rank=Case(
+            *[When(pk=pk, then=Value(position)) for position, pk in enumerate(ids)],
+            default=Value(len(ids)), output_field=IntegerField(),
+        ))
+        .order_by("search_rank")
+    )
+
+# This function returns the user's tasks matching query, best match first
+# (annotated with search_rank, except for the icontains fallback).
+def search_tasks(user, query):
+    return _search(ExtractedTask, user, query, INDEXES[ExtractedTask][1])
+
+# This function returns the user's processed emails matching query, best match first
+def search_emails(user, query):
+    return _search(ProcessedEmail, user, query, INDEXES[ProcessedEmail][1])
@@ -0,0 +1,70 @@
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import ReferenceDocument, ProcessedEmail, ActionablePattern
+from .nlp import clean_email_text
+from . import graph_auth, term_stats, patterns
+
+# Fields whose change affects the contribution of a document to the term statistics.
+CORPUS_FIELDS = {
+    ReferenceDocument: {"subject", "body", "tokens"},
+    ProcessedEmail: {"subject", "body_preview", "is_reference"},
+}
+# Fields the stored language was detected from
+LANGUAGE_FIELDS = {
+    ReferenceDocument: {"subject", "body"},
+    ProcessedEmail: {"subject", "body_preview"},
+}
+
+# These receivers keep TermStatistic and CorpusStatistic up to date when reference documents
+# and processed emails are created, edited or deleted.
+@receiver(pre_save, sender=ReferenceDocument)
+@receiver(pre_save, sender=ProcessedEmail)
+def remember_corpus_document(sender, instance, update_fields=None, **kwargs):
+    instance._corpus_previous = None
+    if instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & CORPUS_FIELDS[sender]:
+        return
+    instance._corpus_previous = sender.objects.filter(pk=instance.pk).first()
+    previous = instance._corpus_previous
+    # Edited text is classified again
+    if previous and any(getattr(previous, f) != getattr(instance, f) for f in LANGUAGE_FIELDS[sender]):
+        instance.language = ""
+        if sender is ProcessedEmail and previous.tokens == instance.tokens:
+            instance.tokens = clean_email_text(term_stats.document_text(instance))
+
+@receiver(post_save, sender=ReferenceDocument)
+@receiver(post_save, sender=ProcessedEmail)
+def update_term_stats_on_save(sender, instance, created, **kwargs):
+    if created:
+        term_stats.index_document(instance)
+        return
+    previous = getattr(instance, "_corpus_previous", None)
+    if previous is None:
+        return
+    fields = CORPUS_FIELDS[sender]
+    if all(getattr(previous, f) == getattr(instance, f) for f in fields):
+        return
+    term_stats.unindex_document(previous)
+    if not term_stats.index_document(instance):
+        instance.in_corpus = False
+
+@receiver(post_delete, sender=ReferenceDocument)
+@receiver(post_delete, sender=ProcessedEmail)
+def update_term_stats_on_delete(sender, instance, **kwargs):
+    term_stats.unindex_document(instance)
+
+# The compiled pattern matcher of this process is dropped right away when a pattern changes,
+# other processes pick the change up through the version stamp in patterns.py.
+@receiver(post_save, sender=ActionablePattern)
+@receiver(post_delete, sender=ActionablePattern)
+def invalidate_pattern_matcher(sender, **kwargs):
+    patterns.invalidate_pattern_matcher()
+
+# The stored Graph tokens are dropped at logout, background syncs need a new sign-in afterwards.
+@receiver(user_logged_out)
+def clear_graph_token_cache(sender, request, user, **kwargs):
+    if user is not None:
+        graph_auth.clear_token_cache(user)
@@ -0,0 +1,180 @@
+import logging
+import math
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import networkx as nx
+import numpy as np
+from django.conf import settings
+
+from .nlp import as_document
+
+logger = logging.getLogger(__name__)
+
+# A summarizer turns email bodies (text or nlp.EmailDocument) into one-sentence task descriptions.
+# Engines are selected with TASK_DESCRIPTION_ENGINE ("llama", "textrank" or "auto", see get_summarizer).
+class Summarizer:
+    name = None
+
+    def summarize_many(self, email_bodies):
+        raise NotImplementedError
+
+    def summarize(self, email_body):
+        return self.summarize_many([email_body])[0]
+
+# The fine-tuned Llama model (task_description.py), fed with cleaned tokens like the sync always did.
+class LlamaSummarizer(Summarizer):
+    name = "llama"
+
+    def summarize_many(self, email_bodies):
+        from . import task_description
+        return task_description.extract_tasks_from_emails([as_document(body).tokens for body in email_bodies])
+
+SIGNATURE_RE = re.compile(
+    r"(?im)^\s*(best regards|regards|br|sent from my|sincerely|thanks|thank you|yours truly|cheers)\b[^\n]{0,30}$[\s\S]*"
+)
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+WORD_RE = re.compile(r"[a-z0-9]+(?:['’][a-z]+)?")
+GREETING_RE = re.compile(r"(?i)^(hi|hello|hey|dear|good morning|good afternoon|good evening)\b[^,.!?]{0,40}[,!.]?\s*")
+ADDRESSEE_RE = re.compile(r"(?i)^[\w .\-]{1,30},\s*(?=(please|kindly|could|can|would|let)\b)")
+REQUEST_PREFIX_RE = re.compile(
+    r"(?i)^(please|kindly|"
+    r"(i|we)(['’]d| would) (really )?appreciate (it )?if you could|"
+    r"(could|can|would|will) you(\s+(also|please|kindly))*|"
+    r"(i|we) need you to|(don['’]t|do not) forget to|remember to|make sure (to|that you)|"
+    r"let['’]s|let us)\s+"
+)
+PLEASANTRY_RE = re.compile(r"(?i)^(thanks|thank you|i hope|hope you|hope this|good to|nice to)\b")
+IMPERATIVE_VERBS = {
+    "add", "analyze", "approve", "arrange", "assign", "attend", "book", "call", "check", "collect",
+    "complete", "confirm", "contact", "continue", "coordinate", "create", "deliver", "discuss", "do",
+    "fill", "finalize", "fix", "follow", "forward", "include", "inform", "investigate", "join", "let",
+    "make", "note", "notify", "plan", "prepare", "provide", "reply", "report", "respond", "review",
+    "revise", "schedule", "send", "set", "share", "sign", "submit", "test", "update", "upload", "verify",
+}
+
+# Weighted PageRank by power iteration. nx.pagerank needs SciPy, which is not a dependency,
+# and sentence graphs are small enough for a dense NumPy matrix.
+def pagerank(adjacency, damping=0.85, tol=1.0e-8, max_iter=100):
+    n = adjacency.shape[0]
+    out_weight = adjacency.sum(axis=1)
+    dangling = out_weight == 0
+    transition = np.divide(adjacency, out_weight[:, None], out=np.zeros_like(adjacency), where=~dangling[:, None])
+    scores = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        previous = scores
+        scores = damping * (previous @ transition + previous[dangling].sum() / n) + (1 - damping) / n
+        if np.abs(scores - previous).sum() < n * tol:
+            break
+    return scores
+
+# Extractive engine: sentence split, similarity graph, PageRank, then the best ranked imperative
+# sentence is cleaned up into a task. Deterministic and cheap enough for CPU-only nodes.
+class TextRankSummarizer(Summarizer):
+    name = "textrank"
+
+    def summarize_many(self, email_bodies):
+        return [self.summarize_text(as_document(body).body) for body in email_bodies]
+
+    def split_sentences(self, text):
+        text = SIGNATURE_RE.sub("", text)
+        sentences = []
+        for raw in SENTENCE_RE.split(text):
+            sentence = ADDRESSEE_RE.sub("", GREETING_RE.sub("", raw.strip())).strip()
+            if len(WORD_RE.findall(sentence.lower())) >= 2 and not PLEASANTRY_RE.match(sentence):
+                sentences.append(sentence)
+        return sentences
+
+    def rank(self, sentences):
+        words = [set(WORD_RE.findall(s.lower())) for s in sentences]
+        graph = nx.Graph()
+        graph.add_nodes_from(range(len(sentences)))
+        for i in range(len(sentences)):
+            for j in range(i + 1, len(sentences)):
+                overlap = len(words[i] & words[j])
+                if overlap:
+                    weight = overlap / (math.log(len(words[i]) + 1) + math.log(len(words[j]) + 1))
+                    graph.add_edge(i, j, weight=weight)
+        scores = pagerank(nx.to_numpy_array(graph, weight="weight"))
+        # Earlier sentences win ties, the request usually comes first
+        return sorted(range(len(sentences)), key=lambda i: (-round(scores[i], 9), i))
+
+    def is_imperative(self, sentence):
+        if REQUEST_PREFIX_RE.match(sentence):
+            return True
+        first = WORD_RE.findall(sentence.lower()[:20])
+        return bool(first) and first[0] in IMPERATIVE_VERBS
+
+    def clean_up(self, sentence):
+        previous = None
+        while previous != sentence:
+            previous = sentence
+            sentence = REQUEST_PREFIX_RE.sub("", sentence).strip()
+        sentence = sentence.rstrip(" ?!.,;:") + "."
+        return sentence[:1].upper() + sentence[1:]
+
+    def summarize_text(self, text):
+        sentences = self.split_sentences(text or "")
+        if not sentences:
+            return (text or "").strip()[:200]
+        ranked = self.rank(sentences)
+        best = next((i for i in ranked if self.is_imperative(sentences[i])), ranked[0])
+        return self.clean_up(sentences[best])
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llama-summarizer")
+_llama_unavailable = threading.Event()
+# Held while a primary batch runs, so a sync never waits behind a batch still generating
+_primary_busy = threading.Lock()
+
+def _run_primary(summarizer, email_bodies):
+    try:
+        return summarizer.summarize_many(email_bodies)
+    finally:
+        _primary_busy.release()
+
+# Uses the Llama model while it is available and within TASK_DESCRIPTION_LATENCY_BUDGET seconds
+# per batch, and falls back to TextRank otherwise. A model that fails to load is not retried
+# in this process. A batch that runs over budget keeps generating in the background and its
+# descriptions still end up in the summary cache; until it is done the next batches go straight
+# to the fallback instead of queueing behind it.
+class FallbackSummarizer(Summarizer):
+    name = "auto"
+
+    def __init__(self, primary=None, fallback=None, latency_budget=None):
+        self.primary = primary or LlamaSummarizer()
+        self.fallback = fallback or TextRankSummarizer()
+        self.latency_budget = latency_budget
+
+    def summarize_many(self, email_bodies):
+        if not email_bodies:
+            return []
+        if _llama_unavailable.is_set():
+            return self.fallback.summarize_many(email_bodies)
+        if not _primary_busy.acquire(blocking=False):
+            logger.info(f"{self.primary.name} summarizer still busy with an earlier batch, using {self.fallback.name}")
+            return self.fallback.summarize_many(email_bodies)
+        future = _executor.submit(_run_primary, self.primary, email_bodies)
+        try:
+            return future.result(timeout=self.latency_budget)
+        except TimeoutError:
+            logger.warning(f"{self.primary.name} summarizer over its latency budget, using {self.fallback.name}")
+            if future.cancel():
+                # It never started, so _run_primary will not release the lock
+                _primary_busy.release()
+        except (ImportError, OSError) as e:
+            logger.warning(f"{self.primary.name} summarizer unavailable ({e}), using {self.fallback.name}")
+            _llama_unavailable.set()
+        except Exception as e:
+            logger.warning(f"{self.primary.name} summarizer failed ({e}), using {self.fallback.name}")
+        return self.fallback.summarize_many(email_bodies)
+
+def get_summarizer(engine=None):
+    engine = engine or settings.TASK_DESCRIPTION_ENGINE
+    if engine == "llama":
+        return LlamaSummarizer()
+    if engine == "textrank":
+        return TextRankSummarizer()
+    if engine == "auto":
+        return FallbackSummarizer(latency_budget=settings.TASK_DESCRIPTION_LATENCY_BUDGET)
+    raise ValueError(f"Unknown task description engine: {engine}")
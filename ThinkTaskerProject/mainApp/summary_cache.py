@@ -0,0 +1,119 @@
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import TaskDescriptionCache
+
+# Persistent cache of generated task descriptions with an in-process LRU in front of the DB table.
+# The LRU maps a key to (description, used_at), used_at being the last time this process wrote
+# the row's last_used_at, so entries past TASK_DESCRIPTION_CACHE_MAX_AGE_DAYS expire here too.
+_lru = OrderedDict()
+_lock = threading.Lock()
+_stats = {"lru_hits": 0, "db_hits": 0, "misses": 0}
+
+# This function normalizes the summarizer input before hashing.
+# Token lists (the output of clean_email_text) are hashed as they are, text only has
+# its whitespace collapsed so re-wrapped copies of an email share the same key.
+def _normalize(email_body):
+    if isinstance(email_body, (list, tuple)):
+        return json.dumps(list(email_body))
+    return re.sub(r"\s+", " ", str(email_body)).strip()
+
+# This function builds the cache key of an email for the given model identity and generation parameters.
+def make_key(email_body, model_identity):
+    payload = json.dumps([_normalize(email_body), model_identity], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _remember(key, description, used_at):
+    _lru[key] = (description, used_at)
+    _lru.move_to_end(key)
+    while len(_lru) > settings.TASK_DESCRIPTION_CACHE_LRU_SIZE:
+        _lru.popitem(last=False)
+
+# This function looks up many keys at once, first in the LRU and then with a single DB query.
+# Every hit, LRU ones included, is marked used in the table with a single UPDATE, so prune()
+# does not evict descriptions a process keeps serving from memory.
+# It returns a key -> description map of the hits.
+def get_many(keys):
+    now = timezone.now()
+    max_age = now - timedelta(days=settings.TASK_DESCRIPTION_CACHE_MAX_AGE_DAYS)
+    found = {}
+    with _lock:
+        for key in keys:
+            if key in _lru:
+                description, used_at = _lru[key]
+                if used_at < max_age:
+                    del _lru[key]
+                    continue
+                _lru.move_to_end(key)
+                found[key] = description
+        _stats["lru_hits"] += len(found)
+
+    missing = [key for key in dict.fromkeys(keys) if key not in found]
+    rows = {}
+    if missing:
+        rows = dict(
+            TaskDescriptionCache.objects
+            .filter(key__in=missing, last_used_at__gte=max_age)
+            .values_list("key", "description")
+        )
+    found.update(rows)
+    if found:
+        TaskDescriptionCache.objects.filter(key__in=list(found)).update(
+            last_used_at=now, hit_count=F("hit_count") + 1
+        )
+    with _lock:
+        for key, description in found.items():
+            _remember(key, description, now)
+        _stats["db_hits"] += len(rows)
+        _stats["misses"] += len(missing) - len(rows)
+    return found
+
+# This function stores newly generated descriptions and evicts old entries.
+def set_many(descriptions):
+    if not descriptions:
+        return
+    now = timezone.now()
+    TaskDescriptionCache.objects.bulk_create(
+        [TaskDescriptionCache(key=key, description=d) for key, d in descriptions.items()],
+        ignore_conflicts=True,
+    )
+    TaskDescriptionCache.objects.filter(key__in=list(descriptions)).update(last_used_at=now)
+    with _lock:
+        for key, description in descriptions.items():
+            _remember(key, description, now)
+    prune()
+
+# This function evicts entries not used for TASK_DESCRIPTION_CACHE_MAX_AGE_DAYS and, beyond
+# TASK_DESCRIPTION_CACHE_MAX_ENTRIES, the least recently used ones. It returns the number of deleted rows.
+def prune():
+    max_age = timezone.now() - timedelta(days=settings.TASK_DESCRIPTION_CACHE_MAX_AGE_DAYS)
+    deleted, _ = TaskDescriptionCache.objects.filter(last_used_at__lt=max_age).delete()
+    overflow = TaskDescriptionCache.objects.count() - settings.TASK_DESCRIPTION_CACHE_MAX_ENTRIES
+    if overflow > 0:
+        oldest = TaskDescriptionCache.objects.order_by("last_used_at").values_list("pk", flat=True)[:overflow]
+        more, _ = TaskDescriptionCache.objects.filter(pk__in=list(oldest)).delete()
+        deleted += more
+    return deleted
+
+def clear():
+    with _lock:
+        _lru.clear()
+    TaskDescriptionCache.objects.all().delete()
+
+# This function reports the hit and miss counts of this process plus the size of the DB cache.
+def stats():
+    with _lock:
+        current = dict(_stats)
+        current["lru_size"] = len(_lru)
+    lookups = current["lru_hits"] + current["db_hits"] + current["misses"]
+    current["hit_rate"] = (current["lru_hits"] + current["db_hits"]) / lookups if lookups else 0.0
+    current["db_entries"] = TaskDescriptionCache.objects.count()
+    return current
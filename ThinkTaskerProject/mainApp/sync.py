@@ -0,0 +1,254 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ExtractedTask, ProcessedEmail, MailboxDeltaToken
+from .nlp import EmailDocument
+from .views import parse_iso_datetime
+from .scheduler import assign_deadline_and_priority_batch
+from .deadlines import extract_deadline
+from .business_calendar import calendar_for
+from . import todo, summarizers, read_email, term_stats, scoring, patterns
+
+# The delta link is only stored once the sync that consumed it has finished,
+# so an interrupted sync replays the same changes next time.
+def _save_delta_link(user, delta_link, folder="Inbox"):
+    if delta_link:
+        MailboxDeltaToken.objects.update_or_create(
+            user=user, folder=folder, defaults={"delta_link": delta_link}
+        )
+
+def _finish_sync(user, delta_link):
+    _save_delta_link(user, delta_link)
+    user.last_synced_datetime = timezone.now()
+    user.save(update_fields=['last_synced_datetime'])
+
+def _no_progress(stage, **counts):
+    pass
+
+# This function stores the emails and the tasks of a sync: one ProcessedEmail and one
+# ExtractedTask per entry of actionable_new_tasks (as built by run_mail_sync), with its description.
+# Everything is written in one transaction with bulk_create, so a sync commits once instead of
+# twice per email. bulk_create skips ProcessedEmail.save and the post_save signal, so the
+# email tokens come with each task ("email_tokens") and the emails are counted in the
+# term statistics explicitly.
+# It returns the created tasks, in the order of actionable_new_tasks.
+def save_new_tasks(user, actionable_new_tasks, descriptions):
+    with transaction.atomic():
+        emails = ProcessedEmail.objects.bulk_create([
+            ProcessedEmail(
+                user=user,
+                message_id=task["message_id"],
+                subject=task["subject"],
+                body_preview=task["preview"],
+                is_actionable=True,
+                web_link=task["web_link"],
+                is_reference=True,
+                to_recipients=task["to_recipients"],
+                language=task["language"],
+                tokens=task["email_tokens"],
+            )
+            for task in actionable_new_tasks
+        ], batch_size=500)
+        extracted_tasks = ExtractedTask.objects.bulk_create([
+            ExtractedTask(
+                user=user,
+                email=email,
+                subject=task["subject"],
+                task_description=description,
+                actionable_patterns=task["actionable_patterns"],
+                priority=task["priority"],
+                deadline=task["assigned_deadline"],
+                status="Open",
+            )
+            for email, task, description in zip(emails, actionable_new_tasks, descriptions)
+        ], batch_size=500)
+        term_stats.index_documents(emails)
+    return extracted_tasks
+
+# This function runs a full mailbox sync for a user: it fetches new mail from Graph,
+# scores the unread actionable emails, creates the tasks (and their To Do items) and
+# marks the processed emails as read.
+# progress(stage, **counts) is called as the sync advances (see jobs.py).
+# It returns a message describing the outcome.
+def run_mail_sync(user, access_token, progress=_no_progress):
+    progress("fetching emails")
+    delta_link = None
+    if getattr(settings, "GRAPH_MAIL_SYNC_MODE", "delta") == "delta":
+        # Incremental sync: only messages added or changed since the last delta round,
+        # read-state changes come back through the same stream.
+        delta_token = MailboxDeltaToken.objects.filter(user=user, folder="Inbox").first()
+        all_emails, _, delta_link = read_email.fetch_email_delta(
+            access_token, delta_token.delta_link if delta_token else None
+        )
+        unread_emails = [m for m in all_emails if m.get("isRead") is False]
+    else:
+        all_emails = read_email.fetch_emails_since(access_token, user.last_synced_datetime)
+        unread_emails = read_email.fetch_unread_emails(access_token)
+
+    if not unread_emails:
+        _finish_sync(user, delta_link)
+        return "No new unread emails to process."
+
+    progress("fetching bodies", total_count=len(unread_emails))
+    # Already processed emails use their stored preview, tokens and language, every other
+    # body (corpus and unread) is fetched in one batched step.
+    # The same query collects the unread emails processed by an earlier sync, skipped below.
+    known_previews = {}
+    known_tokens = {}
+    languages = {}
+    # Stored emails already counted in the persistent term statistics, Corpus reads them from there
+    in_corpus_ids = set()
+    for message_id, preview, tokens, language, in_corpus in (
+        ProcessedEmail.objects
+        .filter(user=user, message_id__in={m["id"] for m in all_emails} | {m["id"] for m in unread_emails})
+        .values_list("message_id", "body_preview", "tokens", "language", "in_corpus")
+    ):
+        known_previews[message_id] = preview
+        if in_corpus:
+            in_corpus_ids.add(message_id)
+        if tokens:
+            known_tokens[message_id] = tokens
+        if language:
+            languages[message_id] = language
+
+    # One EmailDocument per email, so its text is parsed, tokenized and classified only once
+    # for the corpus, filtering, scoring and summarizing stages. Already processed emails
+    # start from their stored tokens and language.
+    documents = {}
+    def document_of(message_id, subject, body):
+        if message_id not in documents:
+            document = EmailDocument(body, subject)
+            if message_id in known_tokens:
+                document.tokens = known_tokens[message_id]
+            if message_id in languages:
+                document.language = languages[message_id]
+            documents[message_id] = document
+        return documents[message_id]
+
+    bodies = read_email.batch_fetch_email_bodies(
+        [m["id"] for m in all_emails if m["id"] not in known_previews] + [m["id"] for m in unread_emails],
+        access_token,
+    )
+
+    progress("building corpus")
+    corpus = term_stats.Corpus()
+    for m in all_emails:
+        subject = m.get("subject", "")
+        message_id = m["id"]
+        if message_id in in_corpus_ids:
+            continue
+        if message_id in known_previews:
+            full_body = known_previews[message_id] or ""
+        elif message_id in bodies:
+            full_body = bodies[message_id]
+        else:
+            # Body could not be fetched, the email is left out of this sync's corpus
+            continue
+        document = document_of(message_id, subject, full_body)
+        if document.language == "en":
+            corpus.add_document(document.tokens)
+
+    progress("filtering emails")
+    actionable_new_tasks = []
+    message_ids_to_mark_read = []
+    # Emails already stored, and the ones taken in this sync (a message can come back twice in a delta round)
+    known_message_ids = set(known_previews)
+    # Documents of the subject and preview ProcessedEmail stores (see save_new_tasks)
+    preview_documents = {}
+    # Load and compile the actionable patterns once for the whole batch
+    matcher = patterns.get_pattern_matcher()
+    calendar = calendar_for(user)
+
+    for processed, m in enumerate(unread_emails, start=1):
+        progress("filtering emails", processed_count=processed)
+        subject = m.get("subject", "")
+        message_id = m["id"]
+        preview = m.get("bodyPreview", "")
+        if message_id not in bodies:
+            # Body could not be fetched: the email stays unread and unprocessed so the next
+            # sync tries again, the delta round is not saved so that it comes back
+            delta_link = None
+            continue
+        full_body = bodies[message_id]
+        document = document_of(message_id, subject, full_body)
+        is_flagged = m.get("flag", {}).get("flagStatus", "") == "flagged"
+        is_important = m.get("importance", "") == "high"
+        to_recipients = [
+            r.get("emailAddress", {}).get("address", "").lower()
+            for r in m.get("toRecipients", [])
+        ]
+        web_link = m.get("webLink", "")
+        if document.language != "en": continue
+        if user.email.lower() not in to_recipients: continue
+        if message_id in known_message_ids: continue
+
+        actionable_patterns = matcher.match(subject + " " + preview)
+        is_actionable = bool(actionable_patterns)
+        if is_actionable:
+            extracted_deadline = extract_deadline(
+                document.plain_body, sent_date=parse_iso_datetime(m.get("receivedDateTime")), calendar=calendar
+            )
+            # What ProcessedEmail stores is subject + preview, its tokens and language come from that
+            # text as ProcessedEmail.save and term_stats.document_language would compute them
+            preview_document = preview_documents.setdefault((preview, subject), EmailDocument(preview, subject))
+            actionable_new_tasks.append({
+                "subject": subject,
+                "body": full_body,
+                "preview": preview,
+                "tokens": document.tokens,
+                "document": document,
+                "boost": 1.0 if is_flagged or is_important else 0.0,
+                "actionable_patterns": [{"pattern": p.pattern, "priority": p.priority} for p in actionable_patterns],
+                "extracted_deadline": extracted_deadline,
+                "message_id": message_id,
+                "web_link": web_link,
+                "to_recipients": to_recipients,
+                "language": preview_document.language,
+                "email_tokens": preview_document.tokens,
+                "raw_email": m,
+            })
+            message_ids_to_mark_read.append(message_id)
+            known_message_ids.add(message_id)
+
+    progress("scoring")
+    # Score all actionable emails of this sync in one batched pass
+    scores = scoring.score_emails(
+        [t["tokens"] for t in actionable_new_tasks],
+        corpus,
+        boosts=[t["boost"] for t in actionable_new_tasks],
+    )
+    for task, score in zip(actionable_new_tasks, scores):
+        task["score"] = float(score)
+        task["priority"] = scoring.priority_for_score(task["score"])
+
+    assign_deadline_and_priority_batch(user, actionable_new_tasks)
+
+    progress("summarizing", total_count=len(actionable_new_tasks), processed_count=0)
+    descriptions = summarizers.get_summarizer().summarize_many(
+        [task["document"].body_document for task in actionable_new_tasks]
+    )
+
+    progress("creating tasks", total_count=len(actionable_new_tasks), processed_count=0)
+    extracted_tasks = save_new_tasks(user, actionable_new_tasks, descriptions)
+    progress("creating tasks", processed_count=len(extracted_tasks), created_count=len(extracted_tasks))
+
+    # Create the To Do items with $batch requests and store their ids on the new tasks
+    if extracted_tasks:
+        progress("creating To Do items")
+        todo_ids = todo.create_todo_tasks(access_token, user, [
+            {"title": task["subject"], "description": task["preview"][:500], "due_date": task["assigned_deadline"]}
+            for task in actionable_new_tasks
+        ])
+        for et, (todo_task_id, todo_list_id) in zip(extracted_tasks, todo_ids):
+            et.todo_task_id = todo_task_id
+            et.todo_list_id = todo_list_id
+        ExtractedTask.objects.bulk_update(extracted_tasks, ["todo_task_id", "todo_list_id"])
+
+    # Batch mark all processed emails as read
+    if message_ids_to_mark_read:
+        progress("marking emails as read")
+        read_email.batch_mark_emails_as_read(message_ids_to_mark_read, access_token)
+
+    _finish_sync(user, delta_link)
+    return "Sync completed! All unread actionable emails were processed and prioritized."
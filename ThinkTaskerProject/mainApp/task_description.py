@@ -6,49 +6,157 @@
 #     use_auth_token=True
 # )
 
-from transformers import AutoModelForCausalLM, AutoTokenizer
-from peft import PeftModel
-import torch
+import logging
+import threading
 
-base_model_path = "C:/Users/Server/Desktop/ThinkTasker/ThinkTaskerProject/Llama-3.1-8B-Instruct"
-adapter_path = "C:/Users/Server/Desktop/ThinkTasker/ThinkTaskerProject/Llama-3.1-8B-Instruct/autotrain-7wi99-5xtz5"
+from django.conf import settings
 
-tokenizer = AutoTokenizer.from_pretrained(base_model_path)
-base_model = AutoModelForCausalLM.from_pretrained(
-    base_model_path,
-    device_map="auto",
-    torch_dtype=torch.float16
-)
-model = PeftModel.from_pretrained(base_model, adapter_path)
+from . import summary_cache, model_server
 
-def extract_task_from_email(email_body):
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = "You are a helpful assistant that summarizes email content in one sentence."
+
+_model = None
+_tokenizer = None
+_model_lock = threading.Lock()
+
+# This function loads a causal LM (plus an optional PEFT adapter) and its tokenizer.
+# The tokenizer pads on the left so a whole batch of prompts can be generated at once.
+# transformers, peft and torch are imported here so that importing this module stays cheap.
+def load_model(base_model_path, adapter_path=None, device_map="auto", torch_dtype="float16"):
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(base_model_path, padding_side="left")
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    model = AutoModelForCausalLM.from_pretrained(
+        base_model_path,
+        device_map=device_map,
+        torch_dtype=getattr(torch, torch_dtype)
+    )
+    if adapter_path:
+        from peft import PeftModel
+        model = PeftModel.from_pretrained(model, adapter_path)
+    model.eval()
+    return model, tokenizer
+
+# This function returns the task-description model configured in settings, loading it on first use.
+def get_model():
+    global _model, _tokenizer
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model, _tokenizer = load_model(
+                    settings.TASK_DESCRIPTION_BASE_MODEL_PATH,
+                    settings.TASK_DESCRIPTION_ADAPTER_PATH,
+                    device_map=settings.TASK_DESCRIPTION_DEVICE_MAP,
+                    torch_dtype=settings.TASK_DESCRIPTION_TORCH_DTYPE,
+                )
+    return _model, _tokenizer
+
+def build_prompt(tokenizer, email_body):
     messages = [
-        {"role": "system", "content": "You are a helpful assistant that summarizes email content in one sentence."},
+        {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": f"{email_body}"}
     ]
-
-    chat_prompt = tokenizer.apply_chat_template(
+    if not getattr(tokenizer, "chat_template", None):
+        # Small base models used for benchmarking have no chat template
+        return f"{SYSTEM_PROMPT}\n\n{email_body}\n\n"
+    return tokenizer.apply_chat_template(
         conversation=messages,
         tokenize=False,
         add_generation_prompt=True
     )
-    tokens = tokenizer(chat_prompt, return_tensors='pt')
-    tokens = {k: v.to(model.device) for k, v in tokens.items()}
-
-    with torch.no_grad():
-        output_ids = model.generate(
-            input_ids=tokens["input_ids"],
-            attention_mask=tokens["attention_mask"],
-            max_new_tokens=50,
-            pad_token_id=tokenizer.eos_token_id
+
+# This function generates one task description per email body, batch_size prompts at a time.
+# Prompts are left padded, so the generated tokens of every row start at the same position.
+def generate_descriptions(model, tokenizer, email_bodies, batch_size=8, max_new_tokens=50):
+    import torch
+
+    responses = []
+    for start in range(0, len(email_bodies), batch_size):
+        prompts = [build_prompt(tokenizer, body) for body in email_bodies[start:start + batch_size]]
+        tokens = tokenizer(prompts, return_tensors='pt', padding=True)
+        tokens = {k: v.to(model.device) for k, v in tokens.items()}
+
+        with torch.no_grad():
+            output_ids = model.generate(
+                input_ids=tokens["input_ids"],
+                attention_mask=tokens["attention_mask"],
+                max_new_tokens=max_new_tokens,
+                pad_token_id=tokenizer.pad_token_id
+            )
+
+        prompt_length = tokens["input_ids"].shape[1]
+        for row in output_ids:
+            responses.append(tokenizer.decode(row[prompt_length:], skip_special_tokens=True).strip())
+    return responses
+
+# Everything that changes the generated text is part of the summary cache key.
+def model_identity():
+    return {
+        "base_model": settings.TASK_DESCRIPTION_BASE_MODEL_PATH,
+        "adapter": settings.TASK_DESCRIPTION_ADAPTER_PATH,
+        "dtype": settings.TASK_DESCRIPTION_TORCH_DTYPE,
+        "max_new_tokens": settings.TASK_DESCRIPTION_MAX_NEW_TOKENS,
+        "system_prompt": SYSTEM_PROMPT,
+    }
+
+# This function generates descriptions with the model loaded in this process.
+def generate_local(email_bodies, batch_size=None):
+    model, tokenizer = get_model()
+    return generate_descriptions(
+        model,
+        tokenizer,
+        email_bodies,
+        batch_size=batch_size or settings.TASK_DESCRIPTION_BATCH_SIZE,
+        max_new_tokens=settings.TASK_DESCRIPTION_MAX_NEW_TOKENS,
+    )
+
+# When TASK_DESCRIPTION_SERVER_SOCKET is set, generation is delegated to the shared model server
+# (serve_task_descriptions command) so web and worker processes never load the model themselves.
+def generate(email_bodies, batch_size=None):
+    socket_path = settings.TASK_DESCRIPTION_SERVER_SOCKET
+    if socket_path:
+        return model_server.generate_remote(
+            email_bodies, socket_path, settings.TASK_DESCRIPTION_SERVER_TIMEOUT
         )
+    return generate_local(email_bodies, batch_size)
+
+# This function summarizes a whole batch of emails with the configured model.
+# Emails already summarized before (same cleaned text, model and parameters) are served
+# from the summary cache and only the remaining ones are generated.
+def extract_tasks_from_emails(email_bodies, batch_size=None):
+    if not email_bodies:
+        return []
+    identity = model_identity()
+    keys = [summary_cache.make_key(body, identity) for body in email_bodies]
+    descriptions = summary_cache.get_many(keys)
 
-    response = tokenizer.decode(output_ids[0][tokens["input_ids"].shape[1]:], skip_special_tokens=True)
-    return response.strip()
+    to_generate = {}
+    for key, body in zip(keys, email_bodies):
+        if key not in descriptions and key not in to_generate:
+            to_generate[key] = body
+    if to_generate:
+        generated = generate(list(to_generate.values()), batch_size)
+        new_descriptions = dict(zip(to_generate, generated))
+        summary_cache.set_many(new_descriptions)
+        descriptions.update(new_descriptions)
+    stats = summary_cache.stats()
+    logger.info(
+        f"Task descriptions: {sum(1 for key in keys if key not in to_generate)} cached, {len(to_generate)} generated "
+        f"(process hits={stats['lru_hits'] + stats['db_hits']}, misses={stats['misses']})"
+    )
+    return [descriptions[key] for key in keys]
+
+def extract_task_from_email(email_body):
+    return extract_tasks_from_emails([email_body])[0]
 
 # if __name__ == "__main__":
 #     email = (
 #         "Hi KC, I hope you are doing well. I wanted to remind you about the meeting scheduled for tomorrow at 10 AM. "
 #     )
 #     task = extract_task_from_email(email)
-#     print("Extracted task:", task)
\ No newline at end of file
+#     print("Extracted task:", task)
@@ -0,0 +1,205 @@
+import math
+from collections import Counter, defaultdict
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import F
+
+from .models import TermStatistic, CorpusStatistic, ReferenceDocument, ProcessedEmail
+from .nlp import detect_language, clean_email_text
+
+CORPUS_STATISTIC_PK = 1
+
+# This function returns the text a corpus document contributes to the term statistics.
+# Compared by label so the historical models of a migration work too.
+def document_text(doc):
+    if doc._meta.label == ReferenceDocument._meta.label:
+        return (doc.subject or "") + " " + (doc.body or "")
+    return (doc.subject or "") + " " + (doc.body_preview or "")
+
+# This function returns the tokens a corpus document contributes to the term statistics.
+# Documents use their stored tokens; only processed emails saved before the tokens column
+# existed (see the backfill_email_tokens command) are cleaned on the fly.
+def document_tokens(doc):
+    if doc.tokens:
+        return doc.tokens
+    return clean_email_text(document_text(doc))
+
+# This function returns the language of a document. It is detected only the first time
+# and stored on the document's language column.
+def document_language(doc):
+    if not doc.language:
+        doc.language = detect_language(document_text(doc))
+        if doc.pk is not None:
+            type(doc).objects.filter(pk=doc.pk).update(language=doc.language)
+    return doc.language
+
+# This function checks if a document belongs to the scoring corpus.
+# Only English reference documents and English processed emails marked as reference are counted.
+def belongs_to_corpus(doc):
+    if isinstance(doc, ProcessedEmail) and not doc.is_reference:
+        return False
+    return document_language(doc) == "en"
+
+def get_document_count():
+    corpus = CorpusStatistic.objects.filter(pk=CORPUS_STATISTIC_PK).first()
+    return corpus.document_count if corpus else 0
+
+# This function adds (sign=1) or removes (sign=-1) the tokens of documents to the term statistics.
+# Terms sharing the same document and occurrence counts are updated together, so a document
+# (or a batch of them) costs a handful of UPDATE queries instead of one per term.
+def _apply_documents(token_lists, sign):
+    document_frequency = Counter()
+    collection_frequency = Counter()
+    for tokens in token_lists:
+        counts = Counter(tokens)
+        document_frequency.update(counts.keys())
+        collection_frequency.update(counts)
+    with transaction.atomic():
+        if sign > 0 and collection_frequency:
+            TermStatistic.objects.bulk_create(
+                [TermStatistic(term=term) for term in collection_frequency],
+                ignore_conflicts=True,
+                batch_size=1000,
+            )
+        terms_by_count = defaultdict(list)
+        for term, count in collection_frequency.items():
+            terms_by_count[(document_frequency[term], count)].append(term)
+        for (df, cf), terms in terms_by_count.items():
+            TermStatistic.objects.filter(term__in=terms).update(
+                document_frequency=F("document_frequency") + sign * df,
+                collection_frequency=F("collection_frequency") + sign * cf,
+            )
+        if sign < 0:
+            TermStatistic.objects.filter(term__in=list(collection_frequency), document_frequency__lte=0).delete()
+        CorpusStatistic.objects.get_or_create(pk=CORPUS_STATISTIC_PK)
+        CorpusStatistic.objects.filter(pk=CORPUS_STATISTIC_PK).update(
+            document_count=F("document_count") + sign * len(token_lists)
+        )
+
+def _apply_document(tokens, sign):
+    _apply_documents([tokens], sign)
+
+# This function counts a saved document in the term statistics if it belongs to the corpus.
+def index_document(doc):
+    if not belongs_to_corpus(doc):
+        return False
+    _apply_document(document_tokens(doc), 1)
+    type(doc).objects.filter(pk=doc.pk).update(in_corpus=True)
+    doc.in_corpus = True
+    return True
+
+# This function counts saved documents of one model in the term statistics, like index_document
+# does for each of them but in one batch of queries. bulk_create does not send post_save,
+# so code creating corpus documents in bulk calls it itself.
+# It returns the documents that were counted.
+def index_documents(docs):
+    docs = [doc for doc in docs if belongs_to_corpus(doc)]
+    if not docs:
+        return []
+    _apply_documents([document_tokens(doc) for doc in docs], 1)
+    type(docs[0]).objects.filter(pk__in=[doc.pk for doc in docs]).update(in_corpus=True)
+    for doc in docs:
+        doc.in_corpus = True
+    return docs
+
+# This function removes a previously counted document from the term statistics.
+def unindex_document(doc):
+    if not doc.in_corpus:
+        return False
+    _apply_document(document_tokens(doc), -1)
+    if type(doc).objects.filter(pk=doc.pk).exists():
+        type(doc).objects.filter(pk=doc.pk).update(in_corpus=False)
+    doc.in_corpus = False
+    return True
+
+# This function rebuilds the whole term statistics table from the reference documents
+# and the processed emails marked as reference.
+# apps is the app registry to take the models from, a migration passes its historical one.
+def rebuild(apps=global_apps):
+    reference_model = apps.get_model("mainApp", "ReferenceDocument")
+    email_model = apps.get_model("mainApp", "ProcessedEmail")
+    term_model = apps.get_model("mainApp", "TermStatistic")
+    corpus_model = apps.get_model("mainApp", "CorpusStatistic")
+    document_frequency = Counter()
+    collection_frequency = Counter()
+    indexed = {reference_model: [], email_model: []}
+    sources = [
+        (reference_model, reference_model.objects.all()),
+        (email_model, email_model.objects.filter(is_reference=True)),
+    ]
+    for model, queryset in sources:
+        # Stored tokens and language make this a plain read; older rows missing them
+        # are loaded and completed one by one
+        for pk, tokens, language in queryset.values_list("pk", "tokens", "language"):
+            if not tokens or not language:
+                doc = model.objects.get(pk=pk)
+                tokens, language = document_tokens(doc), document_language(doc)
+            if language != "en":
+                continue
+            counts = Counter(tokens)
+            document_frequency.update(counts.keys())
+            collection_frequency.update(counts)
+            indexed[model].append(pk)
+
+    with transaction.atomic():
+        term_model.objects.all().delete()
+        term_model.objects.bulk_create(
+            [
+                term_model(
+                    term=term,
+                    document_frequency=df,
+                    collection_frequency=collection_frequency[term],
+                )
+                for term, df in document_frequency.items()
+            ],
+            batch_size=1000,
+        )
+        document_count = sum(len(pks) for pks in indexed.values())
+        corpus_model.objects.update_or_create(
+            pk=CORPUS_STATISTIC_PK, defaults={"document_count": document_count}
+        )
+        for model, pks in indexed.items():
+            model.objects.update(in_corpus=False)
+            model.objects.filter(pk__in=pks).update(in_corpus=True)
+    return document_count, len(document_frequency)
+
+# This class is a read view over the persistent term statistics used while scoring a sync.
+# Documents that are not persisted yet (e.g. emails received since the last sync) can be
+# added on top with add_document. Term rows are loaded lazily, in bulk, by load_terms.
+class Corpus:
+    def __init__(self):
+        self.document_count = get_document_count()
+        self.document_frequency = Counter()
+        self.collection_frequency = Counter()
+        self._loaded_terms = set()
+
+    def add_document(self, tokens):
+        counts = Counter(tokens)
+        self.document_count += 1
+        self.document_frequency.update(counts.keys())
+        self.collection_frequency.update(counts)
+
+    def load_terms(self, terms):
+        missing = set(terms) - self._loaded_terms
+        if not missing:
+            return
+        rows = TermStatistic.objects.filter(term__in=missing).values_list(
+            "term", "document_frequency", "collection_frequency"
+        )
+        for term, df, cf in rows:
+            self.document_frequency[term] += df
+            self.collection_frequency[term] += cf
+        self._loaded_terms |= missing
+
+    def idf(self, term):
+        self.load_terms([term])
+        df = self.document_frequency[term]
+        if df == 0:
+            return 0
+        return math.log10(self.document_count / df)
+
+    def cf(self, term):
+        self.load_terms([term])
+        N = self.document_count
+        return self.collection_frequency[term] / N if N > 0 else 0
@@ -1,3 +1,564 @@
-from django.test import TestCase
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import business_calendar, deadlines, graph_auth, nlp, outbox, pagination, read_email, scheduler, scoring, search, summarizers, summary_cache, sync, term_stats, todo_sync
+from .models import (
+    CorpusStatistic, ExtractedTask, ProcessedEmail, TaskDescriptionCache, TermStatistic, ThinkTaskerUser,
+    TodoOutboxEntry,
+)
+
+class BatchScoringParityTests(TestCase):
+    corpus_docs = [
+        ["driver", "install", "failed", "log", "check"],
+        ["meeting", "tomorrow", "agenda", "driver"],
+        ["panel", "vendor", "issue", "fix", "issue"],
+        ["urgent", "regression", "build", "driver", "build"],
+        ["report", "submit", "friday"],
+    ]
+    emails = [
+        ["driver", "install", "failed", "please", "check", "driver"],
+        ["urgent", "fix", "panel", "issue", "issue", "asap"],
+        ["critical", "regression", "latest", "build", "escalate"],
+        ["unknown", "words", "only"],
+        [],
+    ]
+
+    # Reference implementation: the per-term loop sync_emails_view used before batching.
+    def per_term_score(self, tokens, all_docs_tokens, boost):
+        tfidf_sum, cf_sum, ct = 0, 0, 1.0
+        for term in set(tokens):
+            tf = scoring.compute_tf(term, tokens)
+            idf = scoring.compute_idf(term, all_docs_tokens)
+            cf = scoring.compute_cf(term, all_docs_tokens)
+            ct = max(ct, scoring.get_contextual_weight(term))
+            tfidf_sum += tf * idf * ct
+            cf_sum += cf
+        ct += boost
+        tfidf_norm = min((tfidf_sum * ct) / scoring.TFIDF_MAX, 1)
+        cf_norm = min(cf_sum / scoring.CF_MAX, 1)
+        return 0.7 * tfidf_norm + 0.3 * cf_norm
+
+    def test_batch_scores_match_per_term_formula(self):
+        corpus = term_stats.Corpus()
+        for tokens in self.corpus_docs:
+            corpus.add_document(tokens)
+        boosts = [0.0, 1.0, 0.0, 1.0, 0.0]
+
+        scores = scoring.score_emails(self.emails, corpus, boosts=boosts)
+
+        for tokens, boost, score in zip(self.emails, boosts, scores):
+            expected = self.per_term_score(tokens, self.corpus_docs, boost)
+            self.assertAlmostEqual(score, expected, places=12)
+            self.assertEqual(scoring.priority_for_score(score), scoring.priority_for_score(expected))
+
+    def test_batch_scores_use_persisted_term_statistics(self):
+        for tokens in self.corpus_docs:
+            term_stats._apply_document(tokens, 1)
+        scores = scoring.score_emails(self.emails, term_stats.Corpus())
+
+        for tokens, score in zip(self.emails, scores):
+            self.assertAlmostEqual(score, self.per_term_score(tokens, self.corpus_docs, 0.0), places=12)
+
+    def test_empty_batch(self):
+        self.assertEqual(len(scoring.score_emails([], term_stats.Corpus())), 0)
+
+# The request phrasings TextRankSummarizer strips from the start of a task sentence.
+class RequestPrefixTests(SimpleTestCase):
+    cases = [
+        ("Please finalize the plan", "Finalize the plan."),
+        ("Kindly approve the request", "Approve the request."),
+        ("I'd appreciate it if you could review this", "Review this."),
+        ("We would really appreciate if you could sign the form", "Sign the form."),
+        ("Could you send me the file", "Send me the file."),
+        ("Can you review the doc", "Review the doc."),
+        ("Could you please send it", "Send it."),
+        ("Would you also kindly check the logs?", "Check the logs."),
+        ("Will you join the call?", "Join the call."),
+        ("We need you to update the sheet", "Update the sheet."),
+        ("Don't forget to update the report", "Update the report."),
+        ("Do not forget to call the vendor", "Call the vendor."),
+        ("Remember to book the room", "Book the room."),
+        ("Make sure to submit it", "Submit it."),
+        ("Make sure that you submit it", "Submit it."),
+        ("Let's schedule a call", "Schedule a call."),
+        ("Let us meet on Monday", "Meet on Monday."),
+    ]
+
+    def test_each_prefix_form_is_stripped(self):
+        summarizer = summarizers.TextRankSummarizer()
+        for sentence, expected in self.cases:
+            with self.subTest(sentence=sentence):
+                self.assertTrue(summarizer.is_imperative(sentence))
+                self.assertEqual(summarizer.clean_up(sentence), expected)
+
+# Short function words shared with other languages must not make detect_language take them for English.
+class LanguageDetectionTests(SimpleTestCase):
+    def test_dutch_and_portuguese_are_not_english(self):
+        for text in [
+            "Ik weet niet of we het kunnen doen, maar het is goed als je me belt.",
+            "Eu vou do trabalho para casa as seis e me ligas se for preciso.",
+        ]:
+            with self.subTest(text=text):
+                self.assertNotEqual(nlp.detect_language(text), "en")
+
+    def test_plain_english(self):
+        self.assertEqual(
+            nlp.detect_language("Please review the attached report and let me know if you have any questions."), "en"
+        )
+
+# A cursor is user input: one that does not decode to values of the ordering fields starts over
+# at the first page instead of failing in the query.
+class MalformedCursorTests(TestCase):
+    def setUp(self):
+        self.user = ThinkTaskerUser.objects.create(username="cursor-user")
+        self.client.force_login(self.user)
+        email = ProcessedEmail.objects.create(user=self.user, message_id="cursor-1", subject="Report", tokens=["report"])
+        ExtractedTask.objects.create(user=self.user, email=email, subject="Report", task_description="Send it.", priority="Urgent")
+
+    def test_malformed_cursors_fall_back_to_the_first_page(self):
+        cursors = [
+            "not base64!",
+            pagination.encode_cursor(["x", "y"]),
+            pagination.encode_cursor(["not a date", 1]),
+            pagination.encode_cursor([None, 1]),
+            pagination.encode_cursor([[1], {"a": 1}]),
+            pagination.encode_cursor(["2025-01-01T00:00:00+09:00", 10 ** 30]),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(pagination.decode_cursor(cursor, ProcessedEmail, pagination.INBOX_ORDERING))
+                response = self.client.get(reverse("outlook-inbox-page"), {"cursor": cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()["items"]), 1)
+
+        for cursor in cursors + [pagination.encode_cursor(["high", None, "2025-01-01T00:00:00+09:00", 1])]:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse("task_list_page"), {"cursor": cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()["items"]), 1)
+
+# A body that could not be fetched is missing from the result, not an empty body.
+class BatchFetchEmailBodiesTests(SimpleTestCase):
+    def test_failed_sub_requests_are_left_out(self):
+        responses = [
+            {"status": 200, "body": {"body": {"content": "Please send the report."}}},
+            {"status": 404, "body": {"error": {"code": "ErrorItemNotFound"}}},
+            {"status": 200, "body": {"body": {"content": ""}}},
+        ]
+        with mock.patch.object(read_email.graph, "batch", return_value=responses):
+            bodies = read_email.batch_fetch_email_bodies(["a", "b", "c"], "token")
+        self.assertEqual(bodies, {"a": "Please send the report.", "c": ""})
+
+# A To Do list whose changes could not be read is reported in the reconcile job's message.
+class TodoReconcileTests(TestCase):
+    def test_failed_lists_are_reported(self):
+        user = ThinkTaskerUser.objects.create(username="reconcile-user", todo_list_id="list-a")
+        ExtractedTask.objects.create(user=user, task_description="Send it.", todo_task_id="t1", todo_list_id="list-b")
+        rounds = {"list-a": ([], [], "https://graph/delta-a"), "list-b": ([], [], None)}
+        with mock.patch.object(todo_sync.todo, "fetch_todo_delta", side_effect=lambda token, list_id, link: rounds[list_id]):
+            message = todo_sync.run_todo_reconcile(user, "token")
+        self.assertIn("incomplete", message)
+        self.assertIn("1 of 2 list(s) failed: list-b", message)
+        self.assertEqual(list(user.todo_delta_tokens.values_list("todo_list_id", flat=True)), ["list-a"])
+
+# Public holidays come from the "holidays" package when it is installed, otherwise the configured
+# list is used and a warning says when it ran out.
+@override_settings(BUSINESS_HOLIDAYS=["2025-01-01", "2026-01-01"], BUSINESS_HOLIDAYS_COUNTRY="JP", BUSINESS_CALENDARS={})
+class BusinessCalendarHolidayTests(SimpleTestCase):
+    def setUp(self):
+        business_calendar._get_calendar.cache_clear()
+        self.addCleanup(business_calendar._get_calendar.cache_clear)
+
+    def test_country_holidays_are_added(self):
+        with mock.patch.object(business_calendar, "country_holidays", return_value=[date(2027, 1, 1)]):
+            calendar = business_calendar._get_calendar(None, 2027)
+        self.assertFalse(calendar.is_business_day(date(2027, 1, 1)))
+        self.assertFalse(calendar.is_business_day(date(2026, 1, 1)))
+
+    def test_warns_when_the_configured_holidays_ran_out(self):
+        with mock.patch.object(business_calendar, "country_holidays", return_value=None):
+            with self.assertLogs("mainApp.business_calendar", "WARNING"):
+                calendar = business_calendar._get_calendar(None, 2027)
+            with self.assertNoLogs("mainApp.business_calendar", "WARNING"):
+                business_calendar._get_calendar("Support", 2026)
+        self.assertTrue(calendar.is_business_day(date(2027, 1, 1)))
+
+# Descriptions served from the in-process LRU are marked used in the table too, and expire from it.
+class SummaryCacheTests(TestCase):
+    def setUp(self):
+        summary_cache.clear()
+        self.addCleanup(summary_cache.clear)
+
+    def test_lru_hits_touch_the_table(self):
+        summary_cache.set_many({"a": "Send the report.", "b": "Book the room."})
+        long_ago = timezone.now() - timedelta(days=30)
+        TaskDescriptionCache.objects.update(last_used_at=long_ago)
+
+        self.assertEqual(summary_cache.get_many(["a"]), {"a": "Send the report."})
+
+        row = TaskDescriptionCache.objects.get(key="a")
+        self.assertGreater(row.last_used_at, long_ago)
+        self.assertEqual(row.hit_count, 1)
+        self.assertEqual(TaskDescriptionCache.objects.get(key="b").last_used_at, long_ago)
+
+    def test_expired_lru_entries_are_not_served(self):
+        summary_cache.set_many({"a": "Send the report."})
+        expired = timezone.now() - timedelta(days=settings.TASK_DESCRIPTION_CACHE_MAX_AGE_DAYS + 1)
+        summary_cache._lru["a"] = ("Send the report.", expired)
+        TaskDescriptionCache.objects.update(last_used_at=expired)
+
+        self.assertEqual(summary_cache.get_many(["a"]), {})
+        self.assertNotIn("a", summary_cache._lru)
+
+# Deadline candidates found in an email body: resolved on the business calendar, times attached
+# to the closest date, best candidate first. Sent on Wednesday 2025-06-04, 09:00 in Tokyo.
+class DeadlineCandidateTests(SimpleTestCase):
+    sent = datetime(2025, 6, 4, 0, 0, tzinfo=dt_timezone.utc)
+    calendar = business_calendar.BusinessCalendar("1111100", holidays=["2025-06-12"])
+
+    def candidates(self, text, sent=None):
+        return [
+            (c.deadline.strftime("%Y-%m-%d %H:%M"), c.kind)
+            for c in deadlines.find_deadline_candidates(text, sent or self.sent, self.calendar)
+        ]
+
+    def test_cue_and_attached_time_rank_first(self):
+        self.assertEqual(
+            self.candidates("We met on Monday. Please send the report by Friday 3pm."),
+            [("2025-06-06 15:00", "weekday"), ("2025-06-09 10:00", "weekday")],
+        )
+
+    def test_full_date_ranks_before_weekday(self):
+        self.assertEqual(
+            self.candidates("Can we talk Thursday? The deadline is June 20, 2025."),
+            [("2025-06-20 10:00", "full_date"), ("2025-06-05 10:00", "weekday")],
+        )
+
+    def test_each_time_goes_to_the_closest_date(self):
+        self.assertEqual(
+            self.candidates("Review it tomorrow at 10:30am, and the slides on June 10 at 4pm."),
+            [("2025-06-10 16:00", "day_month"), ("2025-06-05 10:30", "relative")],
+        )
+        self.assertEqual(self.candidates("Please finish it by EOD tomorrow."), [("2025-06-05 18:00", "relative")])
+
+    def test_time_without_date_is_for_the_sent_day(self):
+        self.assertEqual(self.candidates("Call me at 4pm."), [("2025-06-04 16:00", "time")])
+
+    def test_past_dates_are_penalized(self):
+        [candidate] = deadlines.find_deadline_candidates("Sorry, this was due by May 30.", self.sent, self.calendar)
+        self.assertEqual(candidate.deadline.date(), date(2025, 5, 30))
+        self.assertLess(candidate.confidence, deadlines.CONFIDENCE["day_month"])
+
+    def test_relative_days_skip_weekends_and_holidays(self):
+        self.assertEqual(self.candidates("Please reply within 6 business days."), [("2025-06-13 10:00", "relative")])
+        friday = datetime(2025, 6, 6, 0, 0, tzinfo=dt_timezone.utc)
+        self.assertEqual(self.candidates("Please reply tomorrow.", friday), [("2025-06-09 10:00", "relative")])
+        before_holiday = datetime(2025, 6, 11, 0, 0, tzinfo=dt_timezone.utc)
+        self.assertEqual(self.candidates("Please reply tomorrow.", before_holiday), [("2025-06-13 10:00", "relative")])
+
+    def test_quoted_thread_is_not_scanned(self):
+        self.assertEqual(self.candidates("Thanks, will do.\n> Please send it by June 20, 2025."), [])
+
+# Scheduling of new tasks into the work hours (three a day here): priority first, what does not
+# fit overflows to the next business day. Thursday 2025-06-05, before work, in Tokyo.
+@override_settings(BUSINESS_CALENDARS={
+    "Scheduling": {"weekmask": "1111100", "holidays": [], "country": "", "work_hours": [9, 10, 11]},
+})
+class SchedulerTests(TestCase):
+    def setUp(self):
+        business_calendar._get_calendar.cache_clear()
+        self.addCleanup(business_calendar._get_calendar.cache_clear)
+        self.user = ThinkTaskerUser.objects.create(username="scheduler-user", department="Scheduling")
+        self.now = self.at(5, 0)
+
+    def at(self, day, hour):
+        return datetime(2025, 6, day, hour, 0, tzinfo=timezone.get_current_timezone())
+
+    def schedule(self, *tasks, now=None):
+        tasks = [{"extracted_deadline": deadline, "priority": priority} for deadline, priority in tasks]
+        scheduler.assign_deadline_and_priority_batch(self.user, tasks, now=now or self.now)
+        return [task["assigned_deadline"] for task in tasks]
+
+    def test_priority_order_and_overflow_to_the_next_business_day(self):
+        thursday = self.at(5, 12)
+        self.assertEqual(
+            self.schedule((thursday, "Low"), (thursday, "Urgent"), (thursday, "Medium"), (thursday, "Important")),
+            [self.at(6, 9), self.at(5, 9), self.at(5, 11), self.at(5, 10)],
+        )
+
+    def test_overflow_skips_the_weekend(self):
+        friday = self.at(6, 12)
+        self.assertEqual(
+            self.schedule(*[(friday, "Medium")] * 4),
+            [self.at(6, 9), self.at(6, 10), self.at(6, 11), self.at(9, 9)],
+        )
+
+    def test_weekend_deadline_stays_on_its_day(self):
+        self.assertEqual(self.schedule((self.at(7, 12), "Low")), [self.at(7, 9)])
+
+    def test_open_tasks_are_rescheduled_with_the_new_ones(self):
+        open_task = ExtractedTask.objects.create(
+            user=self.user, task_description="Send it.", priority="Low", deadline=self.at(5, 9)
+        )
+        self.assertEqual(self.schedule((self.at(5, 12), "Urgent")), [self.at(5, 9)])
+        open_task.refresh_from_db()
+        self.assertEqual(open_task.deadline, self.at(5, 10))
+
+    def test_hours_already_started_today_are_skipped(self):
+        self.assertEqual(
+            self.schedule((None, "Medium"), (None, "Medium"), now=self.at(5, 10) + timedelta(minutes=30)),
+            [self.at(5, 11), self.at(6, 9)],
+        )
+
+# Walking every page with the cursors gives the same rows, in the same order, as order_by,
+# with NULL deadlines and tied priorities, deadlines and timestamps.
+class KeysetWalkTests(TestCase):
+    def setUp(self):
+        self.user = ThinkTaskerUser.objects.create(username="keyset-user")
+        other = ThinkTaskerUser.objects.create(username="keyset-other")
+        base = timezone.now().replace(microsecond=0)
+        priorities = ["Urgent", "Important", "Medium", "Low", ""]
+        for i in range(40):
+            email = ProcessedEmail.objects.create(
+                user=self.user, message_id=f"keyset-{i}", subject=f"Email {i}", tokens=["email"]
+            )
+            task = ExtractedTask.objects.create(
+                user=self.user, email=email, task_description=f"Task {i}", priority=priorities[i % 5],
+                deadline=None if i % 3 == 0 else base + timedelta(days=i % 4),
+            )
+            # Four rows per timestamp
+            ProcessedEmail.objects.filter(pk=email.pk).update(processed_at=base - timedelta(hours=i // 4))
+            ExtractedTask.objects.filter(pk=task.pk).update(created_at=base - timedelta(hours=i // 4))
+        ExtractedTask.objects.create(user=other, task_description="Someone else's", priority="Urgent")
+
+    def walk(self, queryset, ordering, page_size):
+        ids, cursor = [], None
+        while True:
+            page = pagination.keyset_page(queryset, ordering, cursor, page_size=page_size)
+            ids.extend(item.pk for item in page.items)
+            if page.next_cursor is None:
+                return ids
+            cursor = page.next_cursor
+
+    def test_walks_match_order_by(self):
+        walks = [
+            (ExtractedTask.objects.filter(user=self.user), pagination.TASK_LIST_ORDERING),
+            (ProcessedEmail.objects.filter(user=self.user), pagination.INBOX_ORDERING),
+        ]
+        for queryset, ordering in walks:
+            expected = list(queryset.order_by(*ordering).values_list("pk", flat=True))
+            self.assertEqual(len(expected), 40)
+            for page_size in (1, 3, 7, 40, 50):
+                with self.subTest(model=queryset.model.__name__, page_size=page_size):
+                    self.assertEqual(self.walk(queryset, ordering, page_size), expected)
+
+# The MSAL token cache kept for background jobs is encrypted, cleared at logout and hidden from the admin.
+class GraphTokenCacheTests(TestCase):
+    def setUp(self):
+        self.user = ThinkTaskerUser.objects.create(username="token-user")
+        cache = graph_auth.msal.SerializableTokenCache()
+        cache.deserialize('{"RefreshToken": {"rt": {"secret": "refresh-secret"}}}')
+        cache.has_state_changed = True
+        graph_auth.save_token_cache(self.user, cache)
+
+    def test_cache_is_encrypted_at_rest(self):
+        stored = ThinkTaskerUser.objects.get(pk=self.user.pk).graph_token_cache
+        self.assertNotIn("refresh-secret", stored)
+        self.assertIn("refresh-secret", graph_auth.load_token_cache(self.user).serialize())
+
+    def test_undecryptable_cache_is_ignored(self):
+        self.user.graph_token_cache = "not a token"
+        self.assertEqual(graph_auth.load_token_cache(self.user).serialize(), "{}")
+
+    def test_logout_clears_the_cache(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse("logout"))
+        self.assertEqual(ThinkTaskerUser.objects.get(pk=self.user.pk).graph_token_cache, "")
+
+    def test_admin_form_excludes_the_cache(self):
+        from django.contrib import admin
+        from django.test import RequestFactory
+
+        request = RequestFactory().get("/admin/")
+        request.user = ThinkTaskerUser.objects.create(username="token-admin", is_staff=True, is_superuser=True)
+        form = admin.site._registry[ThinkTaskerUser].get_form(request, self.user)
+        self.assertNotIn("graph_token_cache", form.base_fields)
+
+# A primary batch over its latency budget keeps running, later batches do not queue behind it.
+class FallbackSummarizerTests(SimpleTestCase):
+    class Engine(summarizers.Summarizer):
+        def __init__(self, name, release=None):
+            self.name = name
+            self.release = release
+            self.calls = 0
+
+        def summarize_many(self, email_bodies):
+            self.calls += 1
+            if self.release:
+                self.release.wait(5)
+            return [self.name] * len(email_bodies)
+
+    def test_busy_primary_goes_straight_to_the_fallback(self):
+        import threading
+
+        release = threading.Event()
+        primary = self.Engine("primary", release)
+        fallback = self.Engine("fallback")
+        summarizer = summarizers.FallbackSummarizer(primary, fallback, latency_budget=0.05)
+
+        with self.assertLogs("mainApp.summarizers", "INFO"):
+            self.assertEqual(summarizer.summarize_many(["a"]), ["fallback"])
+            self.assertEqual(summarizer.summarize_many(["b"]), ["fallback"])
+        self.assertEqual(primary.calls, 1)
+
+        release.set()
+        summarizers._executor.submit(lambda: None).result(5)
+        self.assertEqual(summarizer.summarize_many(["c"]), ["primary"])
+        self.assertEqual(primary.calls, 2)
+
+# A task claimed by another worker between the SELECT and the UPDATE of claim_due_entries is not
+# claimed again, so its newer entries are not sent alongside the older ones.
+class OutboxClaimTests(TestCase):
+    def test_task_claimed_concurrently_is_skipped(self):
+        from django.db import connection
+
+        user = ThinkTaskerUser.objects.create(username="outbox-user")
+        first = TodoOutboxEntry.objects.create(user=user, todo_list_id="list", todo_task_id="T", changes={"title": "A"})
+        fired = []
+
+        # Just before the claiming UPDATE, another worker claims T and the view queues a newer change
+        def other_worker(execute, sql, params, many, context):
+            if sql.startswith("UPDATE") and params and params[0] == "sending" and not fired:
+                fired.append(True)
+                TodoOutboxEntry.objects.filter(pk=first.pk).update(status="sending", claim="other")
+                TodoOutboxEntry.objects.create(user=user, todo_list_id="list", todo_task_id="T", changes={"title": "B"})
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(other_worker):
+            self.assertEqual(outbox.claim_due_entries(10), [])
+        self.assertTrue(fired)
+        self.assertEqual(
+            sorted(TodoOutboxEntry.objects.values_list("status", "claim")), [("pending", ""), ("sending", "other")]
+        )
+
+# The FTS5 tables are kept in sync by triggers (migration 0027) that a table rebuild on SQLite
+# drops (see 0028): every write path must still reach the index, on the migrated schema.
+class FullTextSearchSyncTests(TestCase):
+    def setUp(self):
+        self.user = ThinkTaskerUser.objects.create(username="search-user")
+        other = ThinkTaskerUser.objects.create(username="search-other")
+        ExtractedTask.objects.create(user=other, subject="Quarterly report", task_description="Someone else's.")
+
+    def task(self, subject, description):
+        return ExtractedTask(user=self.user, subject=subject, task_description=description)
+
+    def email(self, message_id, subject, preview):
+        return ProcessedEmail(user=self.user, message_id=message_id, subject=subject, body_preview=preview, tokens=["x"])
+
+    def ids(self, results):
+        return [row.pk for row in results]
+
+    def test_tasks(self):
+        self.assertEqual(search.backend(), "fts5")
+        both = ExtractedTask.objects.create(user=self.user, subject="Quarterly report", task_description="Send it.")
+        deleted = ExtractedTask.objects.create(user=self.user, subject="Quarterly report", task_description="Old.")
+        description_only, renamed, unrelated = ExtractedTask.objects.bulk_create([
+            self.task("Budget", "Attach the quarterly report."),
+            self.task("Misc", "Nothing."),
+            self.task("Lunch", "Book a table."),
+        ])
+        renamed.subject = "Quarterly report for the board"
+        unrelated.task_description = "Book a table, no report."
+        ExtractedTask.objects.bulk_update([renamed, unrelated], ["subject", "task_description"])
+        deleted.delete()
+
+        # Both words in a short subject first, then a longer subject, then the description only
+        self.assertEqual(
+            self.ids(search.search_tasks(self.user, "quarterly report")), [both.pk, renamed.pk, description_only.pk]
+        )
+        self.assertEqual(self.ids(search.search_tasks(self.user, "boa")), [renamed.pk])
+        self.assertEqual(self.ids(search.search_tasks(self.user, "misc")), [])
+        self.assertIn(unrelated.pk, self.ids(search.search_tasks(self.user, "report")))
+        self.assertEqual(self.ids(search.search_tasks(self.user, "old")), [])
+
+    def test_emails(self):
+        subject_match = ProcessedEmail.objects.create(
+            user=self.user, message_id="s1", subject="Invoice overdue", body_preview="Please pay.", tokens=["x"]
+        )
+        deleted = ProcessedEmail.objects.create(
+            user=self.user, message_id="s2", subject="Invoice", body_preview="Old.", tokens=["x"]
+        )
+        preview_match, edited = ProcessedEmail.objects.bulk_create([
+            self.email("s3", "Payment", "The invoice is overdue."),
+            self.email("s4", "Hello", "Nothing here."),
+        ])
+        edited.body_preview = "Overdue invoice reminder."
+        ProcessedEmail.objects.bulk_update([edited], ["body_preview"])
+        deleted.delete()
+
+        self.assertEqual(
+            self.ids(search.search_emails(self.user, "invoice overdue")),
+            [subject_match.pk, edited.pk, preview_match.pk],
+        )
+        self.assertEqual(self.ids(search.search_emails(self.user, "nothing")), [])
+        self.assertEqual(self.ids(search.search_emails(self.user, "old")), [])
+
+# save_new_tasks skips ProcessedEmail.save and post_save: what it stores and counts must be what
+# saving the same emails one by one does. Word tokenization is a plain split here, so the test
+# does not need the NLTK data; both paths go through it.
+@mock.patch.object(nlp, "word_tokenize", lambda text: text.split())
+@mock.patch.object(nlp, "english_stopwords", lambda: frozenset({"the", "a", "by", "to", "is", "for", "and"}))
+class SaveNewTasksParityTests(TestCase):
+    emails = [
+        ("Quarterly report", "Please send the quarterly report by Friday and attach the numbers"),
+        ("Budget review", "Could you review the budget for next year and send comments"),
+        ("Vergadering", "Kunnen we morgen om tien uur vergaderen over het nieuwe project"),
+        ("Budget review", "Could you review the budget for next year and send comments"),
+        ("Hi", "Ok"),
+    ]
+
+    def setUp(self):
+        self.user = ThinkTaskerUser.objects.create(username="parity-user")
+
+    def sync_tasks(self):
+        # Built as run_mail_sync builds them
+        tasks = []
+        for i, (subject, preview) in enumerate(self.emails):
+            document = nlp.EmailDocument(preview, subject)
+            tasks.append({
+                "message_id": f"parity-{i}", "subject": subject, "preview": preview, "web_link": "",
+                "to_recipients": ["user@example.com"], "language": document.language,
+                "email_tokens": document.tokens, "actionable_patterns": [], "priority": "Medium",
+                "assigned_deadline": None,
+            })
+        return tasks
+
+    def stored(self):
+        emails = ProcessedEmail.objects.filter(user=self.user).order_by("message_id")
+        return (
+            list(emails.values_list("message_id", "tokens", "language", "in_corpus")),
+            sorted(TermStatistic.objects.values_list("term", "document_frequency", "collection_frequency")),
+            CorpusStatistic.objects.get(pk=term_stats.CORPUS_STATISTIC_PK).document_count,
+        )
+
+    def test_bulk_and_per_row_saves_match(self):
+        sync.save_new_tasks(self.user, self.sync_tasks(), ["Do it."] * len(self.emails))
+        bulk = self.stored()
+        ProcessedEmail.objects.filter(user=self.user).delete()
+        self.assertEqual(TermStatistic.objects.count(), 0)
+
+        for task in self.sync_tasks():
+            ProcessedEmail.objects.create(
+                user=self.user, message_id=task["message_id"], subject=task["subject"],
+                body_preview=task["preview"], is_actionable=True, web_link=task["web_link"],
+                is_reference=True, to_recipients=task["to_recipients"],
+            )
+        per_row = self.stored()
+
+        self.assertEqual(bulk, per_row)
+        self.assertEqual(per_row[2], 3)
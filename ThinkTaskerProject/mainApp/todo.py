@@ -1,28 +1,37 @@
-import requests
+import logging
 
-def get_todo_list_id(access_token):
-    url = "https://graph.microsoft.com/v1.0/me/todo/lists"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    resp = requests.get(url, headers=headers)
+from . import graph
+
+logger = logging.getLogger(__name__)
+
+def _resolve_todo_list_id(access_token):
+    url = "/me/todo/lists"
+    resp = graph.get(url, access_token)
     data = resp.json()
     if data.get("value"):
         # Use the first (default) list
         return data["value"][0]["id"]
     else:
         payload = {"displayName": "Tasks"}
-        create_resp = requests.post(url, headers=headers, json=payload)
+        create_resp = graph.post(url, access_token, json=payload)
         if create_resp.status_code == 201:
             return create_resp.json()["id"]
         else:
-            print("Could not create list:", create_resp.json())
+            logger.error(f"Could not create To Do list: {create_resp.status_code} {create_resp.text}")
             return None
 
-def create_todo_task(access_token, title, description, due_date):
-    list_id = get_todo_list_id(access_token)
-    if not list_id:
-        print("No default To Do list found.")
-        return None, None
-    url = f"https://graph.microsoft.com/v1.0/me/todo/lists/{list_id}/tasks"
+# This function returns the To Do list id of the user, stored on ThinkTaskerUser.todo_list_id
+# after the first lookup. refresh=True looks it up again (after a 404 on the stored list).
+def get_todo_list_id(access_token, user=None, refresh=False):
+    if user is not None and user.todo_list_id and not refresh:
+        return user.todo_list_id
+    list_id = _resolve_todo_list_id(access_token)
+    if user is not None and list_id and list_id != user.todo_list_id:
+        user.todo_list_id = list_id
+        user.save(update_fields=["todo_list_id"])
+    return list_id
+
+def _task_payload(title, description, due_date):
     data = {"title": title}
     if description:
         data["body"] = {"content": description, "contentType": "text"}
@@ -31,20 +40,67 @@ def create_todo_task(access_token, title, description, due_date):
             "dateTime": due_date.strftime("%Y-%m-%dT%H:%M:%S"),
             "timeZone": "UTC"
         }
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    }
-    resp = requests.post(url, json=data, headers=headers)
-    print("POST Response:", resp)
+    return data
+
+def create_todo_task(access_token, title, description, due_date, user=None):
+    list_id = get_todo_list_id(access_token, user)
+    if not list_id:
+        logger.warning("No default To Do list found")
+        return None, None
+    data = _task_payload(title, description, due_date)
+    headers = {"Content-Type": "application/json"}
+    resp = graph.post(f"/me/todo/lists/{list_id}/tasks", access_token, json=data, headers=headers)
+    if resp.status_code == 404 and user is not None:
+        # The stored list was deleted, resolve it again and retry once
+        list_id = get_todo_list_id(access_token, user, refresh=True)
+        if not list_id:
+            return None, None
+        resp = graph.post(f"/me/todo/lists/{list_id}/tasks", access_token, json=data, headers=headers)
     if resp.status_code == 201:
         return resp.json().get("id"), list_id   # Return both!
     else:
-        print("To Do task creation failed:", resp.text)
+        logger.warning(f"To Do task creation failed: {resp.status_code} {resp.text}")
         return None, None
 
-def update_todo_task(access_token, list_id, todo_task_id, title=None, description=None, due_date=None, status=None):
-    url = f"https://graph.microsoft.com/v1.0/me/todo/lists/{list_id}/tasks/{todo_task_id}"
+# This function creates many To Do tasks with $batch requests of 20.
+# tasks is a list of {"title", "description", "due_date"} dicts.
+# It returns a (todo_task_id, todo_list_id) pair per task, in order; (None, None) for failures.
+def create_todo_tasks(access_token, user, tasks):
+    results = [(None, None)] * len(tasks)
+    list_id = get_todo_list_id(access_token, user)
+    if not list_id:
+        logger.warning("No default To Do list found")
+        return results
+    pending = list(range(len(tasks)))
+    for attempt in range(2):
+        sub_requests = [
+            {
+                "method": "POST",
+                "url": f"/me/todo/lists/{list_id}/tasks",
+                "headers": {"Content-Type": "application/json"},
+                "body": _task_payload(tasks[i]["title"], tasks[i]["description"], tasks[i]["due_date"]),
+            }
+            for i in pending
+        ]
+        not_found = []
+        for i, sub in zip(pending, graph.batch(sub_requests, access_token)):
+            if sub.get("status") == 201:
+                results[i] = ((sub.get("body") or {}).get("id"), list_id)
+            elif sub.get("status") == 404:
+                not_found.append(i)
+            else:
+                logger.warning(f"To Do task creation failed: {sub.get('status')} {sub.get('body')}")
+        if not not_found or attempt:
+            break
+        # The stored list was deleted, resolve it again and retry those tasks once
+        list_id = get_todo_list_id(access_token, user, refresh=True)
+        if not list_id:
+            break
+        pending = not_found
+    return results
+
+# This function builds the PATCH body of a To Do task; fields left as None are not changed.
+def build_update_payload(title=None, description=None, due_date=None, status=None):
     data = {}
     if title is not None:
         data["title"] = title
@@ -57,25 +113,51 @@ def update_todo_task(access_token, list_id, todo_task_id, title=None, descriptio
         }
     if status:
         data["status"] = status
+    return data
+
+def update_todo_task(access_token, list_id, todo_task_id, title=None, description=None, due_date=None, status=None):
+    url = f"/me/todo/lists/{list_id}/tasks/{todo_task_id}"
+    data = build_update_payload(title, description, due_date, status)
     if not data:
         return True
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    }
-    resp = requests.patch(url, json=data, headers=headers)
-    print("PATCH Response code:", resp.status_code)
-    print("PATCH Response text:", resp.text)
+    headers = {"Content-Type": "application/json"}
+    resp = graph.patch(url, access_token, json=data, headers=headers)
     return resp.status_code in (200, 204)
 
 def mark_todo_task_completed(access_token, list_id, todo_task_id):
     return update_todo_task(access_token, list_id, todo_task_id, status="completed")
 
 def delete_todo_task(access_token, list_id, todo_task_id):
-    url = f"https://graph.microsoft.com/v1.0/me/todo/lists/{list_id}/tasks/{todo_task_id}"
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    }
-    resp = requests.delete(url, headers=headers)
+    url = f"/me/todo/lists/{list_id}/tasks/{todo_task_id}"
+    resp = graph.delete(url, access_token)
     return resp.status_code == 204
+
+# This function reads a round of the Graph tasks/delta query of a To Do list, like
+# read_email.fetch_email_delta does for mail: with the delta_link of the previous round only
+# the tasks changed since then are returned.
+# It returns (tasks, removed_task_ids, new_delta_link); new_delta_link is None if the round did not complete.
+def fetch_todo_delta(access_token, list_id, delta_link=None):
+    initial_url = f"/me/todo/lists/{list_id}/tasks/delta"
+    url = delta_link or initial_url
+    tasks = []
+    removed = []
+    while url:
+        resp = graph.get(url, access_token)
+        if resp.status_code == 410 and url != initial_url:
+            # The sync state expired on the Graph side, start a full round again
+            logger.info(f"Delta link expired for To Do list {list_id}, restarting the delta round")
+            url, tasks, removed = initial_url, [], []
+            continue
+        if resp.status_code != 200:
+            logger.warning(f"To Do delta query failed for list {list_id}: {resp.status_code} {resp.text}")
+            return tasks, removed, None
+        data = resp.json()
+        for t in data.get("value", []):
+            if "@removed" in t:
+                removed.append(t["id"])
+            else:
+                tasks.append(t)
+        if "@odata.deltaLink" in data:
+            return tasks, removed, data["@odata.deltaLink"]
+        url = data.get("@odata.nextLink", None)
+    return tasks, removed, None
@@ -0,0 +1,124 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ExtractedTask, TodoDeltaToken, TodoOutboxEntry, BackgroundJob
+from . import todo
+from .business_calendar import calendar_for
+
+# To Do status -> ExtractedTask.status
+TODO_STATUS_MAP = {
+    "notStarted": "Open",
+    "inProgress": "Ongoing",
+    "waitingOnOthers": "Ongoing",
+    "deferred": "Open",
+    "completed": "Completed",
+}
+
+def _no_progress(stage, **counts):
+    pass
+
+# This function parses a Graph dateTimeTimeZone value, e.g.
+# {"dateTime": "2025-06-02T00:00:00.0000000", "timeZone": "UTC"}; only UTC is sent by todo.py.
+def parse_todo_datetime(value):
+    if not value or not value.get("dateTime"):
+        return None
+    parsed = datetime.fromisoformat(value["dateTime"][:19])
+    return parsed.replace(tzinfo=dt_timezone.utc)
+
+# To Do keeps only the day of a due date, so a change is a different day. The time of day
+# of the local deadline is kept; a task without a deadline gets the start of the work day.
+def _moved_deadline(task, due, calendar):
+    if due is None:
+        return None
+    if task.deadline is None:
+        return timezone.make_aware(datetime.combine(due.date(), time(calendar.work_start)))
+    current = task.deadline.astimezone(dt_timezone.utc)
+    if current.date() == due.date():
+        return None
+    return current + timedelta(days=(due.date() - current.date()).days)
+
+# This function applies the To Do tasks changed since the last reconcile to the user's
+# ExtractedTask rows (status and due date) with a single bulk_update.
+# Tasks with To Do changes still waiting in the outbox are skipped, the local state is newer.
+# It returns a message describing the outcome.
+def run_todo_reconcile(user, access_token, progress=_no_progress):
+    list_ids = set(
+        ExtractedTask.objects.filter(user=user)
+        .exclude(todo_list_id__isnull=True).exclude(todo_list_id="")
+        .values_list("todo_list_id", flat=True)
+        .distinct()
+    )
+    if user.todo_list_id:
+        list_ids.add(user.todo_list_id)
+    if not list_ids:
+        return "No To Do lists to reconcile."
+
+    progress("fetching To Do changes", total_count=len(list_ids), processed_count=0)
+    delta_links = dict(
+        TodoDeltaToken.objects.filter(user=user, todo_list_id__in=list_ids).values_list("todo_list_id", "delta_link")
+    )
+    changed_todo_tasks = {}
+    new_delta_links = {}
+    # Lists whose delta round did not complete, their changes are read again next time
+    failed_list_ids = []
+    for processed, list_id in enumerate(sorted(list_ids), start=1):
+        todo_tasks, _, delta_link = todo.fetch_todo_delta(access_token, list_id, delta_links.get(list_id))
+        for t in todo_tasks:
+            changed_todo_tasks[t["id"]] = t
+        if delta_link:
+            new_delta_links[list_id] = delta_link
+        else:
+            failed_list_ids.append(list_id)
+        progress("fetching To Do changes", processed_count=processed)
+
+    progress("applying To Do changes")
+    calendar = calendar_for(user)
+    pending = set(
+        TodoOutboxEntry.objects.filter(user=user, todo_task_id__in=list(changed_todo_tasks))
+        .exclude(status="failed")
+        .values_list("todo_task_id", flat=True)
+    )
+    updated = []
+    for task in ExtractedTask.objects.filter(user=user, todo_task_id__in=list(changed_todo_tasks)):
+        if task.todo_task_id in pending:
+            continue
+        t = changed_todo_tasks[task.todo_task_id]
+        changed = False
+        status = TODO_STATUS_MAP.get(t.get("status"))
+        if status and status != task.status:
+            task.status = status
+            changed = True
+        deadline = _moved_deadline(task, parse_todo_datetime(t.get("dueDateTime")), calendar)
+        if deadline:
+            task.deadline = deadline
+            changed = True
+        if changed:
+            updated.append(task)
+    ExtractedTask.objects.bulk_update(updated, ["status", "deadline"])
+
+    # Store the delta links only once the changes are applied, an interrupted run replays them
+    for list_id, delta_link in new_delta_links.items():
+        TodoDeltaToken.objects.update_or_create(
+            user=user, todo_list_id=list_id, defaults={"delta_link": delta_link}
+        )
+    message = f"{len(updated)} task(s) updated from {len(changed_todo_tasks)} change(s)."
+    if failed_list_ids:
+        return (
+            f"To Do reconcile incomplete: {message} Reading the changes of "
+            f"{len(failed_list_ids)} of {len(list_ids)} list(s) failed: {', '.join(failed_list_ids)}."
+        )
+    return f"To Do reconcile completed: {message}"
+
+# This function queues a reconcile job when the last one is older than TODO_RECONCILE_INTERVAL seconds.
+def reconcile_if_stale(user):
+    from . import jobs
+
+    last = (
+        BackgroundJob.objects.filter(user=user, kind="todo_reconcile").order_by("-created_at")
+        .values_list("created_at", flat=True).first()
+    )
+    if last and timezone.now() - last < timedelta(seconds=settings.TODO_RECONCILE_INTERVAL):
+        return None
+    return jobs.enqueue_job(user, "todo_reconcile")
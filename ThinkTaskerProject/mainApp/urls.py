@@ -10,8 +10,11 @@ urlpatterns = [
     path("graph/callback/", views.graph_callback, name="graph-callback"),
     path("profile/", views.profile, name="profile"),
     path("outlook/", views.outlook_inbox, name="outlook-inbox"),
+    path("outlook/page/", views.outlook_inbox_page, name="outlook-inbox-page"),
     path("emails/sync/", views.sync_emails_view, name="sync-emails"),
+    path("emails/sync/jobs/<int:job_id>/", views.sync_job_status, name="sync-job-status"),
     path("tasks/", views.task_list, name="task_list"),
+    path("tasks/page/", views.task_list_page, name="task_list_page"),
     path("tasks/create/", views.create_task, name="create_task"),
     path("tasks/edit/<int:task_id>/", views.edit_task, name="edit_task"),
     path("tasks/delete/<int:task_id>/", views.delete_task, name="delete_task"),
@@ -135,6 +135,106 @@ GRAPH_SCOPE = [
     "Mail.Read",
     "Tasks.ReadWrite",
 ]
+# Secret the key encrypting the stored MSAL token caches is derived from (mainApp/graph_auth.py).
+# Changing it makes every user sign in again before their next background sync.
+GRAPH_TOKEN_CACHE_KEY = os.environ.get("GRAPH_TOKEN_CACHE_KEY", SECRET_KEY)
+# Shared Graph HTTP client (mainApp/graph.py)
+GRAPH_TIMEOUT = 30
+GRAPH_POOL_SIZE = 10
+GRAPH_MAX_RETRIES = 4
+# Seconds, doubled on every retry that has no Retry-After header
+GRAPH_BACKOFF_BASE = 1.0
+GRAPH_BACKOFF_MAX = 60
+# Maximum concurrent Graph calls per process, halved while Graph is throttling
+GRAPH_MAX_CONCURRENCY = 8
+# Seconds the signed-in user's Graph profile is cached in the session before it is revalidated
+GRAPH_PROFILE_TTL = 900
+# Number of concurrent $batch requests used to fetch email bodies during a sync
+GRAPH_BODY_FETCH_WORKERS = 4
+# "delta" syncs the inbox incrementally with messages/delta, "filter" re-reads everything
+# received since the last sync and scans all unread messages
+GRAPH_MAIL_SYNC_MODE = "delta"
+# Characters at the start of an email body searched for deadlines (mainApp/deadlines.py)
+DEADLINE_SCAN_CHARS = 4000
+
+# Task-description LLM (mainApp/task_description.py), loaded on first use
+TASK_DESCRIPTION_BASE_MODEL_PATH = os.environ.get(
+    "TASK_DESCRIPTION_BASE_MODEL_PATH", str(BASE_DIR / "Llama-3.1-8B-Instruct")
+)
+TASK_DESCRIPTION_ADAPTER_PATH = os.environ.get(
+    "TASK_DESCRIPTION_ADAPTER_PATH", str(BASE_DIR / "Llama-3.1-8B-Instruct" / "autotrain-7wi99-5xtz5")
+)
+TASK_DESCRIPTION_DEVICE_MAP = "auto"
+TASK_DESCRIPTION_TORCH_DTYPE = "float16"
+TASK_DESCRIPTION_BATCH_SIZE = 8
+TASK_DESCRIPTION_MAX_NEW_TOKENS = 50
+# Task description engine (mainApp/summarizers.py): "llama", "textrank" (extractive, CPU friendly)
+# or "auto" (llama, falling back to textrank when the model is unavailable or over budget)
+TASK_DESCRIPTION_ENGINE = "auto"
+# Seconds a batch may spend in the llama engine before "auto" falls back to textrank
+TASK_DESCRIPTION_LATENCY_BUDGET = 60
+# Unix socket of the shared model server (python manage.py serve_task_descriptions).
+# Leave empty to load the model inside each process instead.
+TASK_DESCRIPTION_SERVER_SOCKET = os.environ.get("TASK_DESCRIPTION_SERVER_SOCKET", "")
+TASK_DESCRIPTION_SERVER_TIMEOUT = 120
+TASK_DESCRIPTION_SERVER_MAX_WAIT_MS = 50
+# Generated descriptions cache (mainApp/summary_cache.py)
+TASK_DESCRIPTION_CACHE_LRU_SIZE = 1024
+TASK_DESCRIPTION_CACHE_MAX_ENTRIES = 20000
+TASK_DESCRIPTION_CACHE_MAX_AGE_DAYS = 90
+
+# Completed tasks shown on the dashboard, the task list has all of them (mainApp/dashboard.py)
+DASHBOARD_COMPLETED_LIMIT = 50
+
+# Rows per page of the inbox and the task list, later pages load on scroll (mainApp/pagination.py)
+PAGE_SIZE = 50
+
+# Full-text search of tasks and emails (mainApp/search.py): most results returned, best first,
+# and most words of a query used
+SEARCH_MAX_RESULTS = 200
+SEARCH_MAX_TERMS = 8
+
+# Business calendar (mainApp/business_calendar.py) used for deadlines and scheduling.
+# Working days Monday..Sunday, "1" = working day
+BUSINESS_WEEKMASK = "1111100"
+# Hours a task can be scheduled at, one task per hour
+BUSINESS_WORK_HOURS = [9, 10, 11, 13, 14, 15, 16, 17, 18]
+# Public holidays, no task is scheduled on them. With the "holidays" package installed
+# (pip install holidays) the national holidays of BUSINESS_HOLIDAYS_COUNTRY are added every
+# year and this list only needs the company's own days off; without it the list below
+# (Japanese national holidays) is all there is and a warning is logged once it ran out.
+BUSINESS_HOLIDAYS_COUNTRY = "JP"
+BUSINESS_HOLIDAYS = [
+    "2025-01-01", "2025-01-13", "2025-02-11", "2025-02-23", "2025-02-24", "2025-03-20",
+    "2025-04-29", "2025-05-03", "2025-05-04", "2025-05-05", "2025-05-06", "2025-07-21",
+    "2025-08-11", "2025-09-15", "2025-09-23", "2025-10-13", "2025-11-03", "2025-11-23",
+    "2025-11-24",
+    "2026-01-01", "2026-01-12", "2026-02-11", "2026-02-23", "2026-03-20", "2026-04-29",
+    "2026-05-03", "2026-05-04", "2026-05-05", "2026-05-06", "2026-07-20", "2026-08-11",
+    "2026-09-21", "2026-09-22", "2026-09-23", "2026-10-12", "2026-11-03", "2026-11-23",
+]
+# Per-department overrides of "weekmask", "holidays", "country" and "work_hours", keyed by ThinkTaskerUser.department,
+# e.g. {"Support": {"weekmask": "1111110", "work_hours": [8, 9, 10, 11, 13, 14, 15, 16]}}
+BUSINESS_CALENDARS = {}
+
+# Background workers (python manage.py run_workers)
+WORKER_CONCURRENCY = 2
+WORKER_POLL_INTERVAL = 2.0
+# Seconds after which a job still "running" is taken as left behind by a worker that died
+# and marked failed, so the user's next sync or reconcile is not blocked by it
+JOB_RUNNING_TIMEOUT = 1800
+# Seconds between two writes of a job's progress counts (a new stage is always written)
+JOB_PROGRESS_INTERVAL = 1.0
+# Seconds between two reconcile jobs pulling the changes made in Microsoft To Do (mainApp/todo_sync.py)
+TODO_RECONCILE_INTERVAL = 300
+# Microsoft To Do write-behind outbox (mainApp/outbox.py), flushed by the workers
+TODO_OUTBOX_BATCH_SIZE = 100
+TODO_OUTBOX_MAX_ATTEMPTS = 8
+# Seconds, doubled after every failed attempt
+TODO_OUTBOX_BACKOFF_BASE = 30
+TODO_OUTBOX_BACKOFF_MAX = 3600
+# Seconds after which entries claimed by a worker that died are sent again
+TODO_OUTBOX_CLAIM_TIMEOUT = 300
 
 AUTH_USER_MODEL = 'mainApp.ThinkTaskerUser'
 LOGIN_URL = '/'